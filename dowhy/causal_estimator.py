@@ -5,13 +5,14 @@ from typing import Dict, List, Optional, Union
 import numpy as np
 import pandas as pd
 import sympy as sp
-from sklearn.utils import resample
+from joblib import Parallel, delayed, effective_n_jobs
 
 import dowhy.interpreters as interpreters
 from dowhy import causal_estimators
 from dowhy.causal_graph import CausalGraph
 from dowhy.causal_identifier.identified_estimand import IdentifiedEstimand
 from dowhy.utils.api import parse_state
+from dowhy.utils.shared_data import SharedDataFrame
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +28,8 @@ class CausalEstimator:
     DEFAULT_NUMBER_OF_SIMULATIONS_STAT_TEST = 1000
     # The default number of simulations to obtain confidence intervals
     DEFAULT_NUMBER_OF_SIMULATIONS_CI = 100
+    # The number of null simulations between two checks for early stopping of the significance test
+    NULL_SIMULATIONS_BATCH_SIZE = 100
     # The portion of the total size that should be taken each time to find the confidence intervals
     # 1 is the recommended value
     # https://ocw.mit.edu/courses/mathematics/18-05-introduction-to-probability-and-statistics-spring-2014/readings/MIT18_05S14_Reading24.pdf
@@ -43,6 +46,9 @@ class CausalEstimator:
 
     BootstrapEstimates = namedtuple("BootstrapEstimates", ["estimates", "params"])
 
+    # Supported types of frequency weights for the weighted bootstrap
+    WEIGHTED_BOOTSTRAP_TYPES = ("multinomial", "poisson", "bayesian")
+
     DEFAULT_INTERPRET_METHOD = ["textual_effect_interpreter"]
 
     # std args to be removed from locals() before being passed to args_dict
@@ -67,6 +73,7 @@ class CausalEstimator:
         confidence_level=DEFAULT_CONFIDENCE_LEVEL,
         need_conditional_estimates="auto",
         num_quantiles_to_discretize_cont_cols=NUM_QUANTILES_TO_DISCRETIZE_CONT_COLS,
+        n_jobs=1,
         **kwargs,
     ):
         """Initializes an estimator with data and names of relevant variables.
@@ -101,6 +108,9 @@ class CausalEstimator:
         :param num_quantiles_to_discretize_cont_cols: The number of quantiles
             into which a numeric effect modifier is split, to enable
             estimation of conditional treatment effect over it.
+        :param n_jobs: The maximum number of concurrently running jobs for
+            the bootstrap simulations. If -1 all CPUs are used. If 1 is given,
+            no parallel computing code is used at all (this is the default).
         :param kwargs: (optional) Additional estimator-specific parameters
         :returns: an instance of the estimator class.
         """
@@ -148,6 +158,7 @@ class CausalEstimator:
         self.sample_size_fraction = sample_size_fraction
         self.confidence_level = confidence_level
         self.num_quantiles_to_discretize_cont_cols = num_quantiles_to_discretize_cont_cols
+        self.n_jobs = n_jobs
         # Estimate conditional estimates by default
         self.need_conditional_estimates = (
             need_conditional_estimates if need_conditional_estimates != "auto" else bool(self._effect_modifier_names)
@@ -247,6 +258,18 @@ class CausalEstimator:
 
         :returns: A (multi-index) dataframe that provides separate effects for each value of the (discretized) effect modifiers.
         """
+        # Grouping by effect modifiers and computing effect separately
+        by_effect_mods = self._data.groupby(self._get_effect_modifier_groups(effect_modifier_names, num_quantiles))
+        conditional_estimates = by_effect_mods.apply(estimate_effect_fn)
+        return conditional_estimates
+
+    def _get_effect_modifier_groups(self, effect_modifier_names=None, num_quantiles=None):
+        """Returns the keys for grouping the data by the (discretized) effect modifiers. The data itself is not modified.
+
+        :param effect_modifier_names: Names of effect modifier variables. If not provided, defaults to the effect modifiers specified during creation of the CausalEstimator object.
+        :param num_quantiles: The number of quantiles into which a numeric effect modifier variable is discretized.
+        :returns: A list with one series per effect modifier. A discretized numeric effect modifier is named with the prefix TEMP_CAT_COLUMN_PREFIX.
+        """
         # Defaulting to class default values if parameters are not provided
         if effect_modifier_names is None:
             effect_modifier_names = self._effect_modifier_names
@@ -261,24 +284,15 @@ class CausalEstimator:
             self.logger.warn(
                 "At least one of the provided effect modifiers was not included while fitting the estimator. You may get incorrect results. To resolve, fit the estimator again by providing the updated effect modifiers in estimate_effect()."
             )
-        # Making a copy since we are going to be changing effect modifier names
-        effect_modifier_names = effect_modifier_names.copy()
         prefix = CausalEstimator.TEMP_CAT_COLUMN_PREFIX
-        # For every numeric effect modifier, adding a temp categorical column
-        for i in range(len(effect_modifier_names)):
-            em = effect_modifier_names[i]
-            if pd.api.types.is_numeric_dtype(self._data[em].dtypes):
-                self._data[prefix + str(em)] = pd.qcut(self._data[em], num_quantiles, duplicates="drop")
-                effect_modifier_names[i] = prefix + str(em)
-        # Grouping by effect modifiers and computing effect separately
-        by_effect_mods = self._data.groupby(effect_modifier_names)
-        cond_est_fn = lambda x: self._do(self._treatment_value, x) - self._do(self._control_value, x)
-        conditional_estimates = by_effect_mods.apply(estimate_effect_fn)
-        # Deleting the temporary categorical columns
+        groups = []
+        # Every numeric effect modifier is replaced by a categorical one
         for em in effect_modifier_names:
-            if em.startswith(prefix):
-                self._data.pop(em)
-        return conditional_estimates
+            if pd.api.types.is_numeric_dtype(self._data[em].dtypes):
+                groups.append(pd.qcut(self._data[em], num_quantiles, duplicates="drop").rename(prefix + str(em)))
+            else:
+                groups.append(self._data[em])
+        return groups
 
     def _do(self, x, data_df=None):
         raise NotImplementedError(
@@ -302,13 +316,36 @@ class CausalEstimator:
     def construct_symbolic_estimator(self, estimand):
         raise NotImplementedError(("Symbolic estimator string is ").format(self.__class__))
 
-    def _generate_bootstrap_estimates(self, num_bootstrap_simulations, sample_size_fraction):
+    def _generate_bootstrap_estimates(
+        self, num_bootstrap_simulations, sample_size_fraction, n_jobs=None, weighted_bootstrap=False
+    ):
         """Helper function to generate causal estimates over bootstrapped samples.
 
+        Each simulation uses its own random seed for resampling, which is drawn from numpy's global random state
+        beforehand. Hence, the results are reproducible regardless of the number of parallel jobs. If the simulations
+        run in parallel, the data is shared with the workers via memory-mapped arrays instead of pickling it for every
+        simulation.
+
+        If weighted_bootstrap is set, no resampled data sets are created. Instead, the estimator is evaluated on the
+        original data with random frequency weights per unit (see _estimate_effect_with_sample_weights). The weights are
+        drawn from a multinomial distribution ("multinomial", equivalent to resampling with replacement), independent
+        Poisson distributions ("poisson") or a flat Dirichlet distribution ("bayesian", the Bayesian bootstrap by Rubin
+        (1981)).
+
         :param num_bootstrap_simulations: Number of simulations for the bootstrap method.
         :param sample_size_fraction: Fraction of the dataset to be resampled.
+        :param n_jobs: The maximum number of concurrently running jobs. If None, the n_jobs parameter of the estimator is used.
+        :param weighted_bootstrap: False for resampling the data, otherwise the type of the frequency weights ("multinomial", "poisson" or "bayesian").
         :returns: A collections.namedtuple containing a list of bootstrapped estimates and a dictionary containing parameters used for the bootstrap.
         """
+        if n_jobs is None:
+            n_jobs = self.n_jobs
+        if weighted_bootstrap and weighted_bootstrap not in CausalEstimator.WEIGHTED_BOOTSTRAP_TYPES:
+            raise ValueError(
+                "Weighted bootstrap type {0} is not supported. Supported types are {1}.".format(
+                    weighted_bootstrap, CausalEstimator.WEIGHTED_BOOTSTRAP_TYPES
+                )
+            )
         # The array that stores the results of all estimations
         simulation_results = np.zeros(num_bootstrap_simulations)
 
@@ -321,35 +358,80 @@ class CausalEstimator:
         self.logger.info("INFO: The sample size: {}".format(sample_size))
         self.logger.info("INFO: The number of simulations: {}".format(num_bootstrap_simulations))
 
+        random_seeds = np.random.randint(np.iinfo(np.int32).max, size=num_bootstrap_simulations)
+
+        data = SharedDataFrame(self._data) if effective_n_jobs(n_jobs) > 1 else self._data
+        estimator_params = dict(
+            treatment_value=self._treatment_value,
+            control_value=self._control_value,
+            test_significance=False,
+            evaluate_effect_strength=False,
+            confidence_intervals=False,
+            target_units=self._target_units,
+            effect_modifiers=self._effect_modifier_names,
+            **self.method_params,
+        )
         # Perform the set number of simulations
-        for index in range(num_bootstrap_simulations):
-            new_data = resample(self._data, n_samples=sample_size)
-            new_estimator = type(self)(
-                new_data,
-                self._target_estimand,
-                self._target_estimand.treatment_variable,
-                self._target_estimand.outcome_variable,
-                # names of treatment and outcome
-                treatment_value=self._treatment_value,
-                control_value=self._control_value,
-                test_significance=False,
-                evaluate_effect_strength=False,
-                confidence_intervals=False,
-                target_units=self._target_units,
-                effect_modifiers=self._effect_modifier_names,
-                **self.method_params,
+        if weighted_bootstrap and effective_n_jobs(n_jobs) == 1:
+            new_effects = [
+                _estimate_effect_with_bootstrap_weights(self, weighted_bootstrap, sample_size, random_seed)
+                for random_seed in random_seeds
+            ]
+        elif weighted_bootstrap:
+            # Every worker builds one estimator on the shared data for its batch of simulations
+            new_effects = Parallel(n_jobs=n_jobs)(
+                delayed(_estimate_effects_with_bootstrap_weights)(
+                    type(self), data, self._target_estimand, estimator_params, weighted_bootstrap, sample_size, seeds
+                )
+                for seeds in np.array_split(random_seeds, effective_n_jobs(n_jobs))
             )
-            new_effect = new_estimator.estimate_effect()
-            simulation_results[index] = new_effect.value
+            new_effects = [new_effect for batch_effects in new_effects for new_effect in batch_effects]
+        else:
+            new_effects = Parallel(n_jobs=n_jobs)(
+                delayed(_estimate_effect_on_bootstrap_sample)(
+                    type(self), data, self._target_estimand, estimator_params, sample_size, random_seed
+                )
+                for random_seed in random_seeds
+            )
+        for index, new_effect in enumerate(new_effects):
+            simulation_results[index] = new_effect
 
         estimates = CausalEstimator.BootstrapEstimates(
             simulation_results,
-            {"num_simulations": num_bootstrap_simulations, "sample_size_fraction": sample_size_fraction},
+            {
+                "num_simulations": num_bootstrap_simulations,
+                "sample_size_fraction": sample_size_fraction,
+                "weighted_bootstrap": weighted_bootstrap,
+            },
         )
         return estimates
 
+    def _estimate_effect_with_sample_weights(self, sample_weights):
+        """Estimates the effect when every unit of the data is weighted by the given (non-negative) frequency weights.
+        This is used by the weighted bootstrap, which avoids creating resampled copies of the data.
+
+        This method is to be overriden by the child classes that support sample weights. It should not modify the
+        state of the estimator.
+
+        :param sample_weights: Numpy array with one weight per row of the data.
+        :returns: The value of the effect estimate.
+        """
+        raise NotImplementedError(
+            (
+                "Weighted bootstrap is "
+                + CausalEstimator.DEFAULT_NOTIMPLEMENTEDERROR_MSG
+                + " Meanwhile, you can use the standard bootstrap (weighted_bootstrap=False)."
+            ).format(self.__class__)
+        )
+
     def _estimate_confidence_intervals_with_bootstrap(
-        self, estimate_value, confidence_level=None, num_simulations=None, sample_size_fraction=None
+        self,
+        estimate_value,
+        confidence_level=None,
+        num_simulations=None,
+        sample_size_fraction=None,
+        n_jobs=None,
+        weighted_bootstrap=False,
     ):
         """
         Method to compute confidence interval using bootstrapped sampling.
@@ -358,6 +440,8 @@ class CausalEstimator:
         :param confidence_level: The level for which to compute CI (e.g., 95% confidence level translates to confidence_level=0.95)
         :param num_simulations: The number of simulations to be performed to get the bootstrap confidence intervals.
         :param sample_size_fraction: The fraction of the dataset to be resampled.
+        :param n_jobs: The maximum number of concurrently running bootstrap simulations. If None, the n_jobs parameter of the estimator is used.
+        :param weighted_bootstrap: If False, the data is resampled in every simulation. Otherwise, the type of random frequency weights ("multinomial", "poisson" or "bayesian") that are used instead of resampling. This is only supported by estimators that implement _estimate_effect_with_sample_weights.
         :returns: confidence interval at the specified level.
 
         For more details on bootstrap or resampling statistics, refer to the following links:
@@ -372,10 +456,14 @@ class CausalEstimator:
 
         # Checking if bootstrap_estimates are already computed
         if self._bootstrap_estimates is None:
-            self._bootstrap_estimates = self._generate_bootstrap_estimates(num_simulations, sample_size_fraction)
+            self._bootstrap_estimates = self._generate_bootstrap_estimates(
+                num_simulations, sample_size_fraction, n_jobs, weighted_bootstrap
+            )
         elif CausalEstimator.is_bootstrap_parameter_changed(self._bootstrap_estimates.params, locals()):
             # Checked if any parameter is changed from the previous std error estimate
-            self._bootstrap_estimates = self._generate_bootstrap_estimates(num_simulations, sample_size_fraction)
+            self._bootstrap_estimates = self._generate_bootstrap_estimates(
+                num_simulations, sample_size_fraction, n_jobs, weighted_bootstrap
+            )
         # Now use the data obtained from the simulations to get the value of the confidence estimates
         bootstrap_estimates = self._bootstrap_estimates.estimates
         # Get the variations of each bootstrap estimate and sort
@@ -442,13 +530,17 @@ class CausalEstimator:
                 confidence_intervals = self._estimate_confidence_intervals(confidence_level, method=method, **kwargs)
         return confidence_intervals
 
-    def _estimate_std_error_with_bootstrap(self, num_simulations=None, sample_size_fraction=None):
+    def _estimate_std_error_with_bootstrap(
+        self, num_simulations=None, sample_size_fraction=None, n_jobs=None, weighted_bootstrap=False
+    ):
         """Compute standard error using the bootstrap method. Standard error
         and confidence intervals use the same parameter num_simulations for
         the number of bootstrap simulations.
 
         :param num_simulations: Number of bootstrapped samples.
         :param sample_size_fraction: Fraction of data to be resampled.
+        :param n_jobs: The maximum number of concurrently running bootstrap simulations. If None, the n_jobs parameter of the estimator is used.
+        :param weighted_bootstrap: If False, the data is resampled in every simulation. Otherwise, the type of random frequency weights ("multinomial", "poisson" or "bayesian") that are used instead of resampling.
         :returns: Standard error of the obtained estimate.
         """
         # Use existing params, if new user defined params are not present
@@ -458,10 +550,14 @@ class CausalEstimator:
             sample_size_fraction = self.sample_size_fraction
         # Checking if bootstrap_estimates are already computed
         if self._bootstrap_estimates is None:
-            self._bootstrap_estimates = self._generate_bootstrap_estimates(num_simulations, sample_size_fraction)
+            self._bootstrap_estimates = self._generate_bootstrap_estimates(
+                num_simulations, sample_size_fraction, n_jobs, weighted_bootstrap
+            )
         elif CausalEstimator.is_bootstrap_parameter_changed(self._bootstrap_estimates.params, locals()):
             # Check if any parameter is changed from the previous std error estimate
-            self._bootstrap_estimates = self._generate_bootstrap_estimates(num_simulations, sample_size_fraction)
+            self._bootstrap_estimates = self._generate_bootstrap_estimates(
+                num_simulations, sample_size_fraction, n_jobs, weighted_bootstrap
+            )
 
         std_error = np.std(self._bootstrap_estimates.estimates)
         return std_error
@@ -505,64 +601,126 @@ class CausalEstimator:
                 std_error = self._estimate_std_error(method, **kwargs)
         return std_error
 
-    def _test_significance_with_bootstrap(self, estimate_value, num_null_simulations=None):
+    def _test_significance_with_bootstrap(
+        self, estimate_value, num_null_simulations=None, n_jobs=None, max_num_exceedances=None
+    ):
         """Test statistical significance of an estimate using the bootstrap method.
 
+        The null distribution is simulated by permuting the outcome. Only the outcome vector is permuted, and the
+        estimator evaluates each permutation through _estimate_effect_with_outcome, which lets child classes reuse
+        everything that does not depend on the outcome (e.g. design matrices or propensity scores). The permutations are
+        drawn from numpy's global random state before they are sent to the jobs. Hence, the results are reproducible
+        regardless of the number of parallel jobs.
+
+        If max_num_exceedances is given, the simulations stop early following the sequential procedure by Besag and
+        Clifford (1991): As soon as that many null estimates are at least as extreme as the obtained estimate, the
+        estimate is clearly not significant and the p-value is given by max_num_exceedances divided by the number of
+        simulations so far. Otherwise, all simulations are run.
+
         :param estimate_value: Obtained estimate's value
         :param num_null_simulations: Number of simulations for the null hypothesis
+        :param n_jobs: The maximum number of concurrently running jobs. If None, the n_jobs parameter of the estimator is used.
+        :param max_num_exceedances: Number of null estimates that are at least as extreme as the obtained estimate after which the simulations are stopped. If None, no early stopping is done.
         :returns: p-value of the statistical significance test.
         """
         # Use existing params, if new user defined params are not present
         if num_null_simulations is None:
             num_null_simulations = self.num_null_simulations
+        if n_jobs is None:
+            n_jobs = self.n_jobs
         do_retest = self._bootstrap_null_estimates is None or CausalEstimator.is_bootstrap_parameter_changed(
             self._bootstrap_null_estimates.params, locals()
         )
         if do_retest:
-            null_estimates = np.zeros(num_null_simulations)
-            for i in range(num_null_simulations):
-                new_outcome = np.random.permutation(self._outcome)
-                new_data = self._data.assign(dummy_outcome=new_outcome)
-                # self._outcome = self._data["dummy_outcome"]
-                new_estimator = type(self)(
-                    new_data,
-                    self._target_estimand,
-                    self._target_estimand.treatment_variable,
-                    ("dummy_outcome",),
-                    test_significance=False,
-                    evaluate_effect_strength=False,
-                    confidence_intervals=False,
-                    target_units=self._target_units,
-                    effect_modifiers=self._effect_modifier_names,
-                    **self.method_params,
-                )
-                new_effect = new_estimator.estimate_effect()
-                null_estimates[i] = new_effect.value
+            outcome = np.ravel(self._outcome.to_numpy())
+            # The early stopping is evaluated after every batch. The batch size does not depend on the number of jobs,
+            # such that the stopping point is reproducible as well.
+            batch_size = (
+                num_null_simulations
+                if max_num_exceedances is None
+                else max(CausalEstimator.NULL_SIMULATIONS_BATCH_SIZE, max_num_exceedances)
+            )
+            null_estimates = np.zeros(0)
+            with Parallel(n_jobs=n_jobs) as parallel:
+                for start in range(0, num_null_simulations, batch_size):
+                    new_effects = parallel(
+                        delayed(self._estimate_effect_with_outcome)(np.random.permutation(outcome))
+                        for _ in range(start, min(start + batch_size, num_null_simulations))
+                    )
+                    null_estimates = np.concatenate([null_estimates, new_effects])
+                    if max_num_exceedances is not None:
+                        num_simulations = _num_simulations_until_exceedances(
+                            null_estimates, estimate_value, max_num_exceedances
+                        )
+                        if num_simulations is not None:
+                            # Discard the simulations of the batch after the stopping point
+                            null_estimates = null_estimates[:num_simulations]
+                            break
             self._bootstrap_null_estimates = CausalEstimator.BootstrapEstimates(
-                null_estimates, {"num_null_simulations": num_null_simulations, "sample_size_fraction": 1}
+                null_estimates,
+                {
+                    "num_null_simulations": num_null_simulations,
+                    "sample_size_fraction": 1,
+                    "max_num_exceedances": max_num_exceedances,
+                },
             )
 
+        null_estimates = self._bootstrap_null_estimates.estimates
+        self.logger.debug("Null estimates: {0}".format(np.sort(null_estimates)))
+        if max_num_exceedances is not None:
+            num_simulations = _num_simulations_until_exceedances(null_estimates, estimate_value, max_num_exceedances)
+            if num_simulations is not None:
+                self.logger.info("INFO: Stopped the significance test after {} simulations".format(num_simulations))
+                return {"p_value": max_num_exceedances / num_simulations}
+
         # Processing the null hypothesis estimates
-        sorted_null_estimates = np.sort(self._bootstrap_null_estimates.estimates)
-        self.logger.debug("Null estimates: {0}".format(sorted_null_estimates))
-        median_estimate = sorted_null_estimates[int(num_null_simulations / 2)]
+        sorted_null_estimates = np.sort(null_estimates)
+        num_simulations = len(sorted_null_estimates)
+        median_estimate = sorted_null_estimates[int(num_simulations / 2)]
         # Doing a two-sided test
         if estimate_value > median_estimate:
             # Being conservative with the p-value reported
             estimate_index = np.searchsorted(sorted_null_estimates, estimate_value, side="left")
-            p_value = 1 - (estimate_index / num_null_simulations)
+            p_value = 1 - (estimate_index / num_simulations)
         if estimate_value <= median_estimate:
             # Being conservative with the p-value reported
             estimate_index = np.searchsorted(sorted_null_estimates, estimate_value, side="right")
-            p_value = estimate_index / num_null_simulations
+            p_value = estimate_index / num_simulations
         # If the estimate_index is 0, it depends on the number of simulations
         if p_value == 0:
-            p_value = (0, 1 / len(sorted_null_estimates))  # a tuple determining the range.
+            p_value = (0, 1 / num_simulations)  # a tuple determining the range.
         elif p_value == 1:
-            p_value = (1 - 1 / len(sorted_null_estimates), 1)
+            p_value = (1 - 1 / num_simulations, 1)
         signif_dict = {"p_value": p_value}
         return signif_dict
 
+    def _estimate_effect_with_outcome(self, outcome):
+        """Estimates the effect when the observed outcome is replaced by the given values, e.g. a permutation of the
+        outcome for the significance test.
+
+        By default, a new estimator is fitted on a copy of the data with the new outcome. Child classes can override
+        this to reuse everything that does not depend on the outcome. It should not modify the state of the estimator.
+
+        :param outcome: Numpy array with one outcome value per row of the data.
+        :returns: The value of the effect estimate.
+        """
+        new_data = self._data.assign(dummy_outcome=outcome)
+        new_estimator = type(self)(
+            new_data,
+            self._target_estimand,
+            self._target_estimand.treatment_variable,
+            ("dummy_outcome",),
+            control_value=self._control_value,
+            treatment_value=self._treatment_value,
+            test_significance=False,
+            evaluate_effect_strength=False,
+            confidence_intervals=False,
+            target_units=self._target_units,
+            effect_modifiers=self._effect_modifier_names,
+            **self.method_params,
+        )
+        return new_estimator.estimate_effect().value
+
     def _test_significance(self, estimate_value, method=None, **kwargs):
         """
         This method is to be overriden by the child classes, so that they
@@ -685,6 +843,70 @@ class CausalEstimator:
         return s
 
 
+def _estimate_effect_with_bootstrap_weights(estimator, weighted_bootstrap, sample_size, random_seed):
+    """Estimates the effect with random frequency weights of the given type instead of resampling the data."""
+    random_state = np.random.RandomState(random_seed)
+    num_units = len(estimator._data)
+    if weighted_bootstrap == "multinomial":
+        sample_weights = random_state.multinomial(sample_size, np.full(num_units, 1 / num_units)).astype(float)
+    elif weighted_bootstrap == "poisson":
+        sample_weights = random_state.poisson(sample_size / num_units, size=num_units).astype(float)
+    else:
+        # Normalized standard exponential variables follow a flat Dirichlet distribution. Scaling them by the number of
+        # units keeps the weights on the same scale as frequency weights.
+        sample_weights = random_state.standard_exponential(num_units)
+        sample_weights *= num_units / np.sum(sample_weights)
+    return estimator._estimate_effect_with_sample_weights(sample_weights)
+
+
+def _estimate_effects_with_bootstrap_weights(
+    estimator_class, data, identified_estimand, estimator_params, weighted_bootstrap, sample_size, random_seeds
+):
+    """Estimates the effect with random frequency weights for each of the given random seeds. The estimator is built
+    once on the data, which is a SharedDataFrame, instead of sending the fitted estimator to every parallel task."""
+    estimator = estimator_class(
+        data.view(),
+        identified_estimand,
+        identified_estimand.treatment_variable,
+        identified_estimand.outcome_variable,
+        **estimator_params,
+    )
+    return [
+        _estimate_effect_with_bootstrap_weights(estimator, weighted_bootstrap, sample_size, random_seed)
+        for random_seed in random_seeds
+    ]
+
+
+def _num_simulations_until_exceedances(null_estimates, estimate_value, max_num_exceedances):
+    """Returns the number of simulations after which max_num_exceedances of the null estimates were at least as extreme
+    as the estimate (on the side of the median of the null estimates), or None if that did not happen."""
+    if estimate_value > np.median(null_estimates):
+        is_exceedance = null_estimates >= estimate_value
+    else:
+        is_exceedance = null_estimates <= estimate_value
+    num_exceedances = np.cumsum(is_exceedance)
+    if num_exceedances[-1] < max_num_exceedances:
+        return None
+    return int(np.searchsorted(num_exceedances, max_num_exceedances)) + 1
+
+
+def _estimate_effect_on_bootstrap_sample(
+    estimator_class, data, identified_estimand, estimator_params, sample_size, random_seed
+):
+    """Estimates the effect on a bootstrap sample of the given data. The data can either be a DataFrame or a
+    SharedDataFrame."""
+    indices = np.random.RandomState(random_seed).randint(0, len(data), size=sample_size)
+    new_estimator = estimator_class(
+        data.take(indices),
+        identified_estimand,
+        identified_estimand.treatment_variable,
+        identified_estimand.outcome_variable,
+        # names of treatment and outcome
+        **estimator_params,
+    )
+    return new_estimator.estimate_effect().value
+
+
 def estimate_effect(
     treatment: Union[str, List[str]],
     outcome: Union[str, List[str]],
@@ -1,8 +1,15 @@
 import numpy as np
 import pandas as pd
-from sklearn.neighbors import NearestNeighbors
 
 from dowhy.causal_estimator import CausalEstimate, CausalEstimator
+from dowhy.utils.matching import (
+    build_match_table,
+    compute_matched_differences,
+    estimate_matched_effect,
+    evaluate_neighbor_search,
+    find_matches,
+    find_matches_within_groups,
+)
 
 
 class DistanceMatchingEstimator(CausalEstimator):
@@ -19,14 +26,43 @@ class DistanceMatchingEstimator(CausalEstimator):
     # allowed types of distance metric
     Valid_Dist_Metric_Params = ["p", "V", "VI", "w"]
 
-    def __init__(self, *args, num_matches_per_unit=1, distance_metric="minkowski", exact_match_cols=None, **kwargs):
+    def __init__(
+        self,
+        *args,
+        num_matches_per_unit=1,
+        distance_metric="minkowski",
+        exact_match_cols=None,
+        caliper=None,
+        neighbor_search="ball_tree",
+        neighbor_search_params=None,
+        matching_n_jobs=1,
+        **kwargs,
+    ):
         """
         :param num_matches_per_unit: The number of matches per data point.
-            Default=1.
+            If None, all data points within the caliper are matched (radius
+            matching). Default=1.
         :param distance_metric: Distance metric to use. Default="minkowski"
             that corresponds to Euclidean distance metric with p=2.
         :param exact_match_cols: List of column names whose values should be
         exactly matched. Typically used for columns with discrete values.
+        The number of matched units and the effect per group of exact-match
+        values are returned in the exact_match_groups attribute of the
+        estimate.
+        :param caliper: Maximum distance of matched data points. Data points
+            without any match within the caliper are excluded from the
+            estimate. If None, the distance is not restricted. Default=None.
+        :param neighbor_search: Method for finding the nearest neighbors,
+            one of "ball_tree", "kd_tree", "brute" (exact search with chunked
+            matrix products, usually the fastest exact method for many
+            confounders) or "approximate" (approximate search on a nearest
+            neighbor graph). Use evaluate_neighbor_search to compare the
+            latency and recall of the methods. Default="ball_tree".
+        :param neighbor_search_params: Dictionary of additional parameters of
+            the neighbor search method, e.g. the beam_width of the approximate
+            search. See dowhy.utils.matching.NeighborGraph. Default=None.
+        :param matching_n_jobs: The maximum number of concurrently running
+            jobs for the neighbor search. If -1 all CPUs are used. Default=1.
 
         """
         # Required to ensure that self.method_params contains all the
@@ -47,6 +83,10 @@ class DistanceMatchingEstimator(CausalEstimator):
         self.num_matches_per_unit = num_matches_per_unit
         self.distance_metric = distance_metric
         self.exact_match_cols = exact_match_cols
+        self.caliper = caliper
+        self.neighbor_search = neighbor_search
+        self.neighbor_search_params = neighbor_search_params or {}
+        self.matching_n_jobs = matching_n_jobs
 
         self.logger.debug("Back-door variables used:" + ",".join(self._target_estimand.get_backdoor_variables()))
 
@@ -83,122 +123,80 @@ class DistanceMatchingEstimator(CausalEstimator):
 
     def _estimate_effect(self):
         # this assumes a binary treatment regime
-        updated_df = pd.concat(
-            [self._observed_common_causes, self._data[[self._outcome_name, self._treatment_name[0]]]], axis=1
-        )
-        if self.exact_match_cols is not None:
-            updated_df = pd.concat([updated_df, self._data[self.exact_match_cols]], axis=1)
-        treated = updated_df.loc[self._data[self._treatment_name[0]] == 1]
-        control = updated_df.loc[self._data[self._treatment_name[0]] == 0]
-        numtreatedunits = treated.shape[0]
-        numcontrolunits = control.shape[0]
-
-        fit_att, fit_atc = False, False
-        est = None
-        # TODO remove neighbors that are more than a given radius apart
-        if self._target_units == "att":
-            fit_att = True
-        elif self._target_units == "atc":
-            fit_atc = True
-        elif self._target_units == "ate":
-            fit_att = True
-            fit_atc = True
-        else:
+        is_treated = self._data[self._treatment_name[0]].to_numpy() == 1
+        features = self._observed_common_causes.to_numpy().astype(float)
+        outcomes = self._data[self._outcome_name].to_numpy().astype(float)
+        treated_index = self._data.index[is_treated]
+        control_index = self._data.index[~is_treated]
+
+        if self._target_units not in ("att", "atc", "ate"):
             raise ValueError("Target units string value not supported")
 
-        if fit_att:
-            # estimate ATT on treated by summing over difference between matched neighbors
-            if self.exact_match_cols is None:
-                control_neighbors = NearestNeighbors(
-                    n_neighbors=self.num_matches_per_unit,
-                    metric=self.distance_metric,
-                    algorithm="ball_tree",
-                    **self.distance_metric_params,
-                ).fit(control[self._observed_common_causes.columns].values)
-                distances, indices = control_neighbors.kneighbors(treated[self._observed_common_causes.columns].values)
-                self.logger.debug("distances:")
-                self.logger.debug(distances)
-
-                att = 0
-
-                for i in range(numtreatedunits):
-                    treated_outcome = treated.iloc[i][self._outcome_name].item()
-                    control_outcome = np.mean(control.iloc[indices[i]][self._outcome_name].values)
-                    att += treated_outcome - control_outcome
-
-                att /= numtreatedunits
-                if self._target_units == "att":
-                    est = att
-                elif self._target_units == "ate":
-                    est = att * numtreatedunits
-
-                # Return indices in the original dataframe
-                self.matched_indices_att = {}
-                treated_df_index = treated.index.tolist()
-                for i in range(numtreatedunits):
-                    self.matched_indices_att[treated_df_index[i]] = control.iloc[indices[i]].index.tolist()
-            else:
-                grouped = updated_df.groupby(self.exact_match_cols)
-                att = 0
-                for name, group in grouped:
-                    treated = group.loc[group[self._treatment_name[0]] == 1]
-                    control = group.loc[group[self._treatment_name[0]] == 0]
-                    if treated.shape[0] == 0:
-                        continue
-                    control_neighbors = NearestNeighbors(
-                        n_neighbors=self.num_matches_per_unit,
-                        metric=self.distance_metric,
-                        algorithm="ball_tree",
-                        **self.distance_metric_params,
-                    ).fit(control[self._observed_common_causes.columns].values)
-                    distances, indices = control_neighbors.kneighbors(
-                        treated[self._observed_common_causes.columns].values
-                    )
-                    self.logger.debug("distances:")
-                    self.logger.debug(distances)
-
-                    for i in range(numtreatedunits):
-                        treated_outcome = treated.iloc[i][self._outcome_name].item()
-                        control_outcome = np.mean(control.iloc[indices[i]][self._outcome_name].values)
-                        att += treated_outcome - control_outcome
-                        # self.matched_indices_att[treated_df_index[i]] = control.iloc[indices[i]].index.tolist()
-
-                att /= numtreatedunits
-
-                if self._target_units == "att":
-                    est = att
-                elif self._target_units == "ate":
-                    est = att * numtreatedunits
-
-        if fit_atc:
-            # Now computing ATC
-            treated_neighbors = NearestNeighbors(
-                n_neighbors=self.num_matches_per_unit,
-                metric=self.distance_metric,
-                algorithm="ball_tree",
-                **self.distance_metric_params,
-            ).fit(treated[self._observed_common_causes.columns].values)
-            distances, indices = treated_neighbors.kneighbors(control[self._observed_common_causes.columns].values)
-
-            atc = 0
-            for i in range(numcontrolunits):
-                control_outcome = control.iloc[i][self._outcome_name].item()
-                treated_outcome = np.mean(treated.iloc[indices[i]][self._outcome_name].values)
-                atc += treated_outcome - control_outcome
-
-            atc /= numcontrolunits
-
-            if self._target_units == "atc":
-                est = atc
-            elif self._target_units == "ate":
-                est += atc * numcontrolunits
-                est /= numtreatedunits + numcontrolunits
+        group_codes, group_diagnostics = None, None
+        if self.exact_match_cols is not None:
+            # Units are only matched within the groups of identical values of the exact-match columns. Diagnostics
+            # about the matching are collected per group.
+            grouped = self._data.groupby(self.exact_match_cols)
+            group_codes = grouped.ngroup().to_numpy()
+            group_diagnostics = pd.DataFrame(
+                {
+                    "num_treated_units": np.bincount(
+                        group_codes[is_treated & (group_codes >= 0)], minlength=grouped.ngroups
+                    ),
+                    "num_control_units": np.bincount(
+                        group_codes[~is_treated & (group_codes >= 0)], minlength=grouped.ngroups
+                    ),
+                },
+                index=grouped.size().index,
+            )
+
+        att, num_matched_treated_units = 0, 0
+        if self._target_units in ("att", "ate"):
+            # estimate ATT on treated by averaging over differences between matched neighbors
+            treated_positions, control_positions = self._find_matches(is_treated, features, group_codes)
+            att, num_matched_treated_units = estimate_matched_effect(
+                outcomes[is_treated], outcomes[~is_treated], treated_positions, control_positions
+            )
+            # Return indices in the original dataframe
+            self.matched_indices_att = build_match_table(
+                treated_index, control_index, treated_positions, control_positions
+            )
+            if group_codes is not None:
+                differences = compute_matched_differences(
+                    outcomes[is_treated], outcomes[~is_treated], treated_positions, control_positions
+                )
+                group_diagnostics["num_matched_treated_units"], group_diagnostics["att"] = _summarize_groups(
+                    differences, group_codes[is_treated], len(group_diagnostics)
+                )
 
+        atc, num_matched_control_units = 0, 0
+        if self._target_units in ("atc", "ate"):
+            # Now computing ATC
+            control_positions, treated_positions = self._find_matches(~is_treated, features, group_codes)
+            control_effect, num_matched_control_units = estimate_matched_effect(
+                outcomes[~is_treated], outcomes[is_treated], control_positions, treated_positions
+            )
+            atc = -control_effect
             # Return indices in the original dataframe
-            self.matched_indices_atc = {}
-            control_df_index = control.index.tolist()
-            for i in range(numcontrolunits):
-                self.matched_indices_atc[control_df_index[i]] = treated.iloc[indices[i]].index.tolist()
+            self.matched_indices_atc = build_match_table(
+                control_index, treated_index, control_positions, treated_positions
+            )
+            if group_codes is not None:
+                differences = -compute_matched_differences(
+                    outcomes[~is_treated], outcomes[is_treated], control_positions, treated_positions
+                )
+                group_diagnostics["num_matched_control_units"], group_diagnostics["atc"] = _summarize_groups(
+                    differences, group_codes[~is_treated], len(group_diagnostics)
+                )
+
+        if self._target_units == "att":
+            est = att
+        elif self._target_units == "atc":
+            est = atc
+        else:
+            est = (att * num_matched_treated_units + atc * num_matched_control_units) / (
+                num_matched_treated_units + num_matched_control_units
+            )
 
         estimate = CausalEstimate(
             estimate=est,
@@ -206,11 +204,66 @@ class DistanceMatchingEstimator(CausalEstimator):
             treatment_value=self._treatment_value,
             target_estimand=self._target_estimand,
             realized_estimand_expr=self.symbolic_estimator,
+            exact_match_groups=group_diagnostics,
         )
         return estimate
 
+    def _find_matches(self, is_query, features, group_codes=None):
+        """Finds the matches of the units selected by is_query among the other units. If group codes are given, the
+        units are only matched within their group."""
+        matching_params = dict(
+            num_matches=self.num_matches_per_unit,
+            caliper=self.caliper,
+            n_jobs=self.matching_n_jobs,
+            method=self.neighbor_search,
+            metric=self.distance_metric,
+            **self.distance_metric_params,
+            **self.neighbor_search_params,
+        )
+        if group_codes is None:
+            return find_matches(features[~is_query], features[is_query], **matching_params)
+        else:
+            return find_matches_within_groups(
+                features[~is_query],
+                features[is_query],
+                group_codes[~is_query],
+                group_codes[is_query],
+                **matching_params,
+            )
+
+    def evaluate_neighbor_search(self, methods=None, num_evaluation_units=1000):
+        """Measures the latency and recall of neighbor search methods for matching the treated units of the data to
+        the control units, ignoring the exact-match columns.
+
+        :param methods: Dictionary from names to parameters of the evaluated methods, see
+            dowhy.utils.matching.evaluate_neighbor_search. If None, all methods are evaluated with their default
+            parameters.
+        :param num_evaluation_units: Number of sampled treated units for computing the recall.
+        :returns: A DataFrame with the seconds, microseconds per query and recall of every method.
+        """
+        is_treated = self._data[self._treatment_name[0]].to_numpy() == 1
+        features = self._observed_common_causes.to_numpy().astype(float)
+        return evaluate_neighbor_search(
+            features[~is_treated],
+            features[is_treated],
+            num_matches=self.num_matches_per_unit or 1,
+            methods=methods,
+            num_evaluation_units=num_evaluation_units,
+            metric=self.distance_metric,
+            **self.distance_metric_params,
+        )
+
     def construct_symbolic_estimator(self, estimand):
         expr = "b: " + ", ".join(estimand.outcome_variable) + "~"
         var_list = estimand.treatment_variable + estimand.get_backdoor_variables()
         expr += "+".join(var_list)
         return expr
+
+
+def _summarize_groups(differences, group_codes, num_groups):
+    """Returns the number of matched units and their mean difference per group."""
+    is_matched = ~np.isnan(differences) & (group_codes >= 0)
+    num_matched_units = np.bincount(group_codes[is_matched], minlength=num_groups)
+    sums_of_differences = np.bincount(group_codes[is_matched], weights=differences[is_matched], minlength=num_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return num_matched_units, sums_of_differences / num_matched_units
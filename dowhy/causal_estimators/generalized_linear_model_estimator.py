@@ -41,9 +41,11 @@ class GeneralizedLinearModelEstimator(RegressionEstimator):
         outcome_values = self._data[self._outcome_name].astype(int).unique()
         self.outcome_is_binary = all([v in [0, 1] for v in outcome_values])
 
-    def _build_model(self):
+    def _build_model(self, sample_weights=None, outcome=None):
         features = self._build_features()
-        model = sm.GLM(self._outcome, features, family=self.family).fit()
+        if outcome is None:
+            outcome = self._outcome
+        model = sm.GLM(outcome, features, family=self.family, freq_weights=sample_weights).fit()
         return (features, model)
 
     def predict_fn(self, model, features):
@@ -43,9 +43,14 @@ class LinearRegressionEstimator(RegressionEstimator):
     def predict_fn(self, model, features):
         return model.predict(features)
 
-    def _build_model(self):
+    def _build_model(self, sample_weights=None, outcome=None):
         features = self._build_features()
-        model = sm.OLS(self._outcome, features).fit()
+        if outcome is None:
+            outcome = self._outcome
+        if sample_weights is None:
+            model = sm.OLS(outcome, features).fit()
+        else:
+            model = sm.WLS(outcome, features, weights=sample_weights).fit()
         return (features, model)
 
     def _estimate_confidence_intervals(self, confidence_level, method=None):
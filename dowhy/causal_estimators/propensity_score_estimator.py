@@ -79,32 +79,34 @@ class PropensityScoreEstimator(CausalEstimator):
         A custom estimator based on the way the propensity score estimates are to be used.
         Invoked from the '_estimate_effect' method of various propensity score subclasses when the propensity score is not pre-computed.
         """
+        if self.recalculate_propensity_score is True or self.propensity_score_column not in self._data.columns:
+            self._data[self.propensity_score_column] = self._get_propensity_scores()
+        else:
+            self.logger.info(f"INFO: Using pre-computed propensity score in column {self.propensity_score_column}")
+
+    def _get_propensity_scores(self):
+        """Returns the propensity scores of the units as an array, without adding them to the data. The scores are
+        estimated with the propensity score model, unless recalculate_propensity_score is False and the data contains
+        pre-computed scores."""
         if self.recalculate_propensity_score is True:
             if self.propensity_score_model is None:
                 self.propensity_score_model = linear_model.LogisticRegression()
             treatment_reshaped = np.ravel(self._treatment)
             self.propensity_score_model.fit(self._observed_common_causes, treatment_reshaped)
-            self._data[self.propensity_score_column] = self.propensity_score_model.predict_proba(
-                self._observed_common_causes
-            )[:, 1]
-        else:
-            # check if user provides the propensity score column
-            if self.propensity_score_column not in self._data.columns:
-                if self.propensity_score_model is None:
-                    raise ValueError(
-                        f"""Propensity score column {self.propensity_score_column} does not exist, nor does a propensity_model. 
+            return self.propensity_score_model.predict_proba(self._observed_common_causes)[:, 1]
+        # check if user provides the propensity score column
+        if self.propensity_score_column in self._data.columns:
+            self.logger.info(f"INFO: Using pre-computed propensity score in column {self.propensity_score_column}")
+            return self._data[self.propensity_score_column].to_numpy()
+        if self.propensity_score_model is None:
+            raise ValueError(
+                f"""Propensity score column {self.propensity_score_column} does not exist, nor does a propensity_model. 
                     Please specify the column name that has your pre-computed propensity score, or a model to compute it."""
-                    )
-                else:
-                    try:
-                        self._data[self.propensity_score_column] = self.propensity_score_model.predict_proba(
-                            self._observed_common_causes
-                        )[:, 1]
-                    except NotFittedError:
-                        raise NotFittedError("Please fit the propensity score model before calling predict_proba")
-
-            else:
-                self.logger.info(f"INFO: Using pre-computed propensity score in column {self.propensity_score_column}")
+            )
+        try:
+            return self.propensity_score_model.predict_proba(self._observed_common_causes)[:, 1]
+        except NotFittedError:
+            raise NotFittedError("Please fit the propensity score model before calling predict_proba")
 
     def construct_symbolic_estimator(self, estimand):
         """
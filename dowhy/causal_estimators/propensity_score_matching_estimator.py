@@ -1,9 +1,6 @@
-import pandas as pd
-from sklearn import linear_model
-from sklearn.neighbors import NearestNeighbors
-
 from dowhy.causal_estimator import CausalEstimate
 from dowhy.causal_estimators.propensity_score_estimator import PropensityScoreEstimator
+from dowhy.utils.matching import estimate_matched_effect, find_matches
 
 
 class PropensityScoreMatchingEstimator(PropensityScoreEstimator):
@@ -22,12 +19,22 @@ class PropensityScoreMatchingEstimator(PropensityScoreEstimator):
     def __init__(
         self,
         *args,
+        num_matches_per_unit=1,
+        caliper=None,
         propensity_score_model=None,
         recalculate_propensity_score=True,
         propensity_score_column="propensity_score",
+        matching_n_jobs=1,
         **kwargs,
     ):
         """
+        :param num_matches_per_unit: The number of matches per unit. If
+            None, all units within the caliper are matched (radius matching).
+            Default=1.
+        :param caliper: Maximum difference of the propensity scores of
+            matched units. Units without any match within the caliper are
+            excluded from the estimate. If None, the distance is not
+            restricted. Default=None.
         :param propensity_score_model: Model used to compute propensity score.
             Can be any classification model that supports fit() and
             predict_proba() methods. If None, LogisticRegression is used.
@@ -36,68 +43,72 @@ class PropensityScoreMatchingEstimator(PropensityScoreEstimator):
             set this value to False. Default=True.
         :param propensity_score_column: Column name that stores the
             propensity score. Default='propensity_score'
+        :param matching_n_jobs: The maximum number of concurrently running
+            jobs for the search of matching units. If -1 all CPUs are used.
+            Default=1.
 
         """
-        super().__init__(
-            *args,
-            propensity_score_model=propensity_score_model,
-            recalculate_propensity_score=recalculate_propensity_score,
-            propensity_score_column=propensity_score_column,
-            **kwargs,
-        )
+        # Required to ensure that self.method_params contains all the information
+        # to create an object of this class
+        args_dict = {k: v for k, v in locals().items() if k not in type(self)._STD_INIT_ARGS}
+        args_dict.update(kwargs)
+        super().__init__(*args, **args_dict)
 
         self.logger.info("INFO: Using Propensity Score Matching Estimator")
         self.symbolic_estimator = self.construct_symbolic_estimator(self._target_estimand)
         self.logger.info(self.symbolic_estimator)
+        self.num_matches_per_unit = num_matches_per_unit
+        self.caliper = caliper
+        self.matching_n_jobs = matching_n_jobs
 
     def _estimate_effect(self):
         self._refresh_propensity_score()
 
         # this assumes a binary treatment regime
-        treated = self._data.loc[self._data[self._treatment_name[0]] == 1]
-        control = self._data.loc[self._data[self._treatment_name[0]] == 0]
+        is_treated = self._data[self._treatment_name[0]].to_numpy() == 1
+        propensity_scores = self._data[self.propensity_score_column].to_numpy().reshape(-1, 1)
+        outcomes = self._data[self._outcome_name].to_numpy().astype(float)
 
-        # TODO remove neighbors that are more than a given radius apart
-
-        # estimate ATT on treated by summing over difference between matched neighbors
-        control_neighbors = NearestNeighbors(n_neighbors=1, algorithm="ball_tree").fit(
-            control[self.propensity_score_column].values.reshape(-1, 1)
-        )
-        distances, indices = control_neighbors.kneighbors(treated[self.propensity_score_column].values.reshape(-1, 1))
-        self.logger.debug("distances:")
-        self.logger.debug(distances)
-
-        att = 0
-        numtreatedunits = treated.shape[0]
-        for i in range(numtreatedunits):
-            treated_outcome = treated.iloc[i][self._outcome_name].item()
-            control_outcome = control.iloc[indices[i]][self._outcome_name].item()
-            att += treated_outcome - control_outcome
-
-        att /= numtreatedunits
-
-        # Now computing ATC
-        treated_neighbors = NearestNeighbors(n_neighbors=1, algorithm="ball_tree").fit(
-            treated[self.propensity_score_column].values.reshape(-1, 1)
-        )
-        distances, indices = treated_neighbors.kneighbors(control[self.propensity_score_column].values.reshape(-1, 1))
-        atc = 0
-        numcontrolunits = control.shape[0]
-        for i in range(numcontrolunits):
-            control_outcome = control.iloc[i][self._outcome_name].item()
-            treated_outcome = treated.iloc[indices[i]][self._outcome_name].item()
-            atc += treated_outcome - control_outcome
+        if self._target_units not in ("att", "atc", "ate"):
+            raise ValueError("Target units string value not supported")
 
-        atc /= numcontrolunits
+        att, num_matched_treated_units = 0, 0
+        if self._target_units in ("att", "ate"):
+            # estimate ATT on treated by averaging over differences between matched neighbors
+            treated_positions, control_positions = find_matches(
+                propensity_scores[~is_treated],
+                propensity_scores[is_treated],
+                num_matches=self.num_matches_per_unit,
+                caliper=self.caliper,
+                n_jobs=self.matching_n_jobs,
+            )
+            att, num_matched_treated_units = estimate_matched_effect(
+                outcomes[is_treated], outcomes[~is_treated], treated_positions, control_positions
+            )
+
+        atc, num_matched_control_units = 0, 0
+        if self._target_units in ("atc", "ate"):
+            # Now computing ATC
+            control_positions, treated_positions = find_matches(
+                propensity_scores[is_treated],
+                propensity_scores[~is_treated],
+                num_matches=self.num_matches_per_unit,
+                caliper=self.caliper,
+                n_jobs=self.matching_n_jobs,
+            )
+            control_effect, num_matched_control_units = estimate_matched_effect(
+                outcomes[~is_treated], outcomes[is_treated], control_positions, treated_positions
+            )
+            atc = -control_effect
 
         if self._target_units == "att":
             est = att
         elif self._target_units == "atc":
             est = atc
-        elif self._target_units == "ate":
-            est = (att * numtreatedunits + atc * numcontrolunits) / (numtreatedunits + numcontrolunits)
         else:
-            raise ValueError("Target units string value not supported")
+            est = (att * num_matched_treated_units + atc * num_matched_control_units) / (
+                num_matched_treated_units + num_matched_control_units
+            )
 
         estimate = CausalEstimate(
             estimate=est,
@@ -1,4 +1,6 @@
+import numpy as np
 import pandas as pd
+from scipy.stats import rankdata
 from sklearn import linear_model
 
 from dowhy.causal_estimator import CausalEstimate
@@ -32,7 +34,9 @@ class PropensityScoreStratificationEstimator(PropensityScoreEstimator):
         :param num_strata: Number of bins by which data will be stratified.
             Default is automatically determined.
         :param clipping_threshold: Mininum number of treated or control units
-            per strata. Default=10
+            per strata. Default=10. The number of treated and control units
+            and the effect of the strata that are included in the analysis are
+            returned in the strata attribute of the estimate.
         :param propensity_score_model: The model used to compute propensity
             score. Can be any classification model that supports fit() and
             predict_proba() methods. If None, use
@@ -66,82 +70,61 @@ class PropensityScoreStratificationEstimator(PropensityScoreEstimator):
     def _estimate_effect(self):
         self._refresh_propensity_score()
 
-        clipped = None
+        treatment = self._data[self._treatment_name[0]].to_numpy().astype(float)
+        outcome = self._data[self._outcome_name].to_numpy().astype(float)
+        # The propensity scores are ranked (i.e. sorted) only once. The strata for any number of strata follow from
+        # the relative ranks.
+        relative_ranks = rankdata(self._data[self.propensity_score_column].to_numpy()) / treatment.shape[0]
+
         # Infer the right strata based on clipping threshold
         if self.num_strata == "auto":
             # 0.5 because there are two values for the treatment
-            clipping_t = self.clipping_threshold
-            num_strata = 0.5 * self._data.shape[0] / clipping_t
+            num_strata = 0.5 * treatment.shape[0] / self.clipping_threshold
             # To be conservative and allow most strata to be included in the
             # analysis
-            strata_found = False
-            while not strata_found:
+            while True:
                 self.logger.info("'num_strata' selected as {}".format(num_strata))
-                try:
-                    clipped = self._get_strata(num_strata, self.clipping_threshold)
-                    num_ret_strata = clipped.groupby(["strata"]).count().reset_index()
-                    # At least 90% of the strata should be included in analysis
-                    if num_ret_strata.shape[0] >= 0.5 * num_strata:
-                        strata_found = True
-                    else:
-                        num_strata = int(num_strata / 2)
-                        self.logger.info(
-                            f"Less than half the strata have at least {self.clipping_threshold} data points. Selecting fewer number of strata."
-                        )
-                        if num_strata < 2:
-                            raise ValueError(
-                                "Not enough data to generate at least two strata. This error may be due to a high value of 'clipping_threshold'."
-                            )
-                except ValueError:
-                    self.logger.info(
-                        "No strata found with at least {} data points. Selecting fewer number of strata".format(
-                            self.clipping_threshold
-                        )
+                strata, strata_statistics = self._get_strata(relative_ranks, treatment, outcome, num_strata)
+                # At least half of the strata should be included in analysis
+                if strata_statistics.shape[0] >= 0.5 * num_strata:
+                    break
+                num_strata = int(num_strata / 2)
+                self.logger.info(
+                    f"Less than half the strata have more than {self.clipping_threshold} treated and control units. Selecting fewer number of strata."
+                )
+                if num_strata < 2:
+                    raise ValueError(
+                        "Not enough data to generate at least two strata. This error may be due to a high value of 'clipping_threshold'."
                     )
-                    num_strata = int(num_strata / 2)
-                    if num_strata < 2:
-                        raise ValueError(
-                            "Not enough data to generate at least two strata. This error may be due to a high value of 'clipping_threshold'."
-                        )
         else:
-            clipped = self._get_strata(self.num_strata, self.clipping_threshold)
+            strata, strata_statistics = self._get_strata(relative_ranks, treatment, outcome, self.num_strata)
+            if strata_statistics.empty:
+                raise ValueError(
+                    "Method requires strata with number of data points per treatment > clipping_threshold (={0}). No such strata exists. Consider decreasing 'num_strata' or 'clipping_threshold' parameters.".format(
+                        self.clipping_threshold
+                    )
+                )
+        # The strata are used by the PropensityBalanceInterpreter
+        self._data["strata"] = strata
 
-        # sum weighted outcomes over all strata  (weight by treated population)
-        weighted_outcomes = clipped.groupby("strata").agg(
-            {self._treatment_name[0]: ["sum"], "dbar": ["sum"], "d_y": ["sum"], "dbar_y": ["sum"]}
-        )
-        weighted_outcomes.columns = ["_".join(x) for x in weighted_outcomes.columns.to_numpy().ravel()]
-        treatment_sum_name = self._treatment_name[0] + "_sum"
-        control_sum_name = "dbar_sum"
-
-        weighted_outcomes["d_y_mean"] = weighted_outcomes["d_y_sum"] / weighted_outcomes[treatment_sum_name]
-        weighted_outcomes["dbar_y_mean"] = weighted_outcomes["dbar_y_sum"] / weighted_outcomes["dbar_sum"]
-        weighted_outcomes["effect"] = weighted_outcomes["d_y_mean"] - weighted_outcomes["dbar_y_mean"]
-        total_treatment_population = weighted_outcomes[treatment_sum_name].sum()
-        total_control_population = weighted_outcomes[control_sum_name].sum()
-        total_population = total_treatment_population + total_control_population
+        num_treated_units = strata_statistics["num_treated_units"]
+        num_control_units = strata_statistics["num_control_units"]
         self.logger.debug(
             "Total number of data points is {0}, including {1} from treatment and {2} from control.".format(
-                total_population, total_treatment_population, total_control_population
+                num_treated_units.sum() + num_control_units.sum(), num_treated_units.sum(), num_control_units.sum()
             )
         )
 
+        # average the effects over all strata (weighted by the population of the target units)
         if self._target_units == "att":
-            est = (
-                weighted_outcomes["effect"] * weighted_outcomes[treatment_sum_name]
-            ).sum() / total_treatment_population
+            est = np.average(strata_statistics["effect"], weights=num_treated_units)
         elif self._target_units == "atc":
-            est = (weighted_outcomes["effect"] * weighted_outcomes[control_sum_name]).sum() / total_control_population
+            est = np.average(strata_statistics["effect"], weights=num_control_units)
         elif self._target_units == "ate":
-            est = (
-                weighted_outcomes["effect"]
-                * (weighted_outcomes[control_sum_name] + weighted_outcomes[treatment_sum_name])
-            ).sum() / total_population
+            est = np.average(strata_statistics["effect"], weights=num_treated_units + num_control_units)
         else:
             raise ValueError("Target units string value not supported")
 
-        # TODO - how can we add additional information into the returned estimate?
-        #        such as how much clipping was done, or per-strata info for debugging?
         estimate = CausalEstimate(
             estimate=est,
             control_value=self._control_value,
@@ -149,42 +132,45 @@ class PropensityScoreStratificationEstimator(PropensityScoreEstimator):
             target_estimand=self._target_estimand,
             realized_estimand_expr=self.symbolic_estimator,
             propensity_scores=self._data[self.propensity_score_column],
+            strata=strata_statistics,
         )
         return estimate
 
-    def _get_strata(self, num_strata, clipping_threshold):
-        # sort the dataframe by propensity score
-        # create a column 'strata' for each element that marks what strata it belongs to
-        num_rows = self._data[self._outcome_name].shape[0]
-        self._data["strata"] = (
-            (self._data[self.propensity_score_column].rank(ascending=True) / num_rows) * num_strata
-        ).round(0)
-        # for each strata, count how many treated and control units there are
-        # throw away strata that have insufficient treatment or control
+    def _get_strata(self, relative_ranks, treatment, outcome, num_strata):
+        """Assigns every unit to a stratum of its propensity score and computes the number of treated and control units
+        and the effect of every stratum with more than clipping_threshold treated and control units.
 
-        self._data["dbar"] = 1 - self._data[self._treatment_name[0]]  # 1-Treatment
-        self._data["d_y"] = self._data[self._treatment_name[0]] * self._data[self._outcome_name]
-        self._data["dbar_y"] = self._data["dbar"] * self._data[self._outcome_name]
-        stratified = self._data.groupby("strata")
-        clipped = stratified.filter(
-            lambda strata: min(
-                strata.loc[strata[self._treatment_name[0]] == 1].shape[0],
-                strata.loc[strata[self._treatment_name[0]] == 0].shape[0],
-            )
-            > clipping_threshold
+        :param relative_ranks: Rank of the propensity score of every unit divided by the number of units.
+        :param treatment: Binary treatment of every unit.
+        :param outcome: Outcome of every unit.
+        :param num_strata: Number of strata.
+        :returns: A tuple of the stratum of every unit and a DataFrame with the statistics of the strata that are
+            included in the analysis, indexed by stratum.
+        """
+        strata = np.round(relative_ranks * num_strata)
+        strata_codes = strata.astype(int)
+        num_treated_units = np.bincount(strata_codes, weights=treatment)
+        num_control_units = np.bincount(strata_codes, weights=1 - treatment)
+        treated_outcome_sums = np.bincount(strata_codes, weights=treatment * outcome)
+        control_outcome_sums = np.bincount(strata_codes, weights=(1 - treatment) * outcome)
+
+        # throw away strata that have insufficient treatment or control
+        is_included = np.minimum(num_treated_units, num_control_units) > self.clipping_threshold
+        strata_statistics = pd.DataFrame(
+            {
+                "num_treated_units": num_treated_units[is_included].astype(int),
+                "num_control_units": num_control_units[is_included].astype(int),
+                "effect": treated_outcome_sums[is_included] / num_treated_units[is_included]
+                - control_outcome_sums[is_included] / num_control_units[is_included],
+            },
+            index=pd.Index(np.flatnonzero(is_included), name="strata"),
         )
         self.logger.debug(
             "After using clipping_threshold={0}, here are the number of data points in each strata:\n {1}".format(
-                clipping_threshold, clipped.groupby(["strata", self._treatment_name[0]])[self._outcome_name].count()
+                self.clipping_threshold, strata_statistics[["num_treated_units", "num_control_units"]]
             )
         )
-        if clipped.empty:
-            raise ValueError(
-                "Method requires strata with number of data points per treatment > clipping_threshold (={0}). No such strata exists. Consider decreasing 'num_strata' or 'clipping_threshold' parameters.".format(
-                    clipping_threshold
-                )
-            )
-        return clipped
+        return strata, strata_statistics
 
     def construct_symbolic_estimator(self, estimand):
         expr = "b: " + ",".join(estimand.outcome_variable) + "~"
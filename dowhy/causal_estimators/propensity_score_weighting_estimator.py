@@ -1,5 +1,7 @@
 import numpy as np
 import pandas as pd
+from sklearn import linear_model
+from sklearn.base import clone
 
 from dowhy.causal_estimator import CausalEstimate
 from dowhy.causal_estimators.propensity_score_estimator import PropensityScoreEstimator
@@ -37,7 +39,8 @@ class PropensityScoreWeightingEstimator(PropensityScoreEstimator):
         :param weighting_scheme: Weighting method to use. Can be inverse
             propensity score ("ips_weight", default), stabilized IPS score
             ("ips_stabilized_weight"), or normalized IPS score
-            ("ips_normalized_weight").
+            ("ips_normalized_weight"). The weights of the units are returned
+            in the weights attribute of the estimate.
         :param propensity_score_model: The model used to compute propensity
             score. Can be any classification model that supports fit() and
             predict_proba() methods. If None, use LogisticRegression model as
@@ -69,127 +72,126 @@ class PropensityScoreWeightingEstimator(PropensityScoreEstimator):
         self.weighting_scheme = weighting_scheme
         self.min_ps_score = min_ps_score
         self.max_ps_score = max_ps_score
+        # The clipped propensity scores of the last estimation, which are reused for other outcomes
+        self._propensity_scores = None
 
     def _estimate_effect(self):
-        self._refresh_propensity_score()
-
+        # Only the weights of the requested scheme are computed, as a single array. The data is not modified.
+        treatment = self._data[self._treatment_name[0]].to_numpy().astype(float)
         # trim propensity score weights
-        self._data[self.propensity_score_column] = np.minimum(
-            self.max_ps_score, self._data[self.propensity_score_column]
-        )
-        self._data[self.propensity_score_column] = np.maximum(
-            self.min_ps_score, self._data[self.propensity_score_column]
-        )
-
-        # ips ==> (isTreated(y)/ps(y)) + ((1-isTreated(y))/(1-ps(y)))
-        # nips ==> ips / (sum of ips over all units)
-        # icps ==> ps(y)/(1-ps(y)) / (sum of (ps(y)/(1-ps(y))) over all control units)
-        # itps ==> ps(y)/(1-ps(y)) / (sum of (ps(y)/(1-ps(y))) over all treatment units)
-        ipst_sum = sum(self._data[self._treatment_name[0]] / self._data[self.propensity_score_column])
-        ipsc_sum = sum((1 - self._data[self._treatment_name[0]]) / (1 - self._data[self.propensity_score_column]))
-        num_units = len(self._data[self._treatment_name[0]])
-        num_treatment_units = sum(self._data[self._treatment_name[0]])
-        num_control_units = num_units - num_treatment_units
-
-        # Vanilla IPS estimator
-        self._data["ips_weight"] = self._data[self._treatment_name[0]] / self._data[self.propensity_score_column] + (
-            1 - self._data[self._treatment_name[0]]
-        ) / (1 - self._data[self.propensity_score_column])
-        self._data["tips_weight"] = self._data[self._treatment_name[0]] + (
-            1 - self._data[self._treatment_name[0]]
-        ) * self._data[self.propensity_score_column] / (1 - self._data[self.propensity_score_column])
-        self._data["cips_weight"] = self._data[self._treatment_name[0]] * (
-            1 - self._data[self.propensity_score_column]
-        ) / self._data[self.propensity_score_column] + (1 - self._data[self._treatment_name[0]])
-
-        # The Hajek estimator (or the self-normalized estimator)
-        self._data["ips_normalized_weight"] = (
-            self._data[self._treatment_name[0]] / self._data[self.propensity_score_column] / ipst_sum
-            + (1 - self._data[self._treatment_name[0]]) / (1 - self._data[self.propensity_score_column]) / ipsc_sum
-        )
-        ipst_for_att_sum = sum(self._data[self._treatment_name[0]])
-        ipsc_for_att_sum = sum(
-            (1 - self._data[self._treatment_name[0]])
-            / (1 - self._data[self.propensity_score_column])
-            * self._data[self.propensity_score_column]
-        )
-        self._data["tips_normalized_weight"] = (
-            self._data[self._treatment_name[0]] / ipst_for_att_sum
-            + (1 - self._data[self._treatment_name[0]])
-            * self._data[self.propensity_score_column]
-            / (1 - self._data[self.propensity_score_column])
-            / ipsc_for_att_sum
-        )
-        ipst_for_atc_sum = sum(
-            self._data[self._treatment_name[0]]
-            / self._data[self.propensity_score_column]
-            * (1 - self._data[self.propensity_score_column])
-        )
-        ipsc_for_atc_sum = sum((1 - self._data[self._treatment_name[0]]))
-        self._data["cips_normalized_weight"] = (
-            self._data[self._treatment_name[0]]
-            * (1 - self._data[self.propensity_score_column])
-            / self._data[self.propensity_score_column]
-            / ipst_for_atc_sum
-            + (1 - self._data[self._treatment_name[0]]) / ipsc_for_atc_sum
-        )
-
-        # Stabilized weights (from Robins, Hernan, Brumback (2000))
-        # Paper: Marginal Structural Models and Causal Inference in Epidemiology
-        p_treatment = sum(self._data[self._treatment_name[0]]) / num_units
-        self._data["ips_stabilized_weight"] = self._data[self._treatment_name[0]] / self._data[
-            self.propensity_score_column
-        ] * p_treatment + (1 - self._data[self._treatment_name[0]]) / (1 - self._data[self.propensity_score_column]) * (
-            1 - p_treatment
-        )
-        self._data["tips_stabilized_weight"] = self._data[self._treatment_name[0]] * p_treatment + (
-            1 - self._data[self._treatment_name[0]]
-        ) * self._data[self.propensity_score_column] / (1 - self._data[self.propensity_score_column]) * (
-            1 - p_treatment
-        )
-        self._data["cips_stabilized_weight"] = self._data[self._treatment_name[0]] * (
-            1 - self._data[self.propensity_score_column]
-        ) / self._data[self.propensity_score_column] * p_treatment + (1 - self._data[self._treatment_name[0]]) * (
-            1 - p_treatment
-        )
-
-        if isinstance(self._target_units, pd.DataFrame) or self._target_units == "ate":
-            weighting_scheme_name = self.weighting_scheme
-        elif self._target_units == "att":
-            weighting_scheme_name = "t" + self.weighting_scheme
-        elif self._target_units == "atc":
-            weighting_scheme_name = "c" + self.weighting_scheme
-        else:
-            raise ValueError(f"Target units value {self._target_units} not supported")
+        propensity_scores = np.clip(self._get_propensity_scores(), self.min_ps_score, self.max_ps_score)
+        self._propensity_scores = propensity_scores
+        weighting_scheme_name = self._get_weighting_scheme_name()
+        weights = _compute_weights(treatment, propensity_scores, weighting_scheme_name)
 
-        # Calculating the effect
-        self._data["d_y"] = (
-            self._data[weighting_scheme_name] * self._data[self._treatment_name[0]] * self._data[self._outcome_name]
-        )
-        self._data["dbar_y"] = (
-            self._data[weighting_scheme_name]
-            * (1 - self._data[self._treatment_name[0]])
-            * self._data[self._outcome_name]
-        )
-        sum_dy_weights = np.sum(self._data[self._treatment_name[0]] * self._data[weighting_scheme_name])
-        sum_dbary_weights = np.sum((1 - self._data[self._treatment_name[0]]) * self._data[weighting_scheme_name])
-        # Subtracting the weighted means
-        est = self._data["d_y"].sum() / sum_dy_weights - self._data["dbar_y"].sum() / sum_dbary_weights
+        # Calculating the effect by subtracting the weighted means
+        est = _compute_weighted_effect(treatment, self._data[self._outcome_name].to_numpy(), weights)
 
-        # TODO - how can we add additional information into the returned estimate?
         estimate = CausalEstimate(
             estimate=est,
             control_value=self._control_value,
             treatment_value=self._treatment_value,
             target_estimand=self._target_estimand,
             realized_estimand_expr=self.symbolic_estimator,
-            propensity_scores=self._data[self.propensity_score_column],
+            propensity_scores=pd.Series(propensity_scores, index=self._data.index, name=self.propensity_score_column),
+            weights=pd.Series(weights, index=self._data.index, name=weighting_scheme_name),
         )
         return estimate
 
+    def _estimate_effect_with_sample_weights(self, sample_weights):
+        treatment = self._data[self._treatment_name[0]].to_numpy().astype(float)
+        if self.recalculate_propensity_score is True:
+            propensity_score_model = (
+                linear_model.LogisticRegression()
+                if self.propensity_score_model is None
+                else clone(self.propensity_score_model)
+            )
+            propensity_score_model.fit(self._observed_common_causes, treatment, sample_weight=sample_weights)
+            propensity_scores = propensity_score_model.predict_proba(self._observed_common_causes)[:, 1]
+        else:
+            propensity_scores = self._get_propensity_scores()
+        propensity_scores = np.clip(propensity_scores, self.min_ps_score, self.max_ps_score)
+
+        weights = _compute_weights(
+            treatment, propensity_scores, self._get_weighting_scheme_name(), sample_weights=sample_weights
+        )
+        return _compute_weighted_effect(treatment, self._data[self._outcome_name].to_numpy(), weights * sample_weights)
+
+    def _estimate_effect_with_outcome(self, outcome):
+        # The propensity scores and weights do not depend on the outcome, hence the ones of the fitted estimator are
+        # reused.
+        if self._propensity_scores is None:
+            self._propensity_scores = np.clip(self._get_propensity_scores(), self.min_ps_score, self.max_ps_score)
+        treatment = self._data[self._treatment_name[0]].to_numpy().astype(float)
+        weights = _compute_weights(treatment, self._propensity_scores, self._get_weighting_scheme_name())
+        return _compute_weighted_effect(treatment, outcome, weights)
+
+    def _get_weighting_scheme_name(self):
+        if isinstance(self._target_units, pd.DataFrame) or self._target_units == "ate":
+            return self.weighting_scheme
+        elif self._target_units == "att":
+            return "t" + self.weighting_scheme
+        elif self._target_units == "atc":
+            return "c" + self.weighting_scheme
+        else:
+            raise ValueError(f"Target units value {self._target_units} not supported")
+
     def construct_symbolic_estimator(self, estimand):
         expr = "b: " + ",".join(estimand.outcome_variable) + "~"
         # TODO -- fix: we are actually conditioning on positive treatment (d=1)
         var_list = estimand.treatment_variable + estimand.get_backdoor_variables()
         expr += "+".join(var_list)
         return expr
+
+
+def _compute_weights(treatment, propensity_scores, weighting_scheme_name, sample_weights=None):
+    """Computes the weights of the given weighting scheme (e.g. "ips_weight", "tips_normalized_weight" or
+    "cips_stabilized_weight") as a single array. The normalizing constants are computed with the optional frequency
+    weights of the units, i.e. the result equals the weights of a data set where each unit is repeated according to
+    its sample weight.
+    """
+    if sample_weights is None:
+        sample_weights = np.ones(treatment.shape[0])
+    control = 1 - treatment
+    treated_odds = (1 - propensity_scores) / propensity_scores
+    control_odds = propensity_scores / (1 - propensity_scores)
+
+    if weighting_scheme_name == "ips_weight":
+        return treatment / propensity_scores + control / (1 - propensity_scores)
+    elif weighting_scheme_name == "tips_weight":
+        return treatment + control * control_odds
+    elif weighting_scheme_name == "cips_weight":
+        return treatment * treated_odds + control
+    elif weighting_scheme_name == "ips_normalized_weight":
+        return treatment / propensity_scores / np.dot(sample_weights, treatment / propensity_scores) + control / (
+            1 - propensity_scores
+        ) / np.dot(sample_weights, control / (1 - propensity_scores))
+    elif weighting_scheme_name == "tips_normalized_weight":
+        return treatment / np.dot(sample_weights, treatment) + control * control_odds / np.dot(
+            sample_weights, control * control_odds
+        )
+    elif weighting_scheme_name == "cips_normalized_weight":
+        return treatment * treated_odds / np.dot(sample_weights, treatment * treated_odds) + control / np.dot(
+            sample_weights, control
+        )
+
+    # Stabilized weights (from Robins, Hernan, Brumback (2000))
+    # Paper: Marginal Structural Models and Causal Inference in Epidemiology
+    p_treatment = np.dot(sample_weights, treatment) / np.sum(sample_weights)
+    if weighting_scheme_name == "ips_stabilized_weight":
+        return treatment / propensity_scores * p_treatment + control / (1 - propensity_scores) * (1 - p_treatment)
+    elif weighting_scheme_name == "tips_stabilized_weight":
+        return treatment * p_treatment + control * control_odds * (1 - p_treatment)
+    elif weighting_scheme_name == "cips_stabilized_weight":
+        return treatment * treated_odds * p_treatment + control * (1 - p_treatment)
+    else:
+        raise ValueError(f"Weighting scheme {weighting_scheme_name} not supported")
+
+
+def _compute_weighted_effect(treatment, outcome, weights):
+    """Difference of the weighted outcome means of the treated and control units."""
+    treated_weights = weights * treatment
+    control_weights = weights * (1 - treatment)
+    return np.dot(treated_weights, outcome) / np.sum(treated_weights) - np.dot(control_weights, outcome) / np.sum(
+        control_weights
+    )
@@ -1,6 +1,5 @@
 import numpy as np
 import pandas as pd
-import statsmodels.api as sm
 
 from dowhy.causal_estimator import CausalEstimate, CausalEstimator
 
@@ -33,6 +32,11 @@ class RegressionEstimator(CausalEstimator):
         self.symbolic_estimator = self.construct_symbolic_estimator(self._target_estimand)
         self.logger.info(self.symbolic_estimator)
         self.model = None
+        # Caches of the feature builder
+        self._features = None
+        self._encoded_data = None
+        self._treatment_columns = None
+        self._encoded_treatment_values = {}
 
     def _estimate_effect(self, data_df=None, need_conditional_estimates=None):
         # TODO make treatment_value and control value also as local parameters
@@ -70,22 +74,32 @@ class RegressionEstimator(CausalEstimator):
         est = self._estimate_effect(data_df, need_conditional_estimates=False)
         return est.value
 
+    def _estimate_conditional_effects(self, estimate_effect_fn, effect_modifier_names=None, num_quantiles=None):
+        if estimate_effect_fn != self._estimate_effect_fn:
+            return super()._estimate_conditional_effects(estimate_effect_fn, effect_modifier_names, num_quantiles)
+        # The effect in a group is the mean difference of the predicted interventional outcomes of its units. Hence,
+        # the predictions are computed once for all units and then averaged per group, instead of building the
+        # features for every group separately.
+        groups = self._get_effect_modifier_groups(effect_modifier_names, num_quantiles)
+        if not self.model:
+            _, self.model = self._build_model()
+        unit_effects = self.predict_fn(
+            self.model, self._build_interventional_features(self._treatment_value)
+        ) - self.predict_fn(self.model, self._build_interventional_features(self._control_value))
+        return pd.Series(np.ravel(unit_effects), index=self._data.index).groupby(groups).mean()
+
     def _build_features(self, treatment_values=None, data_df=None):
-        # Using all data by default
-        if data_df is None:
+        # Using all data by default. The encoded treatment, common causes and effect modifiers of the data are cached,
+        # such that only the treatment columns need to be filled in for new treatment values.
+        if data_df is None or data_df is self._data:
             data_df = self._data
-            treatment_vals = pd.get_dummies(self._treatment, drop_first=True)
-            observed_common_causes_vals = self._observed_common_causes
-            effect_modifiers_vals = self._effect_modifiers
+            if treatment_values is None and self._features is not None:
+                return self._features
+            treatment_vals, observed_common_causes_vals, effect_modifiers_vals = self._get_encoded_data()
         else:
-            treatment_vals = pd.get_dummies(data_df[self._treatment_name], drop_first=True)
-            if len(self._observed_common_causes_names) > 0:
-                observed_common_causes_vals = data_df[self._observed_common_causes_names]
-                observed_common_causes_vals = pd.get_dummies(observed_common_causes_vals, drop_first=True)
-            if self._effect_modifier_names:
-                effect_modifiers_vals = data_df[self._effect_modifier_names]
-                effect_modifiers_vals = pd.get_dummies(effect_modifiers_vals, drop_first=True)
+            treatment_vals, observed_common_causes_vals, effect_modifiers_vals = self._encode_data(data_df)
         # Fixing treatment value to the specified value, if provided
+        is_observed_treatment = treatment_values is None
         if treatment_values is not None:
             treatment_vals = treatment_values
         if type(treatment_vals) is not np.ndarray:
@@ -93,45 +107,112 @@ class RegressionEstimator(CausalEstimator):
         # treatment_vals and data_df should have same number of rows
         if treatment_vals.shape[0] != data_df.shape[0]:
             raise ValueError("Provided treatment values and dataframe should have the same length.")
-        # Bulding the feature matrix
+        # Bulding the feature matrix: an intercept term, the treatments, the common causes and the products of every
+        # treatment with the effect modifiers.
         n_treatment_cols = 1 if len(treatment_vals.shape) == 1 else treatment_vals.shape[1]
         n_samples = treatment_vals.shape[0]
         treatment_2d = treatment_vals.reshape((n_samples, n_treatment_cols))
-        if len(self._observed_common_causes_names) > 0:
-            features = np.concatenate((treatment_2d, observed_common_causes_vals), axis=1)
-        else:
-            features = treatment_2d
-        if self._effect_modifier_names:
-            for i in range(treatment_2d.shape[1]):
-                curr_treatment = treatment_2d[:, i]
-                new_features = curr_treatment[:, np.newaxis] * effect_modifiers_vals.to_numpy()
-                features = np.concatenate((features, new_features), axis=1)
-        features = features.astype(
-            float, copy=False
-        )  # converting to float in case of binary treatment and no other variables
-        features = sm.add_constant(features, has_constant="add")  # to add an intercept term
+        n_common_causes_cols = observed_common_causes_vals.shape[1] if observed_common_causes_vals is not None else 0
+        n_effect_modifiers_cols = effect_modifiers_vals.shape[1] if effect_modifiers_vals is not None else 0
+        features = np.empty((n_samples, 1 + n_treatment_cols * (1 + n_effect_modifiers_cols) + n_common_causes_cols))
+        features[:, 0] = 1
+        features[:, 1 : 1 + n_treatment_cols] = treatment_2d
+        column = 1 + n_treatment_cols
+        if observed_common_causes_vals is not None:
+            features[:, column : column + n_common_causes_cols] = observed_common_causes_vals
+            column += n_common_causes_cols
+        if effect_modifiers_vals is not None:
+            for i in range(n_treatment_cols):
+                features[:, column : column + n_effect_modifiers_cols] = (
+                    treatment_2d[:, i, np.newaxis] * effect_modifiers_vals
+                )
+                column += n_effect_modifiers_cols
+        if is_observed_treatment and data_df is self._data:
+            self._features = features
         return features
 
+    def _get_encoded_data(self):
+        """Returns the encoded treatment, common causes and effect modifiers of the data as float arrays. They are only
+        computed once."""
+        if self._encoded_data is None:
+            treatment_vals = pd.get_dummies(self._treatment, drop_first=True)
+            self._encoded_data = (
+                treatment_vals.to_numpy().astype(float),
+                self._observed_common_causes.to_numpy().astype(float)
+                if self._observed_common_causes is not None
+                else None,
+                self._effect_modifiers.to_numpy().astype(float) if self._effect_modifier_names else None,
+            )
+            self._treatment_columns = treatment_vals.columns
+        return self._encoded_data
+
+    def _encode_data(self, data_df):
+        """Encodes the treatment, common causes and effect modifiers of other data in the same way as the data of the
+        estimator. Categories that do not appear in data_df still get their (zero) indicator columns."""
+        self._get_encoded_data()
+        treatment_vals = _encode_like(data_df[self._treatment_name], self._treatment_columns)
+        observed_common_causes_vals = None
+        if self._observed_common_causes is not None:
+            observed_common_causes_vals = _encode_like(
+                data_df[self._observed_common_causes_names], self._observed_common_causes.columns
+            )
+        effect_modifiers_vals = None
+        if self._effect_modifier_names:
+            effect_modifiers_vals = _encode_like(data_df[self._effect_modifier_names], self._effect_modifiers.columns)
+        return treatment_vals, observed_common_causes_vals, effect_modifiers_vals
+
+    def _estimate_effect_with_sample_weights(self, sample_weights):
+        _, model = self._build_model(sample_weights=sample_weights)
+        return self._estimate_average_effect_of_model(model, sample_weights)
+
+    def _estimate_effect_with_outcome(self, outcome):
+        # The features do not depend on the outcome, only the regression is fitted again
+        _, model = self._build_model(outcome=outcome)
+        return self._estimate_average_effect_of_model(model)
+
+    def _estimate_average_effect_of_model(self, model, sample_weights=None):
+        treatment_outcomes = self.predict_fn(model, self._build_interventional_features(self._treatment_value))
+        control_outcomes = self.predict_fn(model, self._build_interventional_features(self._control_value))
+        return np.average(treatment_outcomes - control_outcomes, weights=sample_weights)
+
     def _do(self, treatment_val, data_df=None):
         if data_df is None:
             data_df = self._data
         if not self.model:
             # The model is always built on the entire data
             _, self.model = self._build_model()
-        # Replacing treatment values by given x
-        # First, create interventional tensor in original space
-        interventional_treatment_values = np.full((data_df.shape[0], len(self._treatment_name)), treatment_val)
-        # Then, use pandas to ensure that the dummies are assigned correctly for a categorical treatment
-        interventional_treatment_2d = pd.concat(
-            [
-                self._treatment.copy(),
-                pd.DataFrame(data=interventional_treatment_values, columns=self._treatment.columns),
-            ],
-            axis=0,
-        ).astype(self._treatment.dtypes, copy=False)
-        interventional_treatment_2d = pd.get_dummies(interventional_treatment_2d, drop_first=True)
-        interventional_treatment_2d = interventional_treatment_2d[self._treatment.shape[0] :]
-
-        new_features = self._build_features(treatment_values=interventional_treatment_2d, data_df=data_df)
+        new_features = self._build_interventional_features(treatment_val, data_df)
         interventional_outcomes = self.predict_fn(self.model, new_features)
         return interventional_outcomes.mean()
+
+    def _build_interventional_features(self, treatment_val, data_df=None):
+        if data_df is None:
+            data_df = self._data
+        # Replacing treatment values by given x
+        encoded_treatment_val = self._encode_treatment_value(treatment_val)
+        interventional_treatment_2d = np.broadcast_to(
+            encoded_treatment_val, (data_df.shape[0], encoded_treatment_val.shape[0])
+        )
+        return self._build_features(treatment_values=interventional_treatment_2d, data_df=data_df)
+
+    def _encode_treatment_value(self, treatment_val):
+        """Returns the encoded (e.g. one-hot) representation of a treatment value as a float array. The encoding of
+        each value is only computed once."""
+        key = tuple(np.broadcast_to(np.asarray(treatment_val, dtype=object), (len(self._treatment_name),)).tolist())
+        if key not in self._encoded_treatment_values:
+            # Use pandas to ensure that the dummies are assigned correctly for a categorical treatment
+            interventional_treatment = pd.concat(
+                [
+                    self._treatment.drop_duplicates(),
+                    pd.DataFrame(data=[list(key)], columns=self._treatment.columns),
+                ],
+                axis=0,
+            ).astype(self._treatment.dtypes, copy=False)
+            interventional_treatment = pd.get_dummies(interventional_treatment, drop_first=True)
+            self._encoded_treatment_values[key] = interventional_treatment.iloc[-1].to_numpy().astype(float)
+        return self._encoded_treatment_values[key]
+
+
+def _encode_like(data_df, columns):
+    """One-hot encodes the data and aligns the result with the given columns of a previous encoding."""
+    return pd.get_dummies(data_df, drop_first=True).reindex(columns=columns, fill_value=0).to_numpy().astype(float)
@@ -0,0 +1,185 @@
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+
+import networkx as nx
+from networkx.algorithms.flow import shortest_augmenting_path
+
+
+class AdjustmentSetSearch:
+    """
+    Lists the sets of eligible variables that d-separate the treatment and the outcome in a graph, e.g. the valid
+    backdoor adjustment sets in the graph without the outgoing edges of the treatment, without testing every
+    combination of the variables.
+
+    The search is based on the ListSep algorithm of van der Zander, Liśkiewicz and Textor (2019). If any separator Z
+    with I ⊆ Z ⊆ R exists, then R ∩ An(X ∪ Y ∪ I) is one. For Z ⊆ An(X ∪ Y ∪ I) that contains I, Z d-separates X and
+    Y iff Z separates them in the moral graph of An(X ∪ Y ∪ I). Deciding for one variable after the other whether it
+    is part of the set therefore only needs to continue with the branches that contain a separator. Additionally, the
+    size of the smallest separator of a branch is computed as a minimum vertex cut of the moral graph, which prunes the
+    branches without separators of the requested size. The ancestors of every node and the moral graphs of the
+    ancestral sets are only computed once and shared by all branches.
+
+    See: van der Zander, Liśkiewicz and Textor (2019), Separators and adjustment sets in causal graphs: Complete
+    criteria and an algorithmic framework. Artificial Intelligence 270, 1-40.
+    """
+
+    def __init__(self, graph: nx.DiGraph, treatment_name: List, outcome_name: List, eligible_variables: Iterable):
+        """
+        :param graph: The graph in which the treatment and the outcome should be d-separated, e.g. the backdoor graph.
+        :param treatment_name: The treatment variables.
+        :param outcome_name: The outcome variables.
+        :param eligible_variables: The variables that can be part of a set. The variables of the returned sets are
+            in the same order.
+        """
+        self._graph = graph
+        self._treatment_name = list(treatment_name)
+        self._outcome_name = list(outcome_name)
+        self._eligible_variables = list(eligible_variables)
+        self._ancestors: Dict = {}
+        self._moral_graphs: Dict[FrozenSet, Dict] = {}
+        # The number of sets whose separation has been checked, summed over all searches
+        self.num_checks = 0
+
+    def is_adjustment_set(self, adjustment_set: Iterable) -> bool:
+        """Checks whether the given set d-separates the treatment and the outcome."""
+        adjustment_set = set(adjustment_set)
+        return self._is_separated(self._get_moral_graph(adjustment_set), adjustment_set)
+
+    def get_min_adjustment_set_size(self, variables: Optional[List] = None) -> Optional[int]:
+        """Returns the size of the smallest set of the given (by default, all eligible) variables that d-separates the
+        treatment and the outcome, or None if there is no such set."""
+        if variables is None:
+            variables = self._eligible_variables
+        return self._get_min_separator_size(set(), set(variables))
+
+    def get_ancestral_variables(self) -> List:
+        """Returns the eligible variables that are ancestors of the treatment or the outcome. All minimum size
+        adjustment sets consist of these variables."""
+        ancestors = self._get_ancestors(set())
+        return [variable for variable in self._eligible_variables if variable in ancestors]
+
+    def iter_adjustment_sets(
+        self, size: int, variables: Optional[List] = None, max_checks: Optional[int] = None
+    ) -> Iterator[Tuple]:
+        """Yields all sets of the given size that consist of the given (by default, all eligible) variables and
+        d-separate the treatment and the outcome.
+
+        :param size: The size of the sets.
+        :param variables: The variables of the sets, in the order in which they appear in the sets.
+        :param max_checks: The search stops once num_checks exceeds this number.
+        :returns: Iterator of tuples of variables.
+        """
+        if variables is None:
+            variables = self._eligible_variables
+        position = {variable: i for i, variable in enumerate(variables)}
+        # A branch consists of the variables that are part of the sets and the undecided candidates, which are
+        # included or excluded one after the other. The branch that includes the candidate is explored first.
+        branches: List[Tuple[Set, Tuple]] = [(set(), tuple(variables))]
+        while branches:
+            if max_checks is not None and self.num_checks > max_checks:
+                return
+            included, candidates = branches.pop()
+            if len(included) > size or len(included) + len(candidates) < size:
+                continue
+            if len(included) == size:
+                self.num_checks += 1
+                if self.is_adjustment_set(included):
+                    yield tuple(sorted(included, key=position.get))
+                continue
+            min_size = self._get_min_separator_size(included, included.union(candidates), cutoff=size)
+            if min_size is None or min_size > size:
+                continue
+            # Variables that are adjacent to the treatment and the outcome in the moral graph are part of every
+            # separator of the branch, hence they are included without branching.
+            forced = self._get_forced_variables(included, candidates)
+            if forced:
+                branches.append((included.union(forced), tuple(c for c in candidates if c not in forced)))
+                continue
+            branches.append((included, candidates[1:]))
+            branches.append((included.union([candidates[0]]), candidates[1:]))
+
+    def _get_min_separator_size(self, included: Set, variables: Set, cutoff: Optional[int] = None) -> Optional[int]:
+        """Returns the size of the smallest separator Z with included ⊆ Z ⊆ variables, or None if there is none. If a
+        cutoff is given, any size above the cutoff may be returned instead of the exact size."""
+        self.num_checks += 1
+        moral_graph = self._get_moral_graph(included)
+        # R ∩ An(X ∪ Y ∪ I) is a separator if any separator exists
+        if not self._is_separated(moral_graph, variables.intersection(moral_graph)):
+            return None
+        return len(included) + self._get_min_vertex_cut_size(
+            moral_graph, included, variables, None if cutoff is None else cutoff - len(included) + 1
+        )
+
+    def _get_forced_variables(self, included: Set, candidates: Tuple) -> Set:
+        """Returns the candidates that are adjacent to both the treatment and the outcome in the moral graph of
+        An(X ∪ Y ∪ included)."""
+        moral_graph = self._get_moral_graph(included)
+        treatment_neighbors = set().union(*(moral_graph[node] for node in self._treatment_name))
+        outcome_neighbors = set().union(*(moral_graph[node] for node in self._outcome_name))
+        return treatment_neighbors.intersection(outcome_neighbors, candidates)
+
+    def _get_ancestors(self, nodes: Set) -> Set:
+        """Returns An(X ∪ Y ∪ nodes), where every node is an ancestor of itself."""
+        ancestors = set()
+        for node in self._treatment_name + self._outcome_name + list(nodes):
+            if node not in self._ancestors:
+                self._ancestors[node] = nx.ancestors(self._graph, node)
+                self._ancestors[node].add(node)
+            ancestors.update(self._ancestors[node])
+        return ancestors
+
+    def _get_moral_graph(self, nodes: Set) -> Dict:
+        """Returns the neighbors of every node of the moral graph of An(X ∪ Y ∪ nodes)."""
+        ancestors = frozenset(self._get_ancestors(nodes))
+        if ancestors not in self._moral_graphs:
+            moral_graph = {node: set() for node in ancestors}
+            for node in ancestors:
+                # All parents of an ancestor are ancestors as well
+                parents = list(self._graph.predecessors(node))
+                for i, parent in enumerate(parents):
+                    moral_graph[node].add(parent)
+                    moral_graph[parent].add(node)
+                    for other_parent in parents[i + 1 :]:
+                        moral_graph[parent].add(other_parent)
+                        moral_graph[other_parent].add(parent)
+            self._moral_graphs[ancestors] = moral_graph
+        return self._moral_graphs[ancestors]
+
+    def _is_separated(self, moral_graph: Dict, separator: Set) -> bool:
+        """Checks whether the separator blocks all paths between the treatment and the outcome in the moral graph."""
+        outcomes = set(self._outcome_name)
+        visited = set(self._treatment_name)
+        stack = list(self._treatment_name)
+        while stack:
+            for neighbor in moral_graph[stack.pop()]:
+                if neighbor in outcomes:
+                    return False
+                if neighbor not in visited and neighbor not in separator:
+                    visited.add(neighbor)
+                    stack.append(neighbor)
+        return True
+
+    def _get_min_vertex_cut_size(
+        self, moral_graph: Dict, included: Set, variables: Set, cutoff: Optional[int] = None
+    ) -> int:
+        """Returns the minimum number of variables that need to be removed from the moral graph in addition to the
+        included ones to separate the treatment and the outcome. Every node is split into an incoming and an outgoing
+        node, which are connected by an edge of capacity 1 for the variables that can be removed and of infinite
+        capacity otherwise. This requires that the removable variables separate the treatment and the outcome. The
+        computation stops once the cut size reaches the cutoff."""
+        flow_graph = nx.DiGraph()
+        source, sink = object(), object()
+        for node, neighbors in moral_graph.items():
+            if node in included:
+                continue
+            if node in variables:
+                flow_graph.add_edge((node, 0), (node, 1), capacity=1)
+            else:
+                flow_graph.add_edge((node, 0), (node, 1))
+            for neighbor in neighbors:
+                if neighbor not in included:
+                    flow_graph.add_edge((node, 1), (neighbor, 0))
+        for node in self._treatment_name:
+            flow_graph.add_edge(source, (node, 0))
+        for node in self._outcome_name:
+            flow_graph.add_edge((node, 1), sink)
+        return int(nx.maximum_flow_value(flow_graph, source, sink, flow_func=shortest_augmenting_path, cutoff=cutoff))
@@ -7,6 +7,7 @@ import sympy as sp
 import sympy.stats as spstats
 
 from dowhy.causal_graph import CausalGraph
+from dowhy.causal_identifier.adjustment_set_search import AdjustmentSetSearch
 from dowhy.causal_identifier.efficient_backdoor import EfficientBackdoor
 from dowhy.causal_identifier.identified_estimand import IdentifiedEstimand
 from dowhy.utils.api import parse_state
@@ -633,6 +634,17 @@ def find_valid_adjustment_sets(
     backdoor_adjustment: BackdoorAdjustment,
     max_iterations: int,
 ):
+    if dseparation_algo == "default":
+        return find_valid_adjustment_sets_by_separators(
+            graph,
+            treatment_name,
+            outcome_name,
+            bdoor_graph,
+            backdoor_sets,
+            filt_eligible_variables,
+            backdoor_adjustment=backdoor_adjustment,
+            max_iterations=max_iterations,
+        )
     num_iterations = 0
     found_valid_adjustment_set = False
     all_nodes_observed = graph.all_observed(graph.get_all_nodes())
@@ -686,6 +698,70 @@ def find_valid_adjustment_sets(
     return backdoor_sets, found_valid_adjustment_set
 
 
+def find_valid_adjustment_sets_by_separators(
+    graph: CausalGraph,
+    treatment_name: List,
+    outcome_name: List,
+    bdoor_graph,
+    backdoor_sets: List,
+    filt_eligible_variables: List,
+    backdoor_adjustment: BackdoorAdjustment,
+    max_iterations: int,
+):
+    """Finds the same adjustment sets as find_valid_adjustment_sets, in the same order of sizes, but lists the sets of
+    each size with AdjustmentSetSearch instead of checking all combinations of the eligible variables. The number of
+    iterations counts the d-separation checks of the search.
+    """
+    eligible_variables = list(filt_eligible_variables)
+    search = AdjustmentSetSearch(bdoor_graph, treatment_name, outcome_name, eligible_variables)
+    found_valid_adjustment_set = False
+    all_nodes_observed = graph.all_observed(graph.get_all_nodes())
+    if backdoor_adjustment == BackdoorAdjustment.BACKDOOR_MIN:
+        # Start the search from the smallest size of an adjustment set. The smallest sets only consist of ancestors of
+        # the treatment and the outcome.
+        min_size = search.get_min_adjustment_set_size()
+        if min_size is None:
+            return backdoor_sets, found_valid_adjustment_set
+        set_sizes = range(max(min_size, 1), len(eligible_variables) + 1, 1)
+    elif (
+        backdoor_adjustment in {BackdoorAdjustment.BACKDOOR_DEFAULT, BackdoorAdjustment.BACKDOOR_MAX}
+        and all_nodes_observed
+    ):
+        # If all variables are observed, and the biggest eligible set does not satisfy backdoor, then none of its
+        # subsets will.
+        set_sizes = range(len(eligible_variables), len(eligible_variables) - 1, -1) if eligible_variables else []
+    else:
+        set_sizes = range(len(eligible_variables), 0, -1)
+    for size_candidate_set in set_sizes:
+        variables = eligible_variables
+        if backdoor_adjustment == BackdoorAdjustment.BACKDOOR_MIN and size_candidate_set == min_size:
+            variables = search.get_ancestral_variables()
+        for candidate_set in search.iter_adjustment_sets(size_candidate_set, variables, max_checks=max_iterations):
+            logger.debug("Valid backdoor set: {0}".format(candidate_set))
+            backdoor_sets.append({"backdoor_set": candidate_set})
+            found_valid_adjustment_set = True
+        # If the backdoor method is `maximal-adjustment` or `minimal-adjustment`, return the first found adjustment set.
+        if (
+            backdoor_adjustment
+            in {
+                BackdoorAdjustment.BACKDOOR_DEFAULT,
+                BackdoorAdjustment.BACKDOOR_MAX,
+                BackdoorAdjustment.BACKDOOR_MIN,
+            }
+            and found_valid_adjustment_set
+        ):
+            break
+        if search.num_checks > max_iterations:
+            if backdoor_adjustment == BackdoorAdjustment.BACKDOOR_EXHAUSTIVE:
+                logger.warning(f"Max number of iterations {max_iterations} reached.")
+            else:
+                logger.warning(
+                    f"Max number of iterations {max_iterations} reached. Could not find a valid backdoor set."
+                )
+            break
+    return backdoor_sets, found_valid_adjustment_set
+
+
 def get_default_backdoor_set_id(
     graph: CausalGraph, treatment_name: List[str], outcome_name: List[str], backdoor_sets_dict: Dict
 ):
@@ -14,7 +14,7 @@ from dowhy.causal_refuters.data_subset_refuter import DataSubsetRefuter, refute_
 from dowhy.causal_refuters.dummy_outcome_refuter import DummyOutcomeRefuter, refute_dummy_outcome
 from dowhy.causal_refuters.placebo_treatment_refuter import PlaceboTreatmentRefuter, refute_placebo_treatment
 from dowhy.causal_refuters.random_common_cause import RandomCommonCause, refute_random_common_cause
-from dowhy.causal_refuters.refute_estimate import refute_estimate
+from dowhy.causal_refuters.refute_estimate import refute_estimate, refute_suite
 
 
 def get_class_object(method_name, *args, **kwargs):
@@ -49,4 +49,5 @@ __all__ = [
     "sensitivity_e_value",
     "refute_dummy_outcome",
     "refute_estimate",
+    "refute_suite",
 ]
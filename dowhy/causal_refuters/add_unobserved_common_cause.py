@@ -1,12 +1,13 @@
-import copy
+import itertools
 import logging
 import math
-from typing import Dict, List, Optional, Union
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
 import numpy as np
 import pandas as pd
 import scipy.stats
 import statsmodels.api as sm
+from joblib import Parallel, delayed, effective_n_jobs
 from sklearn.linear_model import LogisticRegression
 from sklearn.preprocessing import StandardScaler
 from tqdm.auto import tqdm
@@ -20,12 +21,15 @@ from dowhy.causal_refuters.evalue_sensitivity_analyzer import EValueSensitivityA
 from dowhy.causal_refuters.linear_sensitivity_analyzer import LinearSensitivityAnalyzer
 from dowhy.causal_refuters.non_parametric_sensitivity_analyzer import NonParametricSensitivityAnalyzer
 from dowhy.causal_refuters.partial_linear_sensitivity_analyzer import PartialLinearSensitivityAnalyzer
+from dowhy.utils.shared_data import overlay_columns
 
 logger = logging.getLogger(__name__)
 
 
 DEFAULT_CONVERGENCE_THRESHOLD = 0.1
 DEFAULT_C_STAR_MAX = 1000
+# Number of grid points of the direct simulation that are evaluated per job before the results are collected
+SIMULATION_BATCH_SIZE_PER_JOB = 4
 
 
 class AddUnobservedCommonCause(CausalRefuter):
@@ -73,6 +77,10 @@ class AddUnobservedCommonCause(CausalRefuter):
         :param alpha_s_estimator_param_list: list of dictionaries with parameters for finding alpha_s. (relevant only for non-parametric-partial-R2 simulation method)
         :param g_s_estimator_list: list of estimator objects for finding g_s. These objects should have fit() and predict() functions implemented. (relevant only for non-parametric-partial-R2 simulation method)
         :param g_s_estimator_param_list: list of dictionaries with parameters for tuning respective estimators in "g_s_estimator_list". The order of the dictionaries in the list should be consistent with the estimator objects order in "g_s_estimator_list". (relevant only for non-parametric-partial-R2 simulation method)
+        :param random_state: The seed or random state for simulating the confounder. (relevant only for direct-simulation)
+        :param num_grid_refinements: Number of times the grid of effect strengths is adaptively refined near the contour where the new effect crosses zero (default = 0). (relevant only for direct-simulation)
+        :param n_jobs: The maximum number of concurrently running jobs for evaluating the grid of effect strengths (direct-simulation) or for fitting the nuisance models on the folds (non-parametric-partial-R2).
+        :param verbose: The verbosity level of joblib. (relevant only for direct-simulation and non-parametric-partial-R2)
         """
         super().__init__(*args, **kwargs)
         self.simulation_method = kwargs["simulation_method"] if "simulation_method" in kwargs else "direct-simulation"
@@ -128,6 +136,8 @@ class AddUnobservedCommonCause(CausalRefuter):
             kwargs["g_s_estimator_param_list"] if "g_s_estimator_param_list" in kwargs else None
         )
         self.plugin_reisz = kwargs["plugin_reisz"] if "plugin_reisz" in kwargs else False
+        self._random_state = kwargs["random_state"] if "random_state" in kwargs else None
+        self.num_grid_refinements = kwargs["num_grid_refinements"] if "num_grid_refinements" in kwargs else 0
         self.logger = logging.getLogger(__name__)
 
     def refute_estimate(self, show_progress_bar=False):
@@ -158,6 +168,8 @@ class AddUnobservedCommonCause(CausalRefuter):
                 self.g_s_estimator_list,
                 self.g_s_estimator_param_list,
                 self.plugin_reisz,
+                self._n_jobs,
+                self._verbose,
             )
         elif self.simulation_method == "e-value":
             return sensitivity_e_value(
@@ -183,12 +195,16 @@ class AddUnobservedCommonCause(CausalRefuter):
                 self.frac_strength_outcome,
                 self.plotmethod,
                 show_progress_bar,
+                self._random_state,
+                self._n_jobs,
+                self._verbose,
+                self.num_grid_refinements,
             )
             refute.add_refuter(self)
             return refute
 
     def include_simulated_confounder(
-        self, convergence_threshold=DEFAULT_CONVERGENCE_THRESHOLD, c_star_max=DEFAULT_C_STAR_MAX
+        self, convergence_threshold=DEFAULT_CONVERGENCE_THRESHOLD, c_star_max=DEFAULT_C_STAR_MAX, random_state=None
     ):
         return include_simulated_confounder(
             self._data,
@@ -199,6 +215,7 @@ class AddUnobservedCommonCause(CausalRefuter):
             self._variables_of_interest,
             convergence_threshold,
             c_star_max,
+            random_state,
         )
 
 
@@ -327,6 +344,7 @@ def _include_confounders_effect(
     effect_on_y: str,
     outcome_name: str,
     kappa_y: float,
+    random_state: Optional[np.random.RandomState] = None,
 ):
     """
     This function deals with the change in the value of the data due to the effect of the unobserved confounder.
@@ -336,12 +354,13 @@ def _include_confounders_effect(
     :param new_data: pandas.DataFrame: The data to be changed due to the effects of the unobserved confounder.
     :param kappa_t: numpy.float64: The value of the threshold for binary_flip or the value of the regression coefficient for linear effect.
     :param kappa_y: numpy.float64: The value of the threshold for binary_flip or the value of the regression coefficient for linear effect.
+    :param random_state: The random state for simulating the confounder. If None, the global numpy random state is used.
 
     :return: pandas.DataFrame: The DataFrame that includes the effects of the unobserved confounder.
     """
     num_rows = data.shape[0]
     stdnorm = scipy.stats.norm()
-    w_random = stdnorm.rvs(num_rows)
+    w_random = stdnorm.rvs(num_rows, random_state=random_state)
 
     if effect_on_t == "binary_flip":
         alpha = 2 * kappa_t - 1 if kappa_t >= 0.5 else 1 - 2 * kappa_t
@@ -396,6 +415,7 @@ def include_simulated_confounder(
     variables_of_interest: List,
     convergence_threshold: float = DEFAULT_CONVERGENCE_THRESHOLD,
     c_star_max: int = DEFAULT_C_STAR_MAX,
+    random_state: Optional[Union[int, np.random.Generator, np.random.RandomState]] = None,
 ):
     """
     This function simulates an unobserved confounder based on the data using the following steps:
@@ -423,9 +443,10 @@ def include_simulated_confounder(
         :type int
     :param convergence_threshold: The threshold to check the plateauing of the correlation while selecting a c_star. It defaults to 0.1 in the code if not specified by the user
         :type float
+    :param random_state: The seed, Generator or RandomState to simulate the confounder with. If None, the global numpy random state is used.
 
     :returns: The simulated values of the unobserved confounder based on the data
-        :type pandas.core.series.Series
+        :type numpy.ndarray
 
     """
 
@@ -444,26 +465,27 @@ def include_simulated_confounder(
     X = data[observed_variables_with_treatment]
     model = sm.OLS(y, X.astype("float"))
     results = model.fit()
-    residuals_y = y - results.fittedvalues
-    d_y = list(pd.Series(residuals_y))
+    d_y = (y - results.fittedvalues).to_numpy()
 
     # Residuals from the treatment model obtained by fitting a linear model
     t = data[treatment_name[0]].astype("int64")
     X = data[observed_variables]
     model = sm.OLS(t, X)
     results = model.fit()
-    residuals_t = t - results.fittedvalues
-    d_t = list(pd.Series(residuals_t))
+    d_t = (t - results.fittedvalues).to_numpy()
+
+    # The simulated confounders are all debiased with the same observed variables, hence X is only factorized once
+    X_basis = _get_orthonormal_basis(X.to_numpy().astype(float))
+    outcome_values = data[outcome_name[0]].to_numpy().astype(float)
+    treatment_values = t.to_numpy().astype(float)
 
     # Initialising product_cor_metric_observed with a really low value as finding maximum
     product_cor_metric_observed = -10000000000
 
     for i in observed_variables:
         current_obs_confounder = data[i]
-        outcome_values = data[outcome_name[0]]
-        correlation_y = current_obs_confounder.corr(outcome_values)
-        treatment_values = t
-        correlation_t = current_obs_confounder.corr(treatment_values)
+        correlation_y = current_obs_confounder.corr(data[outcome_name[0]])
+        correlation_t = current_obs_confounder.corr(t)
         product_cor_metric_current = correlation_y * correlation_t
         if product_cor_metric_current >= product_cor_metric_observed:
             product_cor_metric_observed = product_cor_metric_current
@@ -476,32 +498,21 @@ def include_simulated_confounder(
     if kappa_y is not None:
         correlation_y_observed = kappa_y
 
+    if random_state is None:
+        random_state = np.random
+    elif isinstance(random_state, int):
+        random_state = np.random.default_rng(random_state)
+
     # Choosing a c_star based on the data.
     # The correlations stop increasing upon increasing c_star after a certain value, that is it plateaus and we choose the value of c_star to be the value it plateaus.
-
-    correlation_y_list = []
-    correlation_t_list = []
-    product_cor_metric_simulated_list = []
-    x_list = []
+    # The simulated variables of all candidate values are generated at once, one column per value.
 
     step = int(c_star_max / 10)
-    for i in range(0, int(c_star_max), step):
-        c1 = math.sqrt(i)
-        c2 = c1
-        final_U = _generate_confounder_from_residuals(c1, c2, d_y, d_t, X)
-        current_simulated_confounder = final_U
-        outcome_values = data[outcome_name[0]]
-        correlation_y = current_simulated_confounder.corr(outcome_values)
-        correlation_y_list.append(correlation_y)
-
-        treatment_values = t
-        correlation_t = current_simulated_confounder.corr(treatment_values)
-        correlation_t_list.append(correlation_t)
-
-        product_cor_metric_simulated = correlation_y * correlation_t
-        product_cor_metric_simulated_list.append(product_cor_metric_simulated)
-
-        x_list.append(i)
+    x_list = list(range(0, int(c_star_max), step))
+    c1 = np.sqrt(x_list)
+    c2 = c1
+    simulated_confounders = _generate_confounder_from_residuals(c1, c2, d_y, d_t, X_basis, random_state)
+    correlation_y_list = _compute_correlations(simulated_confounders, outcome_values)
 
     index = 1
     while index < len(correlation_y_list):
@@ -520,24 +531,21 @@ def include_simulated_confounder(
 
     # initialising min_distance_between_product_cor_metrics to be a value greater than 1
     min_distance_between_product_cor_metrics = 1.5
-    i = 0.05
-
     threshold = c_star / 0.05
 
+    c2_values = []
+    i = 0.05
     while i <= threshold:
-        c2 = i
-        c1 = c_star / c2
-        final_U = _generate_confounder_from_residuals(c1, c2, d_y, d_t, X)
-
-        current_simulated_confounder = final_U
-        outcome_values = data[outcome_name[0]]
-        correlation_y = current_simulated_confounder.corr(outcome_values)
-
-        treatment_values = t
-        correlation_t = current_simulated_confounder.corr(treatment_values)
-
-        product_cor_metric_simulated = correlation_y * correlation_t
-
+        c2_values.append(i)
+        i = i * 1.5
+    c2_values = np.array(c2_values)
+    c1_values = c_star / c2_values
+    simulated_confounders = _generate_confounder_from_residuals(c1_values, c2_values, d_y, d_t, X_basis, random_state)
+    product_cor_metric_simulated_list = _compute_correlations(
+        simulated_confounders, outcome_values
+    ) * _compute_correlations(simulated_confounders, treatment_values)
+
+    for c1, c2, product_cor_metric_simulated in zip(c1_values, c2_values, product_cor_metric_simulated_list):
         if min_distance_between_product_cor_metrics >= abs(product_cor_metric_simulated - product_cor_metric_observed):
             min_distance_between_product_cor_metrics = abs(product_cor_metric_simulated - product_cor_metric_observed)
             additional_condition = correlation_y_observed / correlation_t_observed
@@ -547,8 +555,6 @@ def include_simulated_confounder(
                 c1_final = c1
                 c2_final = c2
 
-        i = i * 1.5
-
     """#closed form solution
 
     print("c_star_max before closed form", c_star_max)
@@ -562,44 +568,63 @@ def include_simulated_confounder(
         c2 = math.sqrt(c_star_max/additional_condition)
         c1 = c_star_max/c2"""
 
-    final_U = _generate_confounder_from_residuals(c1_final, c2_final, d_y, d_t, X)
+    final_U = _generate_confounder_from_residuals(c1_final, c2_final, d_y, d_t, X_basis, random_state)
 
     return final_U
 
 
-def _generate_confounder_from_residuals(c1, c2, d_y, d_t, X):
+def _get_orthonormal_basis(X: np.ndarray) -> np.ndarray:
+    """Returns an orthonormal basis of the column space of X, computed with a thin singular value decomposition. Like
+    the pseudo-inverse used by OLS, it also handles linearly dependent columns of X.
+
+    :param X: The matrix of regressors, one row per unit
+    :returns: A matrix with orthonormal columns that span the same space as the columns of X
+    """
+    left_singular_vectors, singular_values, _ = np.linalg.svd(X, full_matrices=False)
+    tolerance = singular_values.max(initial=0) * max(X.shape) * np.finfo(float).eps
+    return left_singular_vectors[:, singular_values > tolerance]
+
+
+def _compute_correlations(simulated_confounders: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Returns the Pearson correlation of every column of simulated_confounders with the values."""
+    centered_confounders = simulated_confounders - simulated_confounders.mean(axis=0)
+    centered_values = values - values.mean()
+    return (centered_values @ centered_confounders) / (
+        np.linalg.norm(centered_confounders, axis=0) * np.linalg.norm(centered_values)
+    )
+
+
+def _generate_confounder_from_residuals(
+    c1: Union[float, np.ndarray],
+    c2: Union[float, np.ndarray],
+    d_y: np.ndarray,
+    d_t: np.ndarray,
+    X_basis: np.ndarray,
+    random_state: Optional[Union[np.random.Generator, np.random.RandomState]] = None,
+) -> np.ndarray:
     """
     This function takes the residuals from the treatment and outcome model and their coefficients and simulates the intermediate random variable U by taking
     the row wise normal distribution corresponding to each residual value and then debiasing the intermediate variable to get the final variable.
 
-    :param c1: coefficient to the residual from the outcome model
-    :type float
-    :param c2: coefficient to the residual from the treatment model
-    :type float
+    All rows are drawn at once. The debiasing is the residual of the least squares fit of U on the observed variables,
+    computed by projecting U on the orthonormal basis X_basis (see _get_orthonormal_basis), such that the observed
+    variables only need to be factorized once for all simulated confounders.
+
+    :param c1: coefficient to the residual from the outcome model, or an array of coefficients to simulate one confounder per coefficient
+    :param c2: coefficient to the residual from the treatment model, or an array of coefficients to simulate one confounder per coefficient
     :param d_y: residuals from the outcome model
-    :type list
     :param d_t: residuals from the treatment model
-    :type list
-
-    :returns: The simulated values of the unobserved confounder based on the data
-    :type pandas.core.series.Series
+    :param X_basis: orthonormal basis of the observed variables that the confounder is debiased with
+    :param random_state: Generator or RandomState to draw U from. If None, the global numpy random state is used.
 
+    :returns: The simulated values of the unobserved confounder based on the data, a matrix with one column per
+        coefficient if arrays of coefficients are given
     """
-    U = []
-
-    for j in range(len(d_t)):
-        simulated_variable_mean = c1 * d_y[j] + c2 * d_t[j]
-        simulated_variable_stddev = 1
-        U.append(np.random.normal(simulated_variable_mean, simulated_variable_stddev, 1))
-
-    U = np.array(U)
-    model = sm.OLS(U, X)
-    results = model.fit()
-    U = U.reshape(
-        -1,
-    )
-    final_U = U - results.fittedvalues.values
-    final_U = pd.Series(U)
+    if random_state is None:
+        random_state = np.random
+    simulated_variable_mean = np.multiply.outer(d_y, c1) + np.multiply.outer(d_t, c2)
+    U = simulated_variable_mean + random_state.standard_normal(simulated_variable_mean.shape)
+    final_U = U - X_basis @ (X_basis.T @ U)
 
     return final_U
 
@@ -672,6 +697,8 @@ def sensitivity_non_parametric_partial_r2(
     g_s_estimator_list: Optional[List] = None,
     g_s_estimator_param_list: Optional[List[Dict]] = None,
     plugin_reisz: bool = False,
+    n_jobs: int = 1,
+    verbose: int = 0,
 ) -> Union[PartialLinearSensitivityAnalyzer, NonParametricSensitivityAnalyzer]:
     """Add an unobserved confounder for refutation using Non-parametric partial R2 methond (Sensitivity Analysis for non-parametric models).
 
@@ -688,6 +715,8 @@ def sensitivity_non_parametric_partial_r2(
     :param g_s_estimator_list: list of estimator objects for finding g_s. These objects should have fit() and predict() functions implemented. (relevant only for non-parametric-partial-R2 simulation method)
     :param g_s_estimator_param_list: list of dictionaries with parameters for tuning respective estimators in "g_s_estimator_list". The order of the dictionaries in the list should be consistent with the estimator objects order in "g_s_estimator_list". (relevant only for non-parametric-partial-R2 simulation method)
     :plugin_reisz: bool: Flag on whether to use the plugin estimator or the nonparametric estimator for reisz representer function (alpha_s).
+    :param n_jobs: The maximum number of concurrently running jobs for fitting the nuisance models on the folds.
+    :param verbose: The verbosity level of the parallel fitting.
     """
 
     import dowhy.causal_estimators.econml
@@ -708,6 +737,8 @@ def sensitivity_non_parametric_partial_r2(
                 benchmark_common_causes=benchmark_common_causes,
                 frac_strength_treatment=frac_strength_treatment,
                 frac_strength_outcome=frac_strength_outcome,
+                n_jobs=n_jobs,
+                verbose=verbose,
             )
             analyzer.check_sensitivity(plot=plot_estimate)
             return analyzer
@@ -728,6 +759,8 @@ def sensitivity_non_parametric_partial_r2(
         frac_strength_outcome=frac_strength_outcome,
         theta_s=estimate.value,
         plugin_reisz=plugin_reisz,
+        n_jobs=n_jobs,
+        verbose=verbose,
     )
     analyzer.check_sensitivity(plot=plot_estimate)
     return analyzer
@@ -758,6 +791,150 @@ def sensitivity_e_value(
     return analyzer
 
 
+def _estimate_effect_with_simulated_confounder(
+    data: pd.DataFrame,
+    target_estimand: IdentifiedEstimand,
+    estimate: CausalEstimate,
+    confounders_effect_on_treatment: str,
+    treatment_name: List[str],
+    kappa_t: float,
+    confounders_effect_on_outcome: str,
+    outcome_name: List[str],
+    kappa_y: float,
+    random_state: Optional[np.random.RandomState] = None,
+) -> float:
+    """Estimates the effect on a copy of the data that includes the effect of a simulated confounder with the given
+    strengths. The data itself is not modified, such that it can be shared (read-only) by parallel workers. Only the
+    treatment and outcome columns are copied."""
+    new_data = _include_confounders_effect(
+        data,
+        overlay_columns(data, {name: data[name].copy() for name in treatment_name + outcome_name}),
+        confounders_effect_on_treatment,
+        treatment_name,
+        kappa_t,
+        confounders_effect_on_outcome,
+        outcome_name,
+        kappa_y,
+        random_state,
+    )
+    new_estimator = CausalEstimator.get_estimator_object(new_data, target_estimand, estimate)
+    return new_estimator.estimate_effect().value
+
+
+def _estimate_effects_with_simulated_confounders(
+    data: pd.DataFrame,
+    target_estimand: IdentifiedEstimand,
+    estimate: CausalEstimate,
+    confounders_effect_on_treatment: str,
+    treatment_name: List[str],
+    confounders_effect_on_outcome: str,
+    outcome_name: List[str],
+    effect_strengths: List[Tuple[float, float]],
+    random_state: Optional[Union[int, np.random.RandomState]] = None,
+    n_jobs: int = 1,
+    verbose: int = 0,
+    show_progress_bar: bool = False,
+) -> np.ndarray:
+    """Estimates the effect for every pair of effect strengths (kappa_t, kappa_y) of the simulated confounder.
+
+    The pairs are evaluated by a pool of n_jobs workers in batches, whose results are written into the returned array
+    as soon as the batch finishes. Every pair gets its own seed, such that the results do not depend on n_jobs.
+    """
+    if random_state is None:
+        random_state = np.random
+    elif isinstance(random_state, int):
+        random_state = np.random.RandomState(seed=random_state)
+    seeds = random_state.randint(np.iinfo(np.int32).max, size=len(effect_strengths))
+
+    new_effects = np.empty(len(effect_strengths))
+    batch_size = SIMULATION_BATCH_SIZE_PER_JOB * effective_n_jobs(n_jobs)
+    with tqdm(
+        total=len(effect_strengths),
+        colour=CausalRefuter.PROGRESS_BAR_COLOR,
+        disable=not show_progress_bar,
+        desc="Refuting Estimates: ",
+    ) as progress_bar, Parallel(n_jobs=n_jobs, verbose=verbose) as parallel:
+        for batch_start in range(0, len(effect_strengths), batch_size):
+            batch_end = min(batch_start + batch_size, len(effect_strengths))
+            new_effects[batch_start:batch_end] = parallel(
+                delayed(_estimate_effect_with_simulated_confounder)(
+                    data,
+                    target_estimand,
+                    estimate,
+                    confounders_effect_on_treatment,
+                    treatment_name,
+                    kappa_t,
+                    confounders_effect_on_outcome,
+                    outcome_name,
+                    kappa_y,
+                    np.random.RandomState(seed),
+                )
+                for (kappa_t, kappa_y), seed in zip(
+                    effect_strengths[batch_start:batch_end], seeds[batch_start:batch_end]
+                )
+            )
+            progress_bar.update(batch_end - batch_start)
+    return new_effects
+
+
+def _refine_effect_strengths_near_zero_effect(
+    estimate_effects: Callable[[List[Tuple[float, float]]], np.ndarray],
+    kappa_t: np.ndarray,
+    kappa_y: np.ndarray,
+    results_matrix: np.ndarray,
+    num_refinements: int,
+) -> pd.DataFrame:
+    """Adaptively refines the grid of effect strengths near the contour where the new effect crosses zero.
+
+    In every refinement, each cell of the grid (a rectangle between neighboring values of kappa_t and kappa_y, or an
+    interval if only one of them has several values) with new effects of both signs at its corners is split in halves
+    along each axis. Only the new corners of these cells are evaluated.
+
+    :param estimate_effects: Function that returns the new effects for a list of pairs (kappa_t, kappa_y).
+    :param kappa_t: Values of kappa_t of the grid.
+    :param kappa_y: Values of kappa_y of the grid.
+    :param results_matrix: New effects of the grid, one row per value of kappa_t.
+    :param num_refinements: Maximum number of refinements.
+    :returns: A DataFrame with the columns kappa_t, kappa_y and new_effect for all evaluated pairs, including the grid.
+    """
+    new_effects = {
+        (kappa_t_value, kappa_y_value): results_matrix[i, j]
+        for i, kappa_t_value in enumerate(kappa_t)
+        for j, kappa_y_value in enumerate(kappa_y)
+    }
+
+    def get_intervals(values):
+        return list(zip(values[:-1], values[1:])) if len(values) > 1 else [(values[0], values[0])]
+
+    def split(interval):
+        lower, upper = interval
+        return [interval] if lower == upper else [(lower, (lower + upper) / 2), ((lower + upper) / 2, upper)]
+
+    def get_corners(cell):
+        return {(kappa_t_value, kappa_y_value) for kappa_t_value in cell[0] for kappa_y_value in cell[1]}
+
+    cells = list(itertools.product(get_intervals(kappa_t), get_intervals(kappa_y)))
+    for _ in range(num_refinements):
+        crossed_cells = []
+        for cell in cells:
+            corner_effects = [new_effects[corner] for corner in get_corners(cell)]
+            if min(corner_effects) <= 0 <= max(corner_effects) and min(corner_effects) < max(corner_effects):
+                crossed_cells.append(cell)
+        cells = [child for cell in crossed_cells for child in itertools.product(split(cell[0]), split(cell[1]))]
+        new_effect_strengths = sorted(set().union(*[get_corners(cell) for cell in cells]) - new_effects.keys())
+        if not new_effect_strengths:
+            break
+        new_effects.update(zip(new_effect_strengths, estimate_effects(new_effect_strengths)))
+
+    return pd.DataFrame(
+        [
+            (kappa_t_value, kappa_y_value, new_effect)
+            for (kappa_t_value, kappa_y_value), new_effect in new_effects.items()
+        ],
+        columns=["kappa_t", "kappa_y", "new_effect"],
+    ).sort_values(["kappa_t", "kappa_y"], ignore_index=True)
+
+
 def sensitivity_simulation(
     data: pd.DataFrame,
     target_estimand: IdentifiedEstimand,
@@ -772,6 +949,10 @@ def sensitivity_simulation(
     frac_strength_outcome: float = 1.0,
     plotmethod: Optional[str] = None,
     show_progress_bar=False,
+    random_state: Optional[Union[int, np.random.RandomState]] = None,
+    n_jobs: int = 1,
+    verbose: int = 0,
+    num_grid_refinements: int = 0,
     **_,
 ) -> CausalRefutation:
     """
@@ -791,6 +972,11 @@ def sensitivity_simulation(
     :param frac_strength_treatment: float: This parameter decides the effect strength of the simulated confounder as a fraction of the effect strength of observed confounders on treatment. Defaults to 1.
     :param frac_strength_outcome: float: This parameter decides the effect strength of the simulated confounder as a fraction of the effect strength of observed confounders on outcome. Defaults to 1.
     :param plotmethod: string: Type of plot to be shown. If None, no plot is generated. This parameter is used only only when more than one treatment confounder effect values or outcome confounder effect values are provided. Default is "colormesh". Supported values are "contour", "colormesh" when more than one value is provided for both confounder effect value parameters; "line" when provided for only one of them.
+    :param show_progress_bar: Boolean flag on whether to show a progress bar.
+    :param random_state: The seed or random state for simulating the confounder. Every point of the grid gets its own seed, such that the results do not depend on n_jobs.
+    :param n_jobs: The maximum number of concurrently running jobs. If -1 all CPUs are used. If 1 is given, no parallel computing code is used at all (this is the default).
+    :param verbose: The verbosity level: if non zero, progress messages are printed. Above 50, the output is sent to stdout. The frequency of the messages increases with the verbosity level. If it more than 10, all iterations are reported. The default is 0.
+    :param num_grid_refinements: Number of times the grid of kappa_t and kappa_y is adaptively refined near the contour where the new effect crosses zero (default = 0). In every refinement, the cells of the grid with new effects of both signs at their corners are split in halves. The evaluated points are stored in the refined_grid attribute of the refutation.
 
     :return: CausalRefuter: An object that contains the estimated effect and a new effect and the name of the refutation used.
     """
@@ -803,199 +989,112 @@ def sensitivity_simulation(
             data, target_estimand, outcome_name, confounders_effect_on_outcome, frac_strength_outcome
         )
 
-    if not isinstance(kappa_t, (list, np.ndarray)) and not isinstance(
-        kappa_y, (list, np.ndarray)
-    ):  # Deal with single value inputs
-        new_data = copy.deepcopy(data)
-        new_data = _include_confounders_effect(
+    def estimate_effects(effect_strengths):
+        return _estimate_effects_with_simulated_confounders(
             data,
-            new_data,
+            target_estimand,
+            estimate,
             confounders_effect_on_treatment,
             treatment_name,
-            kappa_t,
             confounders_effect_on_outcome,
             outcome_name,
-            kappa_y,
-        )
-        new_estimator = CausalEstimator.get_estimator_object(new_data, target_estimand, estimate)
-        new_effect = new_estimator.estimate_effect()
-        refute = CausalRefutation(
-            estimate.value, new_effect.value, refutation_type="Refute: Add an Unobserved Common Cause"
+            effect_strengths,
+            random_state,
+            n_jobs,
+            verbose,
+            show_progress_bar,
         )
 
-        refute.new_effect_array = np.array(new_effect.value)
-        refute.new_effect = new_effect.value
+    if not isinstance(kappa_t, (list, np.ndarray)) and not isinstance(
+        kappa_y, (list, np.ndarray)
+    ):  # Deal with single value inputs
+        new_effect = estimate_effects([(kappa_t, kappa_y)])[0]
+        refute = CausalRefutation(estimate.value, new_effect, refutation_type="Refute: Add an Unobserved Common Cause")
+
+        refute.new_effect_array = np.array(new_effect)
+        refute.new_effect = new_effect
         return refute
 
-    else:  # Deal with multiple value inputs
-
-        if isinstance(kappa_t, (list, np.ndarray)) and isinstance(
-            kappa_y, (list, np.ndarray)
-        ):  # Deal with range inputs
-            # Get a 2D matrix of values
-            # x,y =  np.meshgrid(self.kappa_t, self.kappa_y) # x,y are both MxN
-
-            results_matrix = np.random.rand(len(kappa_t), len(kappa_y))  # Matrix to hold all the results of NxM
-            orig_data = copy.deepcopy(data)
-
-            for i in tqdm(
-                range(len(kappa_t)),
-                colour=CausalRefuter.PROGRESS_BAR_COLOR,
-                disable=not show_progress_bar,
-                desc="Refuting Estimates: ",
-            ):
-                for j in range(len(kappa_y)):
-                    new_data = _include_confounders_effect(
-                        data,
-                        orig_data,
-                        confounders_effect_on_treatment,
-                        treatment_name,
-                        kappa_t[i],
-                        confounders_effect_on_outcome,
-                        outcome_name,
-                        kappa_y[j],
-                    )
-                    new_estimator = CausalEstimator.get_estimator_object(new_data, target_estimand, estimate)
-                    new_effect = new_estimator.estimate_effect()
-                    refute = CausalRefutation(
-                        estimate.value,
-                        new_effect.value,
-                        refutation_type="Refute: Add an Unobserved Common Cause",
-                    )
-                    results_matrix[i][j] = refute.new_effect  # Populate the results
-
-            refute.new_effect_array = results_matrix
-            refute.new_effect = (np.min(results_matrix), np.max(results_matrix))
-            # Store the values into the refute object
-            if plotmethod is None:
-                return refute
-
-            import matplotlib
-            import matplotlib.pyplot as plt
-
-            fig = plt.figure(figsize=(6, 5))
-            left, bottom, width, height = 0.1, 0.1, 0.8, 0.8
-            ax = fig.add_axes([left, bottom, width, height])
-
-            oe = estimate.value
-            contour_levels = [oe / 4.0, oe / 2.0, (3.0 / 4) * oe, oe]
-            contour_levels.extend([0, np.min(results_matrix), np.max(results_matrix)])
-            if plotmethod == "contour":
-                cp = plt.contourf(kappa_y, kappa_t, results_matrix, levels=sorted(contour_levels))
-                # Adding a label on the contour line for the original estimate
-                fmt = {}
-                trueeffect_index = np.where(cp.levels == oe)[0][0]
-                fmt[cp.levels[trueeffect_index]] = "Estimated Effect"
-                # Label every other level using strings
-                plt.clabel(cp, [cp.levels[trueeffect_index]], inline=True, fmt=fmt)
-                plt.colorbar(cp)
-            elif plotmethod == "colormesh":
-                cp = plt.pcolormesh(kappa_y, kappa_t, results_matrix, shading="nearest")
-                plt.colorbar(cp, ticks=contour_levels)
-            ax.yaxis.set_ticks(kappa_t)
-            ax.xaxis.set_ticks(kappa_y)
-            plt.xticks(rotation=45)
-            ax.set_title("Effect of Unobserved Common Cause")
-            ax.set_ylabel("Value of Linear Constant on Treatment")
-            ax.set_xlabel("Value of Linear Constant on Outcome")
-            plt.show()
+    # Deal with multiple value inputs. The grid of all pairs of kappa_t and kappa_y is evaluated at once, such that its
+    # points can be distributed over the workers.
+    kappa_t_values = np.atleast_1d(kappa_t)
+    kappa_y_values = np.atleast_1d(kappa_y)
+    results_matrix = estimate_effects(list(itertools.product(kappa_t_values, kappa_y_values))).reshape(
+        len(kappa_t_values), len(kappa_y_values)
+    )
+    refute = CausalRefutation(
+        estimate.value, results_matrix[-1, -1], refutation_type="Refute: Add an Unobserved Common Cause"
+    )
+    if num_grid_refinements > 0:
+        refute.refined_grid = _refine_effect_strengths_near_zero_effect(
+            estimate_effects, kappa_t_values, kappa_y_values, results_matrix, num_grid_refinements
+        )
 
+    if isinstance(kappa_t, (list, np.ndarray)) and isinstance(kappa_y, (list, np.ndarray)):  # Deal with range inputs
+        refute.new_effect_array = results_matrix
+        refute.new_effect = (np.min(results_matrix), np.max(results_matrix))
+        # Store the values into the refute object
+        if plotmethod is None:
             return refute
 
-        elif isinstance(kappa_t, (list, np.ndarray)):
-            outcomes = np.random.rand(len(kappa_t))
-            orig_data = copy.deepcopy(data)
-
-            for i in tqdm(
-                range(0, len(kappa_t)),
-                colour=CausalRefuter.PROGRESS_BAR_COLOR,
-                disable=not show_progress_bar,
-                desc="Refuting Estimates: ",
-            ):
-                new_data = _include_confounders_effect(
-                    data,
-                    orig_data,
-                    confounders_effect_on_treatment,
-                    treatment_name,
-                    kappa_t[i],
-                    confounders_effect_on_outcome,
-                    outcome_name,
-                    kappa_y,
-                )
-                new_estimator = CausalEstimator.get_estimator_object(new_data, target_estimand, estimate)
-                new_effect = new_estimator.estimate_effect()
-                refute = CausalRefutation(
-                    estimate.value, new_effect.value, refutation_type="Refute: Add an Unobserved Common Cause"
-                )
-                logger.debug(refute)
-                outcomes[i] = refute.new_effect  # Populate the results
-
-            refute.new_effect_array = outcomes
-            refute.new_effect = (np.min(outcomes), np.max(outcomes))
-            if plotmethod is None:
-                return refute
-
-            import matplotlib
-            import matplotlib.pyplot as plt
-
-            fig = plt.figure(figsize=(6, 5))
-            left, bottom, width, height = 0.1, 0.1, 0.8, 0.8
-            ax = fig.add_axes([left, bottom, width, height])
-
-            plt.plot(kappa_t, outcomes)
-            plt.axhline(estimate.value, linestyle="--", color="gray")
-            ax.set_title("Effect of Unobserved Common Cause")
-            ax.set_xlabel("Value of Linear Constant on Treatment")
-            ax.set_ylabel("Estimated Effect after adding the common cause")
-            plt.show()
-
-            return refute
+        import matplotlib
+        import matplotlib.pyplot as plt
+
+        fig = plt.figure(figsize=(6, 5))
+        left, bottom, width, height = 0.1, 0.1, 0.8, 0.8
+        ax = fig.add_axes([left, bottom, width, height])
+
+        oe = estimate.value
+        contour_levels = [oe / 4.0, oe / 2.0, (3.0 / 4) * oe, oe]
+        contour_levels.extend([0, np.min(results_matrix), np.max(results_matrix)])
+        if plotmethod == "contour":
+            cp = plt.contourf(kappa_y, kappa_t, results_matrix, levels=sorted(contour_levels))
+            # Adding a label on the contour line for the original estimate
+            fmt = {}
+            trueeffect_index = np.where(cp.levels == oe)[0][0]
+            fmt[cp.levels[trueeffect_index]] = "Estimated Effect"
+            # Label every other level using strings
+            plt.clabel(cp, [cp.levels[trueeffect_index]], inline=True, fmt=fmt)
+            plt.colorbar(cp)
+        elif plotmethod == "colormesh":
+            cp = plt.pcolormesh(kappa_y, kappa_t, results_matrix, shading="nearest")
+            plt.colorbar(cp, ticks=contour_levels)
+        ax.yaxis.set_ticks(kappa_t)
+        ax.xaxis.set_ticks(kappa_y)
+        plt.xticks(rotation=45)
+        ax.set_title("Effect of Unobserved Common Cause")
+        ax.set_ylabel("Value of Linear Constant on Treatment")
+        ax.set_xlabel("Value of Linear Constant on Outcome")
+        plt.show()
 
-        elif isinstance(kappa_y, (list, np.ndarray)):
-            outcomes = np.random.rand(len(kappa_y))
-            orig_data = copy.deepcopy(data)
-
-            for i in tqdm(
-                range(0, len(kappa_y)),
-                colour=CausalRefuter.PROGRESS_BAR_COLOR,
-                disable=not show_progress_bar,
-                desc="Refuting Estimates: ",
-            ):
-                new_data = _include_confounders_effect(
-                    data,
-                    orig_data,
-                    confounders_effect_on_treatment,
-                    treatment_name,
-                    kappa_t,
-                    confounders_effect_on_outcome,
-                    outcome_name,
-                    kappa_y[i],
-                )
-                new_estimator = CausalEstimator.get_estimator_object(new_data, target_estimand, estimate)
-                new_effect = new_estimator.estimate_effect()
-                refute = CausalRefutation(
-                    estimate.value, new_effect.value, refutation_type="Refute: Add an Unobserved Common Cause"
-                )
-                logger.debug(refute)
-                outcomes[i] = refute.new_effect  # Populate the results
+        return refute
 
-            refute.new_effect_array = outcomes
-            refute.new_effect = (np.min(outcomes), np.max(outcomes))
-            if plotmethod is None:
-                return refute
+    if isinstance(kappa_t, (list, np.ndarray)):
+        outcomes = results_matrix[:, 0]
+        kappa_values = kappa_t
+        kappa_label = "Value of Linear Constant on Treatment"
+    else:
+        outcomes = results_matrix[0, :]
+        kappa_values = kappa_y
+        kappa_label = "Value of Linear Constant on Outcome"
+    logger.debug(refute)
+
+    refute.new_effect_array = outcomes
+    refute.new_effect = (np.min(outcomes), np.max(outcomes))
+    if plotmethod is None:
+        return refute
 
-            import matplotlib
-            import matplotlib.pyplot as plt
+    import matplotlib.pyplot as plt
 
-            fig = plt.figure(figsize=(6, 5))
-            left, bottom, width, height = 0.1, 0.1, 0.8, 0.8
-            ax = fig.add_axes([left, bottom, width, height])
+    fig = plt.figure(figsize=(6, 5))
+    left, bottom, width, height = 0.1, 0.1, 0.8, 0.8
+    ax = fig.add_axes([left, bottom, width, height])
 
-            plt.plot(kappa_y, outcomes)
-            plt.axhline(estimate.value, linestyle="--", color="gray")
-            ax.set_title("Effect of Unobserved Common Cause")
-            ax.set_xlabel("Value of Linear Constant on Outcome")
-            ax.set_ylabel("Estimated Effect after adding the common cause")
-            plt.show()
+    plt.plot(kappa_values, outcomes)
+    plt.axhline(estimate.value, linestyle="--", color="gray")
+    ax.set_title("Effect of Unobserved Common Cause")
+    ax.set_xlabel(kappa_label)
+    ax.set_ylabel("Estimated Effect after adding the common cause")
+    plt.show()
 
-            return refute
+    return refute
@@ -1,17 +1,22 @@
 import logging
-from typing import Optional, Union
+from types import ModuleType
+from typing import List, Optional, Union
 
 import numpy as np
 import pandas as pd
-from joblib import Parallel, delayed
+from joblib import Parallel, delayed, effective_n_jobs
 from tqdm.auto import tqdm
 
 from dowhy.causal_estimator import CausalEstimate, CausalEstimator
 from dowhy.causal_identifier import IdentifiedEstimand
 from dowhy.causal_refuter import CausalRefutation, CausalRefuter, test_significance
+from dowhy.utils.shared_data import SharedDataFrame
 
 logger = logging.getLogger(__name__)
 
+# Number of simulations after which the convergence of the variance of the estimates is checked
+SIMULATIONS_PER_CONVERGENCE_CHECK = 10
+
 
 class DataSubsetRefuter(CausalRefuter):
     """Refute an estimate by rerunning it on a random subset of the original data.
@@ -27,6 +32,12 @@ class DataSubsetRefuter(CausalRefuter):
     :param random_state: The seed value to be added if we wish to repeat the same random behavior. If we with to repeat the same behavior we push the same seed in the psuedo-random generator
     :type random_state: int, RandomState, optional
 
+    :param stratify_by_treatment: Whether every subset contains the subset fraction of the units of each treatment value, which is False by default. Only meaningful for discrete treatments.
+    :type stratify_by_treatment: bool, optional
+
+    :param convergence_threshold: If given, the simulations stop early once the standard deviation of the estimates changes by less than this fraction after ``SIMULATIONS_PER_CONVERGENCE_CHECK`` further simulations. None by default, i.e. all simulations are run.
+    :type convergence_threshold: float, optional
+
     :param n_jobs: The maximum number of concurrently running jobs. If -1 all CPUs are used. If 1 is given, no parallel computing code is used at all (this is the default).
     :type n_jobs: int, optional
 
@@ -42,6 +53,8 @@ class DataSubsetRefuter(CausalRefuter):
         self._subset_fraction = kwargs.pop("subset_fraction", 0.8)
         self._num_simulations = kwargs.pop("num_simulations", CausalRefuter.DEFAULT_NUM_SIMULATIONS)
         self._random_state = kwargs.pop("random_state", None)
+        self._stratify_by_treatment = kwargs.pop("stratify_by_treatment", False)
+        self._convergence_threshold = kwargs.pop("convergence_threshold", None)
 
     def refute_estimate(self, show_progress_bar: bool = False):
         refute = refute_data_subset(
@@ -51,6 +64,8 @@ class DataSubsetRefuter(CausalRefuter):
             subset_fraction=self._subset_fraction,
             num_simulations=self._num_simulations,
             random_state=self._random_state,
+            stratify_by_treatment=self._stratify_by_treatment,
+            convergence_threshold=self._convergence_threshold,
             show_progress_bar=show_progress_bar,
             n_jobs=self._n_jobs,
             verbose=self._verbose,
@@ -61,22 +76,64 @@ class DataSubsetRefuter(CausalRefuter):
 
 
 def _refute_once(
-    data: pd.DataFrame,
+    data: Union[pd.DataFrame, SharedDataFrame],
     target_estimand: IdentifiedEstimand,
     estimate: CausalEstimate,
-    subset_fraction: float,
-    random_state: Optional[Union[int, np.random.RandomState]],
+    indices: np.ndarray,
 ):
-    if random_state is None:
-        new_data = data.sample(frac=subset_fraction)
-    else:
-        new_data = data.sample(frac=subset_fraction, random_state=random_state)
-
+    """Estimates the effect on the rows of the data with the given positional indices. The data can either be a
+    DataFrame or a SharedDataFrame, such that parallel workers only receive the indices of their subset."""
+    new_data = data.take(indices)
     new_estimator = CausalEstimator.get_estimator_object(new_data, target_estimand, estimate)
     new_effect = new_estimator.estimate_effect()
     return new_effect.value
 
 
+def _generate_subset_indices(
+    data: pd.DataFrame,
+    treatment_name: List[str],
+    subset_fraction: float,
+    num_simulations: int,
+    stratify_by_treatment: bool,
+    random_state: Union[np.random.RandomState, ModuleType],
+) -> np.ndarray:
+    """Draws the (sorted) positional indices of the rows of all subsets upfront, one row of the returned array per
+    simulation. With stratification, every subset contains the subset fraction of the rows of each treatment value."""
+    if stratify_by_treatment:
+        groups = list(data.groupby(treatment_name, sort=True).indices.values())
+    else:
+        groups = [np.arange(len(data))]
+    subset_indices = np.concatenate(
+        [
+            np.stack(
+                [
+                    random_state.choice(group, size=int(round(subset_fraction * len(group))), replace=False)
+                    for _ in range(num_simulations)
+                ]
+            ).reshape(num_simulations, -1)
+            for group in groups
+        ],
+        axis=1,
+    )
+    subset_indices.sort(axis=1)
+    return subset_indices
+
+
+def _update_running_variance(count: int, mean: float, sum_squares: float, values: np.ndarray):
+    """Merges the count, mean and sum of squared deviations from the mean of previous values with new values (Chan
+    et al., 1979), such that the variance is updated without keeping all values.
+
+    :returns: The updated count, mean and sum of squared deviations from the mean.
+    """
+    new_count = count + len(values)
+    delta = np.mean(values) - mean
+    new_mean = mean + delta * len(values) / new_count
+    new_sum_squares = (
+        sum_squares + np.sum((values - np.mean(values)) ** 2) + delta**2 * count * len(values) / new_count
+    )
+    return new_count, new_mean, new_sum_squares
+
+
 def refute_data_subset(
     data: pd.DataFrame,
     target_estimand: IdentifiedEstimand,
@@ -84,6 +141,8 @@ def refute_data_subset(
     subset_fraction: float = 0.8,
     num_simulations: int = 100,
     random_state: Optional[Union[int, np.random.RandomState]] = None,
+    stratify_by_treatment: bool = False,
+    convergence_threshold: Optional[float] = None,
     show_progress_bar: bool = False,
     n_jobs: int = 1,
     verbose: int = 0,
@@ -97,6 +156,8 @@ def refute_data_subset(
     :param subset_fraction: Fraction of the data to be used for re-estimation, which is ``DataSubsetRefuter.DEFAULT_SUBSET_FRACTION`` by default.
     :param num_simulations: The number of simulations to be run, ``CausalRefuter.DEFAULT_NUM_SIMULATIONS`` by default
     :param random_state: The seed value to be added if we wish to repeat the same random behavior. For this purpose, we repeat the same seed in the psuedo-random generator.
+    :param stratify_by_treatment: Whether every subset contains the subset fraction of the units of each treatment value. Only meaningful for discrete treatments.
+    :param convergence_threshold: If given, the simulations stop early once the standard deviation of the estimates changes by less than this fraction after ``SIMULATIONS_PER_CONVERGENCE_CHECK`` further simulations. By default, all simulations are run.
     :param n_jobs: The maximum number of concurrently running jobs. If -1 all CPUs are used. If 1 is given, no parallel computing code is used at all (this is the default).
     :param verbose: The verbosity level: if non zero, progress messages are printed. Above 50, the output is sent to stdout. The frequency of the messages increases with the verbosity level. If it more than 10, all iterations are reported. The default is 0.
     """
@@ -107,16 +168,53 @@ def refute_data_subset(
         )
     )
 
-    # Run refutation in parallel
-    sample_estimates = Parallel(n_jobs=n_jobs, verbose=verbose)(
-        delayed(_refute_once)(data, target_estimand, estimate, subset_fraction, random_state)
-        for _ in tqdm(
-            range(num_simulations),
-            colour=CausalRefuter.PROGRESS_BAR_COLOR,
-            disable=not show_progress_bar,
-            desc="Refuting Estimates: ",
-        )
+    # All subsets are drawn upfront, such that the results do not depend on n_jobs. The workers only receive the
+    # indices of their subset and a memory-mapped copy of the data instead of the data itself.
+    if random_state is None:
+        random_state = np.random
+    elif isinstance(random_state, int):
+        random_state = np.random.RandomState(seed=random_state)
+    subset_indices = _generate_subset_indices(
+        data, target_estimand.treatment_variable, subset_fraction, num_simulations, stratify_by_treatment, random_state
     )
+    shared_data = SharedDataFrame(data) if effective_n_jobs(n_jobs) > 1 else data
+
+    # Run refutation in parallel. With a convergence threshold, the running variance of the estimates is checked after
+    # every batch of simulations.
+    batch_size = num_simulations if convergence_threshold is None else SIMULATIONS_PER_CONVERGENCE_CHECK
+    sample_estimates = []
+    count, mean, sum_squares = 0, 0.0, 0.0
+    previous_std = None
+    with tqdm(
+        total=num_simulations,
+        colour=CausalRefuter.PROGRESS_BAR_COLOR,
+        disable=not show_progress_bar,
+        desc="Refuting Estimates: ",
+    ) as progress_bar, Parallel(n_jobs=n_jobs, verbose=verbose) as parallel:
+        for batch_start in range(0, num_simulations, batch_size):
+            batch_estimates = parallel(
+                delayed(_refute_once)(shared_data, target_estimand, estimate, indices)
+                for indices in subset_indices[batch_start : batch_start + batch_size]
+            )
+            sample_estimates.extend(batch_estimates)
+            progress_bar.update(len(batch_estimates))
+            if convergence_threshold is None:
+                continue
+
+            count, mean, sum_squares = _update_running_variance(count, mean, sum_squares, np.array(batch_estimates))
+            std = np.sqrt(sum_squares / (count - 1)) if count > 1 else None
+            if (
+                previous_std is not None
+                and len(sample_estimates) < num_simulations
+                and abs(std - previous_std) <= convergence_threshold * std
+            ):
+                logger.info(
+                    "Stopping after {} simulations, the standard deviation of the estimates converged to {}".format(
+                        count, std
+                    )
+                )
+                break
+            previous_std = std
     sample_estimates = np.array(sample_estimates)
 
     refute = CausalRefutation(estimate.value, np.mean(sample_estimates), refutation_type="Refute: Use a subset of data")
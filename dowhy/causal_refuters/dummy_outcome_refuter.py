@@ -1,10 +1,12 @@
 import copy
 import logging
 from collections import OrderedDict, namedtuple
-from typing import Callable, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
+import joblib
 import numpy as np
 import pandas as pd
+from joblib import Parallel, delayed, effective_n_jobs
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.linear_model import LinearRegression
 from sklearn.neighbors import KNeighborsRegressor
@@ -15,6 +17,7 @@ from tqdm.auto import tqdm
 from dowhy.causal_estimator import CausalEstimate, CausalEstimator
 from dowhy.causal_identifier.identified_estimand import IdentifiedEstimand
 from dowhy.causal_refuter import CausalRefutation, CausalRefuter, choose_variables, test_significance
+from dowhy.utils.shared_data import overlay_columns
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +27,8 @@ TestFraction = namedtuple("TestFraction", ["base", "other"])
 
 # The currently supported estimators
 SUPPORTED_ESTIMATORS = ["linear_regression", "knn", "svm", "random_forest", "neural_network"]
+# The estimators whose fit only depends on the training data
+DETERMINISTIC_ESTIMATORS = ["linear_regression", "knn", "svm"]
 # The default standard deviation for noise
 DEFAULT_STD_DEV = 0.1
 # The default scaling factor to determine the bucket size
@@ -38,6 +43,8 @@ DEFAULT_TRUE_CAUSAL_EFFECT = lambda x: 0
 DEFAULT_TEST_FRACTION = [TestFraction(0.5, 0.5)]
 
 DEFAULT_NEW_DATA_WITH_UNOBSERVED_CONFOUNDING = None
+# The number of simulations that are run by one parallel task
+SIMULATIONS_PER_TASK = 10
 
 
 class DummyOutcomeRefuter(CausalRefuter):
@@ -210,6 +217,7 @@ class DummyOutcomeRefuter(CausalRefuter):
             "unobserved_confounder_values", DEFAULT_NEW_DATA_WITH_UNOBSERVED_CONFOUNDING
         )
         self._required_variables = kwargs.pop("required_variables", True)
+        self._random_state = kwargs.pop("random_state", None)
 
         if self._required_variables is False:
             raise ValueError("The value of required_variables cannot be False")
@@ -234,6 +242,9 @@ class DummyOutcomeRefuter(CausalRefuter):
             unobserved_confounder_values=self._unobserved_confounder_values,
             true_causal_effect=self._true_causal_effect,
             show_progress_bar=show_progress_bar,
+            random_state=self._random_state,
+            n_jobs=self._n_jobs,
+            verbose=self._verbose,
         )
         for refute in refutes:
             refute.add_refuter(self)
@@ -255,6 +266,9 @@ def refute_dummy_outcome(
     unobserved_confounder_values: Optional[List] = DEFAULT_NEW_DATA_WITH_UNOBSERVED_CONFOUNDING,
     true_causal_effect: Callable = DEFAULT_TRUE_CAUSAL_EFFECT,
     show_progress_bar=False,
+    random_state: Optional[Union[int, np.random.RandomState]] = None,
+    n_jobs: int = 1,
+    verbose: int = 0,
     **_,
 ) -> List[CausalRefutation]:
     """Refute an estimate by replacing the outcome with a simulated variable
@@ -427,7 +441,11 @@ def refute_dummy_outcome(
     logger.info("Refutation over {} simulated datasets".format(num_simulations))
     logger.info("The transformation passed: {}".format(transformation_list))
 
-    simulation_results = []
+    if random_state is None:
+        random_state = np.random
+    elif isinstance(random_state, int):
+        random_state = np.random.RandomState(seed=random_state)
+
     refute_list = []
 
     # We use collections.OrderedDict to maintain the order in which the data is stored
@@ -442,130 +460,90 @@ def refute_dummy_outcome(
         + estimate.params["effect_modifiers"],
     )
 
-    # The rationale behind ordering of the loops is the fact that we induce randomness everytime we create the
-    # Train and the Validation Datasets. Thus, we run the simulation loop followed by the training and the validation
-    # loops. Thus, we can get different values everytime we get the estimator.
-
-    # for _ in range( self._num_simulations ):
-    for _ in tqdm(
-        range(num_simulations),
-        colour=CausalRefuter.PROGRESS_BAR_COLOR,
-        disable=not show_progress_bar,
-        desc="Refuting Estimates: ",
-    ):
-        estimates = []
-
-        if estimator_present == False:
+    if estimator_present == False:
 
-            # Warn the user that the specified parameter is not applicable when no estimator is present in the transformation
-            if test_fraction != DEFAULT_TEST_FRACTION:
-                logger.warning("'test_fraction' is not applicable as there is no base treatment value.")
+        # Warn the user that the specified parameter is not applicable when no estimator is present in the transformation
+        if test_fraction != DEFAULT_TEST_FRACTION:
+            logger.warning("'test_fraction' is not applicable as there is no base treatment value.")
 
-            # Adding an unobserved confounder if provided by the user
-            if unobserved_confounder_values is not None:
-                data["simulated"] = unobserved_confounder_values
+        # Without an estimator, the dummy outcomes of all simulations are transformations of the outcome of the whole
+        # data. Hence, only the outcome differs between the simulations and everything else is shared.
+        # Adding an unobserved confounder if provided by the user
+        if unobserved_confounder_values is not None:
+            data = overlay_columns(data, {"simulated": unobserved_confounder_values})
+            if "simulated" not in chosen_variables:
                 chosen_variables.append("simulated")
-            # We set X_train = 0 and outcome_train to be 0
-            validation_df = data
-            X_train = None
-            outcome_train = None
-            X_validation_df = validation_df[chosen_variables]
-
-            X_validation = X_validation_df.values
-            outcome_validation = validation_df[outcome_name].values
-
-            # Get the final outcome, after running through all the values in the transformation list
-            outcome_validation = process_data(
-                outcome_name, X_train, outcome_train, X_validation, outcome_validation, transformation_list
-            )
-
-            # Check if the value of true effect has been already stored
-            # We use None as the key as we have no base category for this refutation
-            if None not in causal_effect_map:
-                # As we currently support only one treatment
-                causal_effect_map[None] = true_causal_effect(validation_df[treatment_name[0]])
-
-            outcome_validation += causal_effect_map[None]
-
-            new_data = validation_df.assign(dummy_outcome=outcome_validation)
-
-            new_estimator = CausalEstimator.get_estimator_object(new_data, identified_estimand, estimate)
-            new_effect = new_estimator.estimate_effect()
-            estimates.append(new_effect.value)
-
-        else:
+        # We use None as the key as we have no base category for this refutation
+        # As we currently support only one treatment
+        causal_effect_map[None] = true_causal_effect(data[treatment_name[0]])
+        simulation_results = _estimate_effects_of_transformed_outcomes(
+            data,
+            identified_estimand,
+            estimate,
+            outcome_name,
+            transformation_list,
+            causal_effect_map[None],
+            num_simulations,
+            random_state,
+            n_jobs,
+            verbose,
+            show_progress_bar,
+        )[:, np.newaxis]
 
-            groups = preprocess_data_by_treatment(
+    else:
+        groups = list(
+            preprocess_data_by_treatment(
                 data, treatment_name, unobserved_confounder_values, bucket_size_scale_factor, chosen_variables
             )
-            group_count = 0
-
-            if len(test_fraction) == 1:
-                test_fraction = len(groups) * test_fraction
-
-            for key_train, _ in groups:
-                base_train = groups.get_group(key_train).sample(frac=test_fraction[group_count].base)
-                train_set = set([tuple(line) for line in base_train.values])
-                total_set = set([tuple(line) for line in groups.get_group(key_train).values])
-                base_validation = pd.DataFrame(list(total_set.difference(train_set)), columns=base_train.columns)
-                X_train_df = base_train[chosen_variables]
-
-                X_train = X_train_df.values
-                outcome_train = base_train[outcome_name].values
-
-                validation_df = []
-                transformation_list_temp = transformation_list
-                validation_df.append(base_validation)
-
-                for key_validation, _ in groups:
-                    if key_validation != key_train:
-                        validation_df.append(
-                            groups.get_group(key_validation).sample(frac=test_fraction[group_count].other)
-                        )
-
-                validation_df = pd.concat(validation_df)
-                X_validation_df = validation_df[chosen_variables]
-
-                X_validation = X_validation_df.values
-                outcome_validation = validation_df[outcome_name].values
-
-                # If the number of data points is too few, run the default transformation: [("zero",""),("noise", {'std_dev':1} )]
-                if X_train.shape[0] <= min_data_point_threshold:
-                    transformation_list_temp = DEFAULT_TRANSFORMATION
-                    logger.warning(
-                        "The number of data points in X_train:{} for category:{} is less than threshold:{}".format(
-                            X_train.shape[0], key_train, min_data_point_threshold
-                        )
-                    )
-                    logger.warning(
-                        "Therefore, defaulting to the minimal set of transformations:{}".format(
-                            transformation_list_temp
+        )
+        if len(test_fraction) == 1:
+            test_fraction = len(groups) * test_fraction
+
+        # The rationale behind ordering of the loops is the fact that we induce randomness everytime we create the
+        # Train and the Validation Datasets. Thus, we run the simulation loop followed by the training and the validation
+        # loops. Thus, we can get different values everytime we get the estimator.
+        # Every simulation gets its own seed, such that the results do not depend on n_jobs.
+        seeds = random_state.randint(np.iinfo(np.int32).max, size=num_simulations)
+        batches = [
+            seeds[batch_start : batch_start + SIMULATIONS_PER_TASK]
+            for batch_start in range(0, num_simulations, SIMULATIONS_PER_TASK)
+        ]
+        # The progress bar is updated whenever the batches of all jobs are finished
+        num_tasks = effective_n_jobs(n_jobs)
+        batch_results = []
+        with tqdm(
+            total=num_simulations,
+            colour=CausalRefuter.PROGRESS_BAR_COLOR,
+            disable=not show_progress_bar,
+            desc="Refuting Estimates: ",
+        ) as progress_bar, Parallel(n_jobs=n_jobs, verbose=verbose) as parallel:
+            for task_start in range(0, len(batches), num_tasks):
+                task_batches = batches[task_start : task_start + num_tasks]
+                batch_results.extend(
+                    parallel(
+                        delayed(_simulate_estimated_dummy_outcomes)(
+                            groups,
+                            identified_estimand,
+                            estimate,
+                            treatment_name,
+                            outcome_name,
+                            chosen_variables,
+                            transformation_list,
+                            test_fraction,
+                            min_data_point_threshold,
+                            true_causal_effect,
+                            batch_seeds,
                         )
+                        for batch_seeds in task_batches
                     )
-
-                outcome_validation = process_data(
-                    outcome_name, X_train, outcome_train, X_validation, outcome_validation, transformation_list_temp
                 )
+                progress_bar.update(sum(len(batch_seeds) for batch_seeds in task_batches))
+        simulation_results = [estimates for batch in batch_results for estimates, _ in batch]
 
-                # Check if the value of true effect has been already stored
-                # This ensures that we calculate the causal effect only once.
-                # We use key_train as we map data with respect to the base category of the data
-
-                if key_train not in causal_effect_map:
-                    # As we currently support only one treatment
-                    causal_effect_map[key_train] = true_causal_effect(validation_df[treatment_name[0]])
-
-                # Add h(t) to f(W) to get the dummy outcome
-                outcome_validation += causal_effect_map[key_train]
-
-                new_data = validation_df.assign(dummy_outcome=outcome_validation)
-                new_estimator = CausalEstimator.get_estimator_object(new_data, identified_estimand, estimate)
-                new_effect = new_estimator.estimate_effect()
-
-                estimates.append(new_effect.value)
-                group_count += 1
-
-        simulation_results.append(estimates)
+        # The true causal effects of the first simulation are reported, as the ones of the other simulations only
+        # differ by the units in the validation sets.
+        for (key_train, _), causal_effect in zip(groups, batch_results[0][0][1]):
+            causal_effect_map[key_train] = causal_effect
 
     # We convert to ndarray for ease in indexing
     # The data is of the form
@@ -623,6 +601,182 @@ def refute_dummy_outcome(
     return refute_list
 
 
+def _estimate_effects_of_transformed_outcomes(
+    data: pd.DataFrame,
+    identified_estimand: IdentifiedEstimand,
+    estimate: CausalEstimate,
+    outcome_name: str,
+    transformation_list: List,
+    causal_effect: Any,
+    num_simulations: int,
+    random_state: Union[np.random.RandomState, Any],
+    n_jobs: int,
+    verbose: int,
+    show_progress_bar: bool,
+) -> np.ndarray:
+    """Estimates the effect on the dummy outcomes of all simulations when the transformations do not include an
+    estimator. The dummy outcomes are generated for SIMULATIONS_PER_TASK simulations at once, and each parallel task
+    estimates the effects of one such batch. As the data only differs by the outcome, the estimator is only created
+    once and everything that does not depend on the outcome is reused (see
+    CausalEstimator._estimate_effect_with_outcome).
+    """
+    outcome = data[outcome_name].to_numpy()
+    new_estimator = None
+    estimates = []
+    num_tasks = effective_n_jobs(n_jobs)
+    with tqdm(
+        total=num_simulations,
+        colour=CausalRefuter.PROGRESS_BAR_COLOR,
+        disable=not show_progress_bar,
+        desc="Refuting Estimates: ",
+    ) as progress_bar, Parallel(n_jobs=n_jobs, verbose=verbose) as parallel:
+        for task_start in range(0, num_simulations, num_tasks * SIMULATIONS_PER_TASK):
+            batches = []
+            for batch_start in range(
+                task_start, min(task_start + num_tasks * SIMULATIONS_PER_TASK, num_simulations), SIMULATIONS_PER_TASK
+            ):
+                dummy_outcomes = _transform_outcomes(
+                    outcome_name,
+                    outcome,
+                    transformation_list,
+                    min(SIMULATIONS_PER_TASK, num_simulations - batch_start),
+                    random_state,
+                )
+                batches.append(dummy_outcomes + np.asarray(causal_effect))
+            if new_estimator is None:
+                new_data = overlay_columns(data, {"dummy_outcome": batches[0][0]})
+                new_estimator = CausalEstimator.get_estimator_object(new_data, identified_estimand, estimate)
+            for batch_estimates in parallel(
+                delayed(_estimate_effects_with_outcomes)(new_estimator, dummy_outcomes) for dummy_outcomes in batches
+            ):
+                estimates.extend(batch_estimates)
+            progress_bar.update(sum(len(dummy_outcomes) for dummy_outcomes in batches))
+    return np.array(estimates)
+
+
+def _estimate_effects_with_outcomes(estimator: CausalEstimator, outcomes: np.ndarray) -> List[float]:
+    """Estimates the effect for each of the given outcomes (one row per simulation) with the same estimator."""
+    return [estimator._estimate_effect_with_outcome(outcome) for outcome in outcomes]
+
+
+def _transform_outcomes(
+    outcome_name: str,
+    outcome: np.ndarray,
+    transformation_list: List,
+    num_simulations: int,
+    random_state: Union[np.random.RandomState, Any],
+) -> np.ndarray:
+    """Applies the transformations without estimators to the outcome for several simulations at once.
+
+    :returns: A matrix with the transformed outcome of each simulation as row.
+    """
+    outcomes = np.tile(outcome.astype(float), (num_simulations, 1))
+    for action, func_args in transformation_list:
+        if action == "noise":
+            outcomes = noise(outcomes, random_state=random_state, **func_args)
+        elif action == "permute":
+            if func_args["permute_fraction"] == 1:
+                permutations = np.argsort(random_state.random_sample(outcomes.shape), axis=1)
+                outcomes = np.take_along_axis(outcomes, permutations, axis=1)
+            else:
+                outcomes = np.array(
+                    [permute(outcome_name, row, random_state=random_state, **func_args) for row in outcomes]
+                )
+        elif action == "zero":
+            outcomes = np.zeros(outcomes.shape)
+    return outcomes
+
+
+def _simulate_estimated_dummy_outcomes(
+    groups: List[Tuple[Any, pd.DataFrame]],
+    identified_estimand: IdentifiedEstimand,
+    estimate: CausalEstimate,
+    treatment_name: List[str],
+    outcome_name: str,
+    chosen_variables: List[str],
+    transformation_list: List,
+    test_fraction: List[TestFraction],
+    min_data_point_threshold: float,
+    true_causal_effect: Callable,
+    seeds: np.ndarray,
+) -> List[Tuple[List[float], List[Any]]]:
+    """Runs the simulations with the given seeds when the transformations include an estimator. For every group of the
+    treatment, f(W) is estimated on a random part of the group and the dummy outcome is predicted for the remaining
+    part and random parts of the other groups.
+
+    If the whole group is used for training, the fitted deterministic estimators are shared by the simulations of this
+    call. Otherwise, the training data differs between the simulations and no estimators are cached.
+
+    :returns: For each simulation, the estimates and the true causal effects of the groups.
+    """
+    fitted_estimators = {}
+    results = []
+    for seed in seeds:
+        random_state = np.random.RandomState(seed)
+        estimates = []
+        causal_effects = []
+        for group_count, (key_train, group) in enumerate(groups):
+            # The training units are kept in their original order, such that identical training sets can be
+            # recognized
+            train_positions = np.sort(
+                random_state.choice(
+                    group.shape[0], size=round(test_fraction[group_count].base * group.shape[0]), replace=False
+                )
+            )
+            is_train = np.zeros(group.shape[0], dtype=bool)
+            is_train[train_positions] = True
+            base_train = group.iloc[train_positions]
+            base_validation = group.iloc[~is_train]
+            X_train = base_train[chosen_variables].values
+            outcome_train = base_train[outcome_name].values
+
+            validation_df = [base_validation]
+            for key_validation, validation_group in groups:
+                if key_validation != key_train:
+                    validation_df.append(
+                        validation_group.sample(frac=test_fraction[group_count].other, random_state=random_state)
+                    )
+            validation_df = pd.concat(validation_df)
+            X_validation = validation_df[chosen_variables].values
+            outcome_validation = validation_df[outcome_name].values
+
+            # If the number of data points is too few, run the default transformation: [("zero",""),("noise", {'std_dev':1} )]
+            transformation_list_temp = transformation_list
+            if X_train.shape[0] <= min_data_point_threshold:
+                transformation_list_temp = DEFAULT_TRANSFORMATION
+                logger.warning(
+                    "The number of data points in X_train:{} for category:{} is less than threshold:{}".format(
+                        X_train.shape[0], key_train, min_data_point_threshold
+                    )
+                )
+                logger.warning(
+                    "Therefore, defaulting to the minimal set of transformations:{}".format(transformation_list_temp)
+                )
+
+            outcome_validation = process_data(
+                outcome_name,
+                X_train,
+                outcome_train,
+                X_validation,
+                outcome_validation,
+                transformation_list_temp,
+                random_state=random_state,
+                fitted_estimators=fitted_estimators if test_fraction[group_count].base == 1 else None,
+            )
+
+            # Add h(t) to f(W) to get the dummy outcome
+            # As we currently support only one treatment
+            causal_effect = true_causal_effect(validation_df[treatment_name[0]])
+            outcome_validation += causal_effect
+
+            new_data = overlay_columns(validation_df, {"dummy_outcome": outcome_validation})
+            new_estimator = CausalEstimator.get_estimator_object(new_data, identified_estimand, estimate)
+            estimates.append(new_estimator.estimate_effect().value)
+            causal_effects.append(causal_effect)
+        results.append((estimates, causal_effects))
+    return results
+
+
 def process_data(
     outcome_name: str,
     X_train: np.ndarray,
@@ -630,6 +784,8 @@ def process_data(
     X_validation: np.ndarray,
     outcome_validation: np.ndarray,
     transformation_list: List,
+    random_state: Optional[np.random.RandomState] = None,
+    fitted_estimators: Optional[Dict[str, Callable]] = None,
 ):
     """
     We process the data by first training the estimators in the transformation_list on ``X_train`` and ``outcome_train``.
@@ -652,6 +808,10 @@ def process_data(
     :type outcome_validation: np.ndarray
     :param transformation_list: The list of transformations on the outcome data required to produce a dummy outcome
     :type transformation_list: np.ndarray
+    :param random_state: The random state for the noise and permute transformations. If None, the global numpy random state is used.
+    :type random_state: np.random.RandomState, optional
+    :param fitted_estimators: Cache of the fitted deterministic estimators by their training data (see _estimate_dummy_outcome)
+    :type fitted_estimators: dict, optional
     """
     for action, func_args in transformation_list:
         if callable(action):
@@ -659,17 +819,19 @@ def process_data(
             outcome_train = estimator(X_train)
             outcome_validation = estimator(X_validation)
         elif action in SUPPORTED_ESTIMATORS:
-            estimator = _estimate_dummy_outcome(action, X_train, outcome_train, **func_args)
+            estimator = _estimate_dummy_outcome(
+                action, X_train, outcome_train, fitted_estimators=fitted_estimators, **func_args
+            )
             outcome_train = estimator(X_train)
             outcome_validation = estimator(X_validation)
         elif action == "noise":
             if X_train is not None:
-                outcome_train = noise(outcome_train, **func_args)
-            outcome_validation = noise(outcome_validation, **func_args)
+                outcome_train = noise(outcome_train, random_state=random_state, **func_args)
+            outcome_validation = noise(outcome_validation, random_state=random_state, **func_args)
         elif action == "permute":
             if X_train is not None:
-                outcome_train = permute(outcome_name, outcome_train, **func_args)
-            outcome_validation = permute(outcome_name, outcome_validation, **func_args)
+                outcome_train = permute(outcome_name, outcome_train, random_state=random_state, **func_args)
+            outcome_validation = permute(outcome_name, outcome_validation, random_state=random_state, **func_args)
         elif action == "zero":
             if X_train is not None:
                 outcome_train = np.zeros(outcome_train.shape)
@@ -714,8 +876,9 @@ def preprocess_data_by_treatment(
     assert len(treatment_name) == 1, "At present, DoWhy supports a simgle treatment variable"
 
     if unobserved_confounder_values is not None:
-        data["simulated"] = unobserved_confounder_values
-        chosen_variables.append("simulated")
+        data = overlay_columns(data, {"simulated": unobserved_confounder_values})
+        if "simulated" not in chosen_variables:
+            chosen_variables.append("simulated")
 
     treatment_variable_name = treatment_name[0]  # As we only have a single treatment
     variable_type = data[treatment_variable_name].dtypes
@@ -729,9 +892,7 @@ def preprocess_data_by_treatment(
         data = data
         std_dev = data[treatment_variable_name].std()
         num_bins = (data.max() - data.min()) / (bucket_size_scale_factor * std_dev)
-        data["bins"] = pd.cut(data[treatment_variable_name], num_bins)
-        groups = data.groupby("bins")
-        data.drop("bins", axis=1, inplace=True)
+        groups = data.groupby(pd.cut(data[treatment_variable_name], num_bins))
         return groups
 
     elif "categorical" in variable_type.name:
@@ -743,7 +904,13 @@ def preprocess_data_by_treatment(
         raise ValueError("Passed {}. Expected bool, float, int or categorical.".format(variable_type.name))
 
 
-def _estimate_dummy_outcome(action: str, X_train: np.ndarray, outcome: np.ndarray, **func_args):
+def _estimate_dummy_outcome(
+    action: str,
+    X_train: np.ndarray,
+    outcome: np.ndarray,
+    fitted_estimators: Optional[Dict[str, Callable]] = None,
+    **func_args,
+):
     """
     A function that takes in any sklearn estimator and returns a trained estimator
 
@@ -753,15 +920,28 @@ def _estimate_dummy_outcome(action: str, X_train: np.ndarray, outcome: np.ndarra
         The variable used to estimate the value of outcome.
     :param 'outcome': np.ndarray
         The variable which we wish to estimate.
+    :param 'fitted_estimators': dict, optional
+        Cache of fitted estimators. Estimators that always give the same fit for the same training data are only
+        fitted once for identical training data.
     :param 'func_args': variable length keyworded argument
         The parameters passed to the estimator.
     """
+    cache_key = None
+    if fitted_estimators is not None and (
+        action in DETERMINISTIC_ESTIMATORS or isinstance(func_args.get("random_state"), int)
+    ):
+        cache_key = joblib.hash((action, func_args, X_train, outcome))
+        if cache_key in fitted_estimators:
+            return fitted_estimators[cache_key]
+
     estimator = _get_regressor_object(action, **func_args)
     X = X_train
     y = outcome
 
     estimator = estimator.fit(X, y)
 
+    if cache_key is not None:
+        fitted_estimators[cache_key] = estimator.predict
     return estimator.predict
 
 
@@ -788,7 +968,12 @@ def _get_regressor_object(action: str, **func_args):
         raise ValueError("The function: {} is not supported by dowhy at the moment.".format(action))
 
 
-def permute(outcome_name: str, outcome: np.ndarray, permute_fraction: float):
+def permute(
+    outcome_name: str,
+    outcome: np.ndarray,
+    permute_fraction: float,
+    random_state: Optional[np.random.RandomState] = None,
+):
     """
     If the permute_fraction is 1, we permute all the values in the outcome.
     Otherwise we make use of the Fisher Yates shuffle.
@@ -798,20 +983,22 @@ def permute(outcome_name: str, outcome: np.ndarray, permute_fraction: float):
         The outcome variable to be permuted.
     :param 'permute_fraction': float [0, 1]
         The fraction of rows permuted.
+    :param 'random_state': np.random.RandomState, optional
+        The random state to draw the permutation from. If None, the global numpy random state is used.
     """
+    if random_state is None:
+        random_state = np.random
     if permute_fraction == 1:
-        outcome = pd.DataFrame(outcome)
-        outcome.columns = [outcome_name]
-        return outcome[outcome_name].sample(frac=1).values
+        return random_state.permutation(outcome)
     elif permute_fraction < 1:
         permute_fraction /= 2  # We do this as every swap leads to two changes
-        changes = np.where(np.random.uniform(0, 1, outcome.shape[0]) <= permute_fraction)[
+        changes = np.where(random_state.uniform(0, 1, outcome.shape[0]) <= permute_fraction)[
             0
         ]  # As this is tuple containing a single element (array[...])
         num_rows = outcome.shape[0]
         for change in changes:
             if change + 1 < num_rows:
-                index = np.random.randint(change + 1, num_rows)
+                index = random_state.randint(change + 1, num_rows)
                 temp = outcome[change]
                 outcome[change] = outcome[index]
                 outcome[index] = temp
@@ -820,15 +1007,20 @@ def permute(outcome_name: str, outcome: np.ndarray, permute_fraction: float):
         raise ValueError("The value of permute_fraction is {}. Which is greater than 1.".format(permute_fraction))
 
 
-def noise(outcome: np.ndarray, std_dev: float):
+def noise(outcome: np.ndarray, std_dev: float, random_state: Optional[np.random.RandomState] = None):
     """
     Add white noise with mean 0 and standard deviation = std_dev
 
     :param 'outcome': np.ndarray
-        The outcome variable, to which the white noise is added.
+        The outcome variable, to which the white noise is added. It can also be a matrix with the outcomes of several
+        simulations.
     :param 'std_dev': float
         The standard deviation of the white noise.
+    :param 'random_state': np.random.RandomState, optional
+        The random state to draw the noise from. If None, the global numpy random state is used.
 
     :returns: outcome with added noise
     """
-    return outcome + np.random.normal(scale=std_dev, size=outcome.shape[0])
+    if random_state is None:
+        random_state = np.random
+    return outcome + random_state.normal(scale=std_dev, size=outcome.shape)
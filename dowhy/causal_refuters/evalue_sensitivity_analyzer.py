@@ -4,6 +4,7 @@ import logging
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
+import scipy.linalg
 import statsmodels.api as sm
 
 from dowhy.causal_estimator import CausalEstimate, CausalEstimator
@@ -97,6 +98,9 @@ class EValueSensitivityAnalyzer:
         Computes E-value for point estimate and confidence limits. The estimate and
         confidence limits are converted to the risk ratio scale before the E-value is calculated.
 
+        The coefficient estimate and standard error can also be arrays, in which case the E-values of all
+        estimates are computed at once and unreported E-values are NaN instead of None.
+
         :param coef_est: coefficient estimate
         :param coef_se: coefficient standard error
         """
@@ -127,6 +131,22 @@ class EValueSensitivityAnalyzer:
                     "4) sm.families.Gamma(link=sm.families.links.log), "
                 )
 
+    def get_evalues(self, coef_ests, coef_ses):
+        """
+        Computes E-values for many point estimates and their confidence limits at once, e.g. for the estimates of
+        several models. See ``get_evalue``.
+
+        :param coef_ests: array of coefficient estimates
+        :param coef_ses: array of coefficient standard errors
+        :returns: pd.DataFrame with one row per estimate and the same columns as the keys returned by ``get_evalue``.
+            E-values that are not reported are NaN.
+        """
+        coef_ests = np.asarray(coef_ests, dtype=float)
+        coef_ses = np.asarray(coef_ses, dtype=float)
+        if coef_ests.ndim != 1 or coef_ests.shape != coef_ses.shape:
+            raise ValueError("Coefficient estimates and standard errors should be 1-dimensional arrays of equal length")
+        return pd.DataFrame(self.get_evalue(coef_ests, coef_ses))
+
     def plot(
         self,
         num_points_per_contour=200,
@@ -246,54 +266,117 @@ class EValueSensitivityAnalyzer:
         See: https://arxiv.org/pdf/2011.07030.pdf and https://github.com/LucyMcGowan/tipr
         """
 
-        new_ests = []
-        new_lo = []
-        new_hi = []
-        observed_covariate_e_values = []
         backdoor_vars = self.estimand.get_backdoor_variables()
-        for drop_var in backdoor_vars:
-
-            # new estimator
-            new_backdoor_vars = [var for var in backdoor_vars if var != drop_var]
-            new_estimand = copy.deepcopy(self.estimand)
-            new_estimand.set_backdoor_variables(new_backdoor_vars)
-            new_estimator = CausalEstimator.get_estimator_object(self.data, new_estimand, self.estimate)
+        coef_ests_ses = self._estimate_without_covariates_from_full_model(backdoor_vars)
+        if coef_ests_ses is None:
+            coef_ests_ses = [self._estimate_without_covariate(backdoor_vars, drop_var) for drop_var in backdoor_vars]
+        coef_ests, coef_ses = np.array(coef_ests_ses, dtype=float).reshape(-1, 2).T
+        new_stats = self.get_evalues(coef_ests, coef_ses)
 
-            # new effect estimate
-            new_effect = new_estimator.estimate_effect()
-            if isinstance(self.estimate.estimator, LinearRegressionEstimator):
-                coef_est = new_effect.value
-                coef_se = new_effect.get_standard_error()[0]
-            elif isinstance(self.estimate.estimator, GeneralizedLinearModelEstimator):
-                coef_est = new_effect.estimator.model.params[1:2].to_numpy()[0]
-                coef_se = new_effect.estimator.model.bse[1:2].to_numpy()[0]
-            new_stats = self.get_evalue(coef_est, coef_se)
-
-            # observed covariate E-value
-            if self.stats["evalue_lower_ci"] is None:
-                ci = self.stats["converted_upper_ci"]
-                new_ci = new_stats["converted_upper_ci"]
-            else:
-                ci = self.stats["converted_lower_ci"]
-                new_ci = new_stats["converted_lower_ci"]
-            covariate_e_value = self._observed_covariate_e_value(ci, new_ci)
-
-            new_ests.append(new_stats["converted_estimate"])
-            new_lo.append(new_stats["converted_lower_ci"])
-            new_hi.append(new_stats["converted_upper_ci"])
-            observed_covariate_e_values.append(covariate_e_value)
+        # observed covariate E-values
+        if self.stats["evalue_lower_ci"] is None:
+            ci = self.stats["converted_upper_ci"]
+            new_ci = new_stats["converted_upper_ci"].to_numpy()
+        else:
+            ci = self.stats["converted_lower_ci"]
+            new_ci = new_stats["converted_lower_ci"].to_numpy()
+        observed_covariate_e_values = self._observed_covariate_e_value(ci, new_ci)
+        new_ests = new_stats["converted_estimate"]
+        new_lo = new_stats["converted_lower_ci"]
+        new_hi = new_stats["converted_upper_ci"]
 
         self.benchmarking_results = pd.DataFrame(
             {
                 "dropped_covariate": backdoor_vars,
-                "converted_est": new_ests,
-                "converted_lower_ci": new_lo,
-                "converted_upper_ci": new_hi,
+                "converted_est": new_ests.to_numpy(),
+                "converted_lower_ci": new_lo.to_numpy(),
+                "converted_upper_ci": new_hi.to_numpy(),
                 "observed_covariate_e_value": observed_covariate_e_values,
             }
         ).sort_values(by="observed_covariate_e_value", ascending=False)
         self.benchmarking_results = self.benchmarking_results.set_index("dropped_covariate")
 
+    def _estimate_without_covariate(self, backdoor_vars, drop_var):
+        """
+        Re-fits the estimator without a measured confounder.
+
+        :param backdoor_vars: all measured confounders
+        :param drop_var: the measured confounder to drop
+        :returns: coefficient estimate and standard error of the new model
+        """
+        new_backdoor_vars = [var for var in backdoor_vars if var != drop_var]
+        new_estimand = copy.deepcopy(self.estimand)
+        new_estimand.set_backdoor_variables(new_backdoor_vars)
+        new_estimator = CausalEstimator.get_estimator_object(self.data, new_estimand, self.estimate)
+
+        new_effect = new_estimator.estimate_effect()
+        if isinstance(self.estimate.estimator, LinearRegressionEstimator):
+            return new_effect.value, new_effect.get_standard_error()[0]
+        else:
+            return (
+                new_effect.estimator.model.params[1:2].to_numpy()[0],
+                new_effect.estimator.model.bse[1:2].to_numpy()[0],
+            )
+
+    def _estimate_without_covariates_from_full_model(self, backdoor_vars):
+        """
+        Computes the coefficient estimates and standard errors of the linear regressions without each of the measured
+        confounders from a single QR decomposition of the features of the full model, instead of re-fitting one
+        regression per confounder. Dropping the feature columns G of a confounder from an OLS fit with coefficients
+        b, residual sum of squares RSS and C = (X'X)^-1 gives the coefficients b - C[:, G] C[G, G]^-1 b[G], the
+        residual sum of squares RSS + b[G]' C[G, G]^-1 b[G] and the inverse Gram matrix
+        C - C[:, G] C[G, G]^-1 C[G, :].
+
+        :param backdoor_vars: all measured confounders
+        :returns: list of coefficient estimates and standard errors, one per dropped confounder, or None if the
+            estimator is not a linear regression of a single treatment with analytical standard errors
+        """
+        estimator = self.estimate.estimator
+        if (
+            not isinstance(estimator, LinearRegressionEstimator)
+            or len(estimator._treatment_name) != 1
+            or estimator._effect_modifier_names
+            or estimator._confidence_intervals not in (None, False, True)
+            or estimator.model is None
+            or estimator._observed_common_causes is None
+        ):
+            return None
+        features = estimator._build_features()
+        n_samples, n_features = features.shape
+        if features.shape[1] != 2 + estimator._observed_common_causes.shape[1] or n_samples <= n_features:
+            # The treatment is encoded in more than one column
+            return None
+        _, r = np.linalg.qr(features)
+        if np.min(np.abs(np.diag(r))) <= np.finfo(float).eps * n_samples * np.max(np.abs(np.diag(r))):
+            # Collinear features, the fit of statsmodels is based on the pseudo-inverse
+            return None
+        r_inv = scipy.linalg.solve_triangular(r, np.eye(n_features))
+        inverse_gram = r_inv @ r_inv.T
+        coefficients = np.asarray(estimator.model.params, dtype=float)
+        rss = estimator.model.ssr
+
+        # The treatment is the second feature, followed by the encoded common causes
+        common_causes_columns = estimator._observed_common_causes.columns
+        delta = estimator._treatment_value - estimator._control_value
+        coef_ests_ses = []
+        for drop_var in backdoor_vars:
+            if drop_var in common_causes_columns:
+                dropped_columns = [drop_var]
+            else:
+                dropped_columns = pd.get_dummies(self.data[[drop_var]], drop_first=True).columns
+            dropped = 2 + np.array([common_causes_columns.get_loc(column) for column in dropped_columns], dtype=int)
+            dropped_inverse_gram = np.linalg.inv(inverse_gram[np.ix_(dropped, dropped)])
+            treatment_dropped_gram = inverse_gram[1, dropped] @ dropped_inverse_gram
+            coefficient = coefficients[1] - treatment_dropped_gram @ coefficients[dropped]
+            new_rss = rss + coefficients[dropped] @ dropped_inverse_gram @ coefficients[dropped]
+            variance = (
+                new_rss
+                / (n_samples - n_features + len(dropped))
+                * (inverse_gram[1, 1] - treatment_dropped_gram @ inverse_gram[dropped, 1])
+            )
+            coef_ests_ses.append((delta * coefficient, delta * np.sqrt(variance)))
+        return coef_ests_ses
+
     def _observed_covariate_e_value(self, ci, new_ci):
         """
         Computes Observed Covariate E-value given effect estimate from new model without
@@ -305,15 +388,11 @@ class EValueSensitivityAnalyzer:
         :param new_ci: limiting confidence bound from new model on risk ratio scale
         """
 
-        if ci < 1:
-            ci = 1 / ci
-            new_ci = 1 / new_ci
-        if ci < new_ci:
-            ratio = new_ci / ci
-        else:
-            ratio = ci / new_ci
+        ci, new_ci = np.broadcast_arrays(np.asarray(ci, dtype=float), np.asarray(new_ci, dtype=float))
+        ci, new_ci = np.where(ci < 1, 1 / ci, ci), np.where(ci < 1, 1 / new_ci, new_ci)
+        ratio = np.where(ci < new_ci, new_ci / ci, ci / new_ci)
 
-        return ratio + np.sqrt(ratio * (ratio - 1))
+        return (ratio + np.sqrt(ratio * (ratio - 1)))[()]
 
     def _evalue_OLS(self, est, se, sd, no_effect_baseline=0):
         """
@@ -324,7 +403,7 @@ class EValueSensitivityAnalyzer:
         :param sd: residual standard deviation
         :param no_effect_baseline: no_effect_baseline standardized difference to which to shift the observed estimate. (Default = 0)
         """
-        if se < 0:
+        if np.any(np.asarray(se) < 0):
             raise ValueError("Standard error cannot be negative")
 
         delta = abs(self.estimate.estimator._treatment_value - self.estimate.estimator._control_value)
@@ -342,7 +421,7 @@ class EValueSensitivityAnalyzer:
         :param se: standard error of the point estimate
         :param no_effect_baseline: no_effect_baseline standardized difference to which to shift the observed estimate. (Default = 0)
         """
-        if se < 0:
+        if se is not None and np.any(np.asarray(se) < 0):
             raise ValueError("Standard error cannot be negative")
 
         if se is None:
@@ -368,7 +447,7 @@ class EValueSensitivityAnalyzer:
         :param rare: if outcome is rare (<15%)
         :param no_effect_baseline: the no_effect_baseline OR to which to shift the observed estimate. (Default = 1)
         """
-        if est < 0:
+        if np.any(np.asarray(est) < 0):
             raise ValueError("Odds Ratio cannot be negative")
 
         est = self._or_to_rr(est, rare)
@@ -389,7 +468,11 @@ class EValueSensitivityAnalyzer:
         :param hi: upper limit of confidence interval
         :param no_effect_baseline: the no_effect_baseline RR to which to shift the observed estimate. (Default = 1)
         """
-        if est < 0:
+        is_scalar = np.ndim(est) == 0
+        est = np.asarray(est, dtype=float)
+        lo_values = np.full(est.shape, np.nan) if lo is None else np.asarray(lo, dtype=float)
+        hi_values = np.full(est.shape, np.nan) if hi is None else np.asarray(hi, dtype=float)
+        if np.any(est < 0):
             raise ValueError("Risk/Rate Ratio cannot be negative")
         if no_effect_baseline < 0:
             raise ValueError("no_effect_baseline value is impossible")
@@ -399,63 +482,61 @@ class EValueSensitivityAnalyzer:
                 "confounding needed to move the estimate and confidence interval to your specified no_effect_baseline value "
                 "rather than to the null value."
             )
-        if lo is not None and hi is not None:
-            if lo > hi:
-                raise ValueError("Lower confidence limit should be less than upper confidence limit")
-        if lo is not None and est < lo:
-            raise ValueError("Point estimate should be inside confidence interval")
-        if hi is not None and est > hi:
+        # comparisons with missing (NaN) limits are False
+        if np.any(lo_values > hi_values):
+            raise ValueError("Lower confidence limit should be less than upper confidence limit")
+        if np.any(est < lo_values) or np.any(est > hi_values):
             raise ValueError("Point estimate should be inside confidence interval")
 
         e_est = self._threshold(est, no_effect_baseline=no_effect_baseline)
-        e_lo = self._threshold(lo, no_effect_baseline=no_effect_baseline)
-        e_hi = self._threshold(hi, no_effect_baseline=no_effect_baseline)
+        e_lo = self._threshold(lo_values, no_effect_baseline=no_effect_baseline)
+        e_hi = self._threshold(hi_values, no_effect_baseline=no_effect_baseline)
 
         # if CI crosses null, set its E-value to 1
-        null_CI = False
-        if est > no_effect_baseline and lo is not None:
-            null_CI = lo < no_effect_baseline
-        if est < no_effect_baseline and hi is not None:
-            null_CI = hi > no_effect_baseline
-        if null_CI:
-            e_lo = np.float64(1)
-            e_hi = np.float64(1)
+        null_CI = ((est > no_effect_baseline) & (lo_values < no_effect_baseline)) | (
+            (est < no_effect_baseline) & (hi_values > no_effect_baseline)
+        )
+        e_lo = np.where(null_CI, 1.0, e_lo)
+        e_hi = np.where(null_CI, 1.0, e_hi)
 
         # only report E-value for CI limit closer to null
         if lo is not None or hi is not None:
-            if est > no_effect_baseline:
-                e_hi = None
-            else:
-                e_lo = None
+            e_hi = np.where(est > no_effect_baseline, np.nan, e_hi)
+            e_lo = np.where(est > no_effect_baseline, e_lo, np.nan)
 
-        return {
+        stats = {
             "converted_estimate": est,
-            "converted_lower_ci": lo,
-            "converted_upper_ci": hi,
+            "converted_lower_ci": lo_values,
+            "converted_upper_ci": hi_values,
             "evalue_estimate": e_est,
             "evalue_lower_ci": e_lo,
             "evalue_upper_ci": e_hi,
         }
+        if is_scalar:
+            stats = {key: None if np.isnan(value) else np.float64(value) for key, value in stats.items()}
+        return stats
 
     def _threshold(self, x, no_effect_baseline=1):
         """
         Computes E-value for single value of risk ratio.
 
-        :param x: risk ratio
+        :param x: risk ratio, or array of risk ratios
         :param no_effect_baseline: the no_effect_baseline RR to which to shift the observed estimate
         """
         if x is None:
             return None
 
-        if x <= 1:
-            x = 1 / x
-            no_effect_baseline = 1 / no_effect_baseline
-
-        if no_effect_baseline <= x:
-            return (x + np.sqrt(x * (x - no_effect_baseline))) / no_effect_baseline
-        else:
+        x = np.asarray(x, dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            no_effect_baseline = np.where(x <= 1, 1 / no_effect_baseline, no_effect_baseline)
+            x = np.where(x <= 1, 1 / x, x)
             ratio = no_effect_baseline / x
-            return ratio + np.sqrt(ratio * (ratio - 1))
+            e_value = np.where(
+                no_effect_baseline <= x,
+                (x + np.sqrt(x * (x - no_effect_baseline))) / no_effect_baseline,
+                ratio + np.sqrt(ratio * (ratio - 1)),
+            )
+        return e_value[()]
 
     def _to_smd(self, est, sd, delta=1):
         """
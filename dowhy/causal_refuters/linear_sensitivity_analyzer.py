@@ -222,6 +222,20 @@ class LinearSensitivityAnalyzer:
 
         return benchmarking_results
 
+    def get_sensitivity_grid(self, r2tu_w, r2yu_tw):
+        """
+        Computes the bias adjusted estimate, standard error, t-value and confidence intervals for every combination of
+        the given partial R^2 values of the unobserved confounder, without plotting.
+
+        :param r2tu_w: hypothetical partial R^2 values of confounder with treatment (x - axis)
+        :param r2yu_tw: hypothetical partial R^2 values of confounder with outcome (y - axis)
+
+        :returns: Python dictionary with the same keys as compute_bias_adjusted. Every value is an array with a row for
+            each value of r2yu_tw and a column for each value of r2tu_w.
+        """
+        r2tu_w, r2yu_tw = np.meshgrid(np.asarray(r2tu_w, dtype=float), np.asarray(r2yu_tw, dtype=float))
+        return self.compute_bias_adjusted(r2tu_w=r2tu_w, r2yu_tw=r2yu_tw)
+
     def check_sensitivity(self, plot=True):
         """
         Function to perform sensitivity analysis.
@@ -324,14 +338,7 @@ class LinearSensitivityAnalyzer:
         """
 
         critical_estimate = self.null_hypothesis_effect
-        contour_values = np.zeros((len(r2yu_tw), len(r2tu_w)))
-        for i in range(len(r2yu_tw)):
-            y = r2yu_tw[i]
-            for j in range(len(r2tu_w)):
-                x = r2tu_w[j]
-                benchmarking_results = self.compute_bias_adjusted(r2tu_w=x, r2yu_tw=y)
-                estimate = benchmarking_results["bias_adjusted_estimate"]
-                contour_values[i][j] = estimate
+        contour_values = self.get_sensitivity_grid(r2tu_w, r2yu_tw)["bias_adjusted_estimate"]
 
         estimate_bounds = self.benchmarking_results["bias_adjusted_estimate"]
         return contour_values, critical_estimate, estimate_bounds
@@ -354,14 +361,7 @@ class LinearSensitivityAnalyzer:
         )  # t-value threshold with alpha significance level and dof-1 degrees of freedom
         critical_t = abs(t_alpha_df_1) * np.sign(self.t_stats)
 
-        contour_values = []
-        for x in r2tu_w:
-            contour = []
-            for y in r2yu_tw:
-                benchmarking_results = self.compute_bias_adjusted(r2tu_w=x, r2yu_tw=y)
-                t_value = benchmarking_results["bias_adjusted_t"]
-                contour.append(t_value)
-            contour_values.append(contour)
+        contour_values = self.get_sensitivity_grid(r2tu_w, r2yu_tw)["bias_adjusted_t"]
 
         t_bounds = self.benchmarking_results["bias_adjusted_t"]
         return contour_values, critical_t, t_bounds
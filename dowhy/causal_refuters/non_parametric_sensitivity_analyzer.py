@@ -1,5 +1,6 @@
 import logging
 
+import joblib
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
@@ -11,9 +12,13 @@ from sklearn.model_selection import KFold
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 
-from dowhy.causal_refuters.partial_linear_sensitivity_analyzer import PartialLinearSensitivityAnalyzer
+from dowhy.causal_refuters.partial_linear_sensitivity_analyzer import (
+    NuisanceModel,
+    PartialLinearSensitivityAnalyzer,
+    _predict,
+)
 from dowhy.causal_refuters.reisz import get_alpha_estimator
-from dowhy.utils.regression import generate_moment_function, get_generic_regressor, get_numeric_features
+from dowhy.utils.regression import generate_moment_function, get_numeric_features
 
 
 class NonParametricSensitivityAnalyzer(PartialLinearSensitivityAnalyzer):
@@ -106,47 +111,27 @@ class NonParametricSensitivityAnalyzer(PartialLinearSensitivityAnalyzer):
 
         self.moment_function = generate_moment_function
 
-        self.alpha_s = np.zeros(num_samples)
-        self.m_alpha = np.zeros(num_samples)
-        self.g_s = np.zeros(num_samples)
-        self.m_g = np.zeros(num_samples)
         self.g_s_j = np.zeros(num_samples)
         self.alpha_s_j = np.zeros(num_samples)
-        propensities = np.zeros(num_samples)
-
-        reg_function = get_generic_regressor(
-            cv=split_indices,
-            X=X,
-            Y=Y,
-            max_degree=self.reisz_polynomial_max_degree,
-            estimator_list=self.g_s_estimator_list,
-            estimator_param_list=self.g_s_estimator_param_list,
-            numeric_features=numeric_features,
+
+        # The fold fits of the regression function, the reisz representer and the regression of the treatment on the
+        # observed common causes are run together
+        reg_function = self._get_regression_nuisance_model(
+            X, Y, numeric_features, split_indices, outputs={"predict": _predict, "moment": _moment}
+        )
+        reisz_function = self._get_alpha_nuisance_model(
+            X, numeric_features_alpha, split_indices, outputs={"predict": _predict, "moment": _moment}
         )
-        reisz_function = get_alpha_estimator(
-            cv=split_indices,
-            X=X,
-            max_degree=self.reisz_polynomial_max_degree,
-            estimator_list=self.alpha_s_estimator_list,
-            estimator_param_list=self.alpha_s_estimator_param_list,
-            numeric_features=numeric_features_alpha,
-            plugin_reisz=self.plugin_reisz,
+        treatment_function = self._get_regression_nuisance_model(W, T, numeric_features_alpha, split_indices)
+        reg_outputs, reisz_outputs, treatment_outputs = self._cross_fit_nuisance_models(
+            [reg_function, reisz_function, treatment_function], split_indices
         )
-        for train, test in split_indices:
-            reisz_fn_fit = reisz_function.fit(X[train])
-            self.alpha_s[test] = reisz_fn_fit.predict(X[test])
-            if self.plugin_reisz:
-                propensities[test] = reisz_fn_fit.propensity(X[test])
-            self.m_alpha[test] = self.moment_function(X[test], reisz_fn_fit.predict)
-
-            reg_fn_fit = reg_function.fit(X[train], Y[train])
-            self.g_s[test] = reg_fn_fit.predict(X[test])
-            self.m_g[test] = self.moment_function(X[test], reg_fn_fit.predict)
+        self.alpha_s = reisz_outputs["predict"]
+        self.m_alpha = reisz_outputs["moment"]
+        self.g_s = reg_outputs["predict"]
+        self.m_g = reg_outputs["moment"]
         self.m = self.m_g + self.alpha_s * (Y - self.g_s)
-        if self.plugin_reisz:
-            self.var_alpha_s = np.mean(1 / (propensities * (1 - propensities)))
-        else:
-            self.var_alpha_s = np.var(self.alpha_s)
+        self.var_alpha_s = self._get_alpha_variance(reisz_outputs)
         self.nu_2 = np.mean(2 * self.m_alpha[indices] - self.alpha_s[indices] ** 2)
         self.sigma_2 = np.mean((Y[indices] - self.g_s[indices]) ** 2)
         self.S2 = self.nu_2 * self.sigma_2
@@ -162,9 +147,7 @@ class NonParametricSensitivityAnalyzer(PartialLinearSensitivityAnalyzer):
         self.r2y_tw = np.var(self.g_s) / np.var(Y)
 
         # R^2 of treatment with observed common causes
-        self.r2t_w = self.get_regression_r2(
-            X=W, Y=T, numeric_features=numeric_features_alpha, split_indices=split_indices
-        )
+        self.r2t_w = np.var(treatment_outputs["predict"]) / np.var(T)
         if self.benchmarking:
             delta_r2_y_wj, var_alpha_wj = self.compute_r2diff_benchmarking_covariates(
                 treatment_df,
@@ -212,24 +195,15 @@ class NonParametricSensitivityAnalyzer(PartialLinearSensitivityAnalyzer):
 
         return self
 
-    def get_phi_lower_upper(self, Cg, Calpha):
+    def get_bias_score(self):
         """
-        Calculate lower and upper influence function (phi)
-
-        :param Cg: measure of strength of confounding that omitted variables generate in outcome regression
-        :param Calpha: measure of strength of confounding that omitted variables generate in treatment regression
+        Calculate the influence function of the bias, up to the factor (Cg * Calpha) / (2 * S)
 
-        :returns : lower bound of phi, upper bound of phi
+        :returns: influence function of the bias for every unit
         """
-
-        bounds_estimator_upper = self.neyman_orthogonal_score_theta + ((Cg * Calpha) / (2 * self.S)) * (
+        return (
             self.sigma_2 * self.neyman_orthogonal_score_treatment + self.nu_2 * self.neyman_orthogonal_score_treatment
         )
-        bounds_estimator_lower = self.neyman_orthogonal_score_theta - ((Cg * Calpha) / (2 * self.S)) * (
-            self.sigma_2 * self.neyman_orthogonal_score_treatment + self.nu_2 * self.neyman_orthogonal_score_treatment
-        )
-
-        return bounds_estimator_lower, bounds_estimator_upper
 
     def get_alpharegression_var(self, X, numeric_features, split_indices, reisz_model=None):
         """
@@ -240,8 +214,29 @@ class NonParametricSensitivityAnalyzer(PartialLinearSensitivityAnalyzer):
 
         :returns: variance of reisz function
         """
-        if reisz_model is None:
-            reisz_model = get_alpha_estimator(
+        reisz_function = self._get_alpha_nuisance_model(X, numeric_features, split_indices, reisz_model=reisz_model)
+        (reisz_outputs,) = self._cross_fit_nuisance_models([reisz_function], split_indices)
+        return self._get_alpha_variance(reisz_outputs)
+
+    def _get_alpha_nuisance_model(self, X, numeric_features, split_indices, reisz_model=None, outputs=None):
+        """
+        Returns the nuisance model for the reisz function. The reisz function is only selected if its out-of-fold
+        outputs are not cached yet. The propensities are always included in the outputs of the plugin reisz function.
+
+        :param X: numpy array containing set of regressors
+        :param numeric_features: list of indices of columns with numeric features
+        :param split_indices: training and testing data indices obtained after cross folding
+        :param reisz_model: reisz function to use instead of the selected one
+        :param outputs: dictionary of the functions of the fitted model and the test data to compute (default = predictions)
+
+        :returns: NuisanceModel
+        """
+        if reisz_model is not None:
+            name = ("reisz_model", joblib.hash(reisz_model))
+            select_model = lambda: reisz_model
+        else:
+            name = ("alpha_s", tuple(numeric_features), self.plugin_reisz)
+            select_model = lambda: get_alpha_estimator(
                 cv=split_indices,
                 X=X,
                 max_degree=self.reisz_polynomial_max_degree,
@@ -250,17 +245,25 @@ class NonParametricSensitivityAnalyzer(PartialLinearSensitivityAnalyzer):
                 numeric_features=numeric_features,
                 plugin_reisz=self.plugin_reisz,
             )
+        outputs = dict(outputs) if outputs is not None else {"predict": _predict}
+        if self.plugin_reisz:
+            outputs["propensity"] = _propensity
+        return NuisanceModel(name, select_model, X, None, outputs)
 
-        num_samples = X.shape[0]
-        pred = np.zeros(num_samples)
+    def _get_alpha_variance(self, reisz_outputs):
+        """
+        Calculates the variance of the reisz function from its out-of-fold outputs
+        """
         if self.plugin_reisz:
-            for train, test in split_indices:
-                reisz_fn_fit = reisz_model.fit(X[train])
-                pred[test] = reisz_fn_fit.propensity(X[test])
-            newpred = 1 / (pred * (1 - pred))
-            return np.mean(newpred)
+            propensities = reisz_outputs["propensity"]
+            return np.mean(1 / (propensities * (1 - propensities)))
         else:
-            for train, test in split_indices:
-                reisz_fn_fit = reisz_model.fit(X[train])
-                pred[test] = reisz_fn_fit.predict(X[test])
-            return np.var(pred)
+            return np.var(reisz_outputs["predict"])
+
+
+def _moment(model, X):
+    return generate_moment_function(X, model.predict)
+
+
+def _propensity(model, X):
+    return model.propensity(X)
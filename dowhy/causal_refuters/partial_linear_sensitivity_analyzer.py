@@ -1,9 +1,13 @@
+import copy
 import logging
+from collections import namedtuple
 
+import joblib
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 import scipy
+from joblib import Parallel, delayed
 from sklearn.compose import ColumnTransformer, make_column_selector
 from sklearn.ensemble import GradientBoostingRegressor
 from sklearn.linear_model import Lasso, LinearRegression, Ridge, RidgeCV, SGDRegressor
@@ -13,6 +17,10 @@ from sklearn.preprocessing import StandardScaler
 
 from dowhy.utils.regression import get_generic_regressor, get_numeric_features
 
+# A nuisance model that is cross-fitted over the folds. select_model returns the model whose copies are fitted on the
+# training part of every fold and outputs maps names to functions of the fitted model and the test part of a fold.
+NuisanceModel = namedtuple("NuisanceModel", ["name", "select_model", "X", "Y", "outputs"])
+
 
 class PartialLinearSensitivityAnalyzer:
     """
@@ -41,6 +49,8 @@ class PartialLinearSensitivityAnalyzer:
     :param observed_common_causes: common causes dataframe
     :param outcome: outcome dataframe
     :param treatment: treatment dataframe
+    :param n_jobs: number of parallel jobs for fitting the nuisance models on the folds (default = 1)
+    :param verbose: verbosity level of the parallel fitting (default = 0)
     """
 
     def __init__(
@@ -63,6 +73,8 @@ class PartialLinearSensitivityAnalyzer:
         alpha_s_estimator_list=None,
         g_s_estimator_param_list=None,
         alpha_s_estimator_param_list=None,
+        n_jobs=1,
+        verbose=0,
         **kwargs,
     ):
         self.estimator = estimator
@@ -83,6 +95,8 @@ class PartialLinearSensitivityAnalyzer:
         self.benchmark_common_causes = benchmark_common_causes
         self.frac_strength_outcome = frac_strength_outcome
         self.frac_strength_treatment = frac_strength_treatment
+        self.n_jobs = n_jobs
+        self.verbose = verbose
 
         # whether the DGP is assumed to be partially linear
         self.is_partial_linear = True
@@ -104,6 +118,8 @@ class PartialLinearSensitivityAnalyzer:
         self.r2y_tw = 0  # Partial R^2 of outcome with treatment and observed common causes
         self.results = None
         self.num_points_per_contour = 30
+        # Out-of-fold outputs of the nuisance models, see _cross_fit_nuisance_models
+        self._nuisance_cache = {}
 
         self.benchmarking = self.is_benchmarking_needed()
         self.logger = logging.getLogger(__name__)
@@ -139,17 +155,23 @@ class PartialLinearSensitivityAnalyzer:
 
         :returns : lower bound of phi, upper bound of phi
         """
-        phi_lower = self.neyman_orthogonal_score_theta - ((Cg * Calpha) / (2 * self.S)) * (
-            -(self.sigma_2 / (self.nu_2**2)) * self.neyman_orthogonal_score_treatment
-            + (1 / self.nu_2) * self.neyman_orthogonal_score_outcome
-        )
-        phi_upper = self.neyman_orthogonal_score_theta + ((Cg * Calpha) / (2 * self.S)) * (
+        bias_score = ((Cg * Calpha) / (2 * self.S)) * self.get_bias_score()
+        phi_lower = self.neyman_orthogonal_score_theta - bias_score
+        phi_upper = self.neyman_orthogonal_score_theta + bias_score
+
+        return phi_lower, phi_upper
+
+    def get_bias_score(self):
+        """
+        Calculate the influence function of the bias, up to the factor (Cg * Calpha) / (2 * S)
+
+        :returns: influence function of the bias for every unit
+        """
+        return (
             -(self.sigma_2 / (self.nu_2**2)) * self.neyman_orthogonal_score_treatment
             + (1 / self.nu_2) * self.neyman_orthogonal_score_outcome
         )
 
-        return phi_lower, phi_upper
-
     def get_confidence_levels(self, r2yu_tw, r2tu_w, significance_level, is_partial_linear):
         """
         Returns lower and upper bounds for the effect estimate, given different explanatory powers of unobserved confounders. It uses the following definitions.
@@ -163,6 +185,9 @@ class PartialLinearSensitivityAnalyzer:
         ψ_σ² = (Y - g(Ws)) ^ 2 - σ²
         ψ_ν2 = (2m(Ws, α ) - α^2) - ν^2
 
+        The partial R^2 values can also be arrays of the same shape, e.g. a grid. The bounds are then computed for every
+        element.
+
         :param r2yu_tw: proportion of residual variance in the outcome explained by confounders
         :param r2tu_w: proportion of residual variance in the treatment explained by confounders
         :param significance_level: confidence interval for statistical inference(default = 0.05)
@@ -188,23 +213,29 @@ class PartialLinearSensitivityAnalyzer:
         theta_upper = self.theta_s + bias
 
         if significance_level is not None:
-            phi_lower, phi_upper = self.get_phi_lower_upper(Cg=Cg, Calpha=Calpha)
-
-            expected_phi_lower = np.mean(phi_lower * phi_lower)
-            expected_phi_upper = np.mean(phi_upper * phi_upper)
+            # phi = score_theta -/+ bias_factor * bias_score (see get_phi_lower_upper). Hence, E[phi^2] is computed from
+            # the moments of the scores, without evaluating phi for every unit and value of the partial R^2.
+            bias_factor = (Cg * Calpha) / (2 * self.S)
+            score_theta = self.neyman_orthogonal_score_theta
+            bias_score = self.get_bias_score()
+            expected_theta_theta = np.mean(score_theta * score_theta)
+            expected_theta_bias = np.mean(score_theta * bias_score)
+            expected_bias_bias = np.mean(bias_score * bias_score)
+
+            expected_phi_lower = (
+                expected_theta_theta - 2 * bias_factor * expected_theta_bias + bias_factor**2 * expected_bias_bias
+            )
+            expected_phi_upper = (
+                expected_theta_theta + 2 * bias_factor * expected_theta_bias + bias_factor**2 * expected_bias_bias
+            )
 
-            n1 = phi_lower.shape[0]
-            n2 = phi_upper.shape[0]
+            n = score_theta.shape[0]
 
-            stddev_lower = np.sqrt(expected_phi_lower / n1)
-            stddev_upper = np.sqrt(expected_phi_upper / n2)
+            stddev_lower = np.sqrt(expected_phi_lower / n)
+            stddev_upper = np.sqrt(expected_phi_upper / n)
             probability = scipy.stats.norm.ppf(1 - significance_level)
-            lower_confidence_bound = theta_lower - probability * np.sqrt(
-                np.mean(stddev_lower * stddev_lower) + np.var(theta_lower)
-            )
-            upper_confidence_bound = theta_upper + probability * np.sqrt(
-                np.mean(stddev_upper * stddev_upper) + np.var(theta_upper)
-            )
+            lower_confidence_bound = theta_lower - probability * stddev_lower
+            upper_confidence_bound = theta_upper + probability * stddev_upper
 
         else:
             lower_confidence_bound = theta_lower
@@ -219,13 +250,13 @@ class PartialLinearSensitivityAnalyzer:
 
         :returns: robustness value
         """
-        for t_val in np.arange(0, 1, 0.01):
-            lower_confidence_bound, _, _ = self.get_confidence_levels(
-                r2yu_tw=t_val, r2tu_w=t_val, significance_level=alpha, is_partial_linear=is_partial_linear
-            )
-            if lower_confidence_bound <= 0:
-                return t_val
-        return t_val
+        t_vals = np.arange(0, 1, 0.01)
+        lower_confidence_bounds, _, _ = self.get_confidence_levels(
+            r2yu_tw=t_vals, r2tu_w=t_vals, significance_level=alpha, is_partial_linear=is_partial_linear
+        )
+        # The smallest value for which the lower confidence bound reaches 0
+        explaining_away = np.flatnonzero(lower_confidence_bounds <= 0)
+        return t_vals[explaining_away[0]] if explaining_away.size > 0 else t_vals[-1]
 
     def perform_benchmarking(self, r2yu_tw, r2tu_w, significance_level, is_partial_linear=True):
         """
@@ -262,6 +293,38 @@ class PartialLinearSensitivityAnalyzer:
 
         return benchmarking_results
 
+    def get_sensitivity_grid(self, r2tu_w, r2yu_tw):
+        """
+        Computes the bias, the bounds of the estimate and their confidence bounds for every combination of the given
+        explanatory powers of the unobserved confounders, without plotting.
+
+        :param r2tu_w: proportions of residual variance in the treatment explained by confounders (x - axis)
+        :param r2yu_tw: proportions of residual variance in the outcome explained by confounders (y - axis)
+
+        :returns: python dictionary storing the values of r2tu_w, r2yu_tw, bias, lower_ate_bound, upper_ate_bound, lower_confidence_bound, upper_confidence_bound.
+                  Every value is an array with a row for each value of r2yu_tw and a column for each value of r2tu_w.
+        """
+        r2tu_w, r2yu_tw = np.meshgrid(np.asarray(r2tu_w, dtype=float), np.asarray(r2yu_tw, dtype=float))
+        lower_confidence_bound, upper_confidence_bound, bias = self.get_confidence_levels(
+            r2yu_tw=r2yu_tw,
+            r2tu_w=r2tu_w,
+            significance_level=self.significance_level,
+            is_partial_linear=self.is_partial_linear,
+        )
+        lower_ate_bound, upper_ate_bound, _ = self.get_confidence_levels(
+            r2yu_tw=r2yu_tw, r2tu_w=r2tu_w, significance_level=None, is_partial_linear=self.is_partial_linear
+        )
+
+        return {
+            "r2tu_w": r2tu_w,
+            "r2yu_tw": r2yu_tw,
+            "bias": bias,
+            "lower_ate_bound": lower_ate_bound,
+            "upper_ate_bound": upper_ate_bound,
+            "lower_confidence_bound": lower_confidence_bound,
+            "upper_confidence_bound": upper_confidence_bound,
+        }
+
     def get_regression_r2(self, X, Y, numeric_features, split_indices, regression_model=None):
         """
         Calculates the pearson non parametric partial R^2 from a regression function.
@@ -273,8 +336,42 @@ class PartialLinearSensitivityAnalyzer:
 
         :returns: partial R^2 value
         """
-        if regression_model is None:
-            regression_model = get_generic_regressor(
+        regression = self._get_regression_nuisance_model(
+            X, Y, numeric_features, split_indices, regression_model=regression_model
+        )
+        (regression_outputs,) = self._cross_fit_nuisance_models([regression], split_indices)
+        r2 = np.var(regression_outputs["predict"]) / np.var(Y)
+
+        return r2
+
+    def _get_regression_nuisance_model(
+        self, X, Y, numeric_features, split_indices, regression_model=None, second_stage_linear=False, outputs=None
+    ):
+        """
+        Returns the nuisance model for the regression of Y on X. The regression function is only selected if its
+        out-of-fold outputs are not cached yet.
+
+        :param X: numpy array containing set of regressors
+        :param Y: outcome variable in regression
+        :param numeric_features: list of indices of columns with numeric features
+        :param split_indices: training and testing data indices obtained after cross folding
+        :param regression_model: regression model to use instead of the selected one
+        :param second_stage_linear: True if the regression function is selected among linear models
+        :param outputs: dictionary of the functions of the fitted model and the test data to compute (default = predictions)
+
+        :returns: NuisanceModel
+        """
+        if regression_model is not None:
+            name = ("regression_model", joblib.hash(regression_model))
+            select_model = lambda: regression_model
+        elif second_stage_linear:
+            name = ("g_s_linear", tuple(numeric_features))
+            select_model = lambda: _get_linear_regressor(
+                split_indices, X, Y, self.reisz_polynomial_max_degree, numeric_features
+            )
+        else:
+            name = ("g_s", tuple(numeric_features))
+            select_model = lambda: get_generic_regressor(
                 cv=split_indices,
                 X=X,
                 Y=Y,
@@ -283,16 +380,54 @@ class PartialLinearSensitivityAnalyzer:
                 estimator_param_list=self.g_s_estimator_param_list,
                 numeric_features=numeric_features,
             )
+        return NuisanceModel(name, select_model, X, Y, outputs if outputs is not None else {"predict": _predict})
 
-        num_samples = X.shape[0]
-        regression_pred = np.zeros(num_samples)
-        for train, test in split_indices:
-            reg_fn_fit = regression_model.fit(X[train], Y[train])
-            regression_pred[test] = reg_fn_fit.predict(X[test])
+    def _cross_fit_nuisance_models(self, nuisance_models, split_indices):
+        """
+        Computes the out-of-fold outputs of nuisance models, e.g. the predictions of the regression of the outcome on
+        the treatment and the common causes. The fold fits of all models that are not cached yet are run together in
+        parallel. The outputs are cached by the model, its regressors, target and the fold split, such that they are
+        reused within and across calls of check_sensitivity.
 
-        r2 = np.var(regression_pred) / np.var(Y)
+        :param nuisance_models: list of NuisanceModel
+        :param split_indices: training and testing data indices obtained after cross folding
 
-        return r2
+        :returns: list with a dictionary of the out-of-fold values of every output for each nuisance model
+        """
+        keys = [
+            joblib.hash((model.name, model.X, model.Y, sorted(model.outputs), split_indices))
+            for model in nuisance_models
+        ]
+        missing = {}
+        for key, nuisance_model in zip(keys, nuisance_models):
+            if key not in self._nuisance_cache:
+                missing[key] = nuisance_model
+
+        def fold_fits():
+            # A model is only selected when its fold fits are dispatched, such that the selection of a model overlaps
+            # with the fold fits of the previous ones
+            for nuisance_model in missing.values():
+                model = nuisance_model.select_model()
+                for train, test in split_indices:
+                    yield delayed(_fit_predict_fold)(
+                        model,
+                        nuisance_model.X[train],
+                        None if nuisance_model.Y is None else nuisance_model.Y[train],
+                        nuisance_model.X[test],
+                        nuisance_model.outputs,
+                    )
+
+        fold_outputs = Parallel(n_jobs=self.n_jobs, verbose=self.verbose)(fold_fits())
+
+        fold_outputs = iter(fold_outputs)
+        for key, nuisance_model in missing.items():
+            num_samples = nuisance_model.X.shape[0]
+            results = {name: np.zeros(num_samples) for name in nuisance_model.outputs}
+            for _, test in split_indices:
+                for name, values in next(fold_outputs).items():
+                    results[name][test] = values
+            self._nuisance_cache[key] = results
+        return [self._nuisance_cache[key] for key in keys]
 
     def compute_r2diff_benchmarking_covariates(
         self,
@@ -328,60 +463,38 @@ class PartialLinearSensitivityAnalyzer:
         numeric_features_t = get_numeric_features(X=T_W_j_df)
         T_W_j = T_W_j_df.to_numpy()
 
-        # R^2 of treatment with observed common causes removing benchmark causes
+        # The regressions without the benchmark causes are fitted together
         if is_partial_linear:
-            r2t_w_j = self.get_regression_r2(X=W_j, Y=T, numeric_features=numeric_features, split_indices=split_indices)
-            delta_r2t_wj = self.r2t_w - r2t_w_j
+            # R^2 of treatment with observed common causes removing benchmark causes
+            treatment_model = self._get_regression_nuisance_model(W_j, T, numeric_features, split_indices)
         else:  # non parametric DGP
-            # return the variance of alpha_s
-            var_alpha_wj = self.get_alpharegression_var(
-                X=T_W_j,
-                numeric_features=numeric_features,  # using numeric_features because the model only uses W
-                split_indices=split_indices,
+            # the variance of alpha_s
+            treatment_model = self._get_alpha_nuisance_model(
+                T_W_j,
+                numeric_features,  # using numeric_features because the model only uses W
+                split_indices,
             )
+        # Regressing over observed common causes removing benchmark causes and treatment
+        outcome_model = self._get_regression_nuisance_model(
+            T_W_j,
+            Y,
+            numeric_features if second_stage_linear else numeric_features_t,
+            split_indices,
+            second_stage_linear=second_stage_linear,
+        )
+        treatment_outputs, outcome_outputs = self._cross_fit_nuisance_models(
+            [treatment_model, outcome_model], split_indices
+        )
+
+        if is_partial_linear:
+            r2t_w_j = np.var(treatment_outputs["predict"]) / np.var(T)
+            delta_r2t_wj = self.r2t_w - r2t_w_j
+        else:
+            var_alpha_wj = self._get_alpha_variance(treatment_outputs)
             delta_r2t_wj = var_alpha_wj
 
-        reg_function = None
-        if second_stage_linear is True:
-            reg_function = get_generic_regressor(
-                cv=split_indices,
-                X=T_W_j,
-                Y=Y,
-                max_degree=self.reisz_polynomial_max_degree,
-                estimator_list=[
-                    LinearRegression(),
-                    Pipeline(
-                        [
-                            (
-                                "scale",
-                                ColumnTransformer(
-                                    [("num", StandardScaler(), numeric_features)], remainder="passthrough"
-                                ),
-                            ),
-                            ("lasso_model", Lasso()),
-                        ]
-                    ),
-                    SGDRegressor(alpha=0.001),
-                    Ridge(),
-                    RidgeCV(cv=5),
-                ],
-                estimator_param_list=[
-                    {"fit_intercept": [True, False]},
-                    {"lasso_model__alpha": [0.01, 0.001, 1e-4, 1e-5, 1e-6]},
-                    {"alpha": [0.0001, 1e-5, 0.01]},
-                    {"alpha": [0.0001, 1e-5, 0.01, 1, 2]},
-                    {"cv": [2, 3, 4]},
-                ],
-                numeric_features=numeric_features,
-            )  # Regressing over observed common causes removing benchmark causes and treatment
         # R^2 of outcome with observed common causes and treatment after removing benchmark causes
-        r2y_tw_j = self.get_regression_r2(
-            X=T_W_j,
-            Y=Y,
-            numeric_features=numeric_features_t,
-            split_indices=split_indices,
-            regression_model=reg_function,
-        )
+        r2y_tw_j = np.var(outcome_outputs["predict"]) / np.var(Y)
         delta_r2_y_wj = self.r2y_tw - r2y_tw_j
 
         return delta_r2_y_wj, delta_r2t_wj
@@ -587,20 +700,7 @@ class PartialLinearSensitivityAnalyzer:
         ax.set_xlim(-x_limit / 20, x_limit)
         ax.set_ylim(-y_limit / 20, y_limit)
 
-        undjusted_estimates = None
-        contour_values = np.zeros((len(r2yu_tw), len(r2tu_w)))
-
-        for i in range(len(r2yu_tw)):
-            y = r2yu_tw[i]
-            for j in range(len(r2tu_w)):
-                x = r2tu_w[j]
-                benchmarking_results = self.perform_benchmarking(
-                    r2yu_tw=y,
-                    r2tu_w=x,
-                    significance_level=self.significance_level,
-                    is_partial_linear=self.is_partial_linear,
-                )
-                contour_values[i][j] = benchmarking_results[plot_type]
+        contour_values = self.get_sensitivity_grid(r2tu_w, r2yu_tw)[plot_type]
 
         contour_plot = ax.contour(
             r2tu_w,
@@ -666,3 +766,47 @@ class PartialLinearSensitivityAnalyzer:
             self.significance_level * 100, round(self.RV_alpha * 100, 2)
         )
         return s
+
+
+def _get_linear_regressor(cv, X, Y, max_degree, numeric_features):
+    """Finds the best linear estimator for the regression function (g_s)"""
+    return get_generic_regressor(
+        cv=cv,
+        X=X,
+        Y=Y,
+        max_degree=max_degree,
+        estimator_list=[
+            LinearRegression(),
+            Pipeline(
+                [
+                    (
+                        "scale",
+                        ColumnTransformer([("num", StandardScaler(), numeric_features)], remainder="passthrough"),
+                    ),
+                    ("lasso_model", Lasso()),
+                ]
+            ),
+            SGDRegressor(alpha=0.001),
+            Ridge(),
+            RidgeCV(cv=5),
+        ],
+        estimator_param_list=[
+            {"fit_intercept": [True, False]},
+            {"lasso_model__alpha": [0.01, 0.001, 1e-4, 1e-5, 1e-6]},
+            {"alpha": [0.0001, 1e-5, 0.01]},
+            {"alpha": [0.0001, 1e-5, 0.01, 1, 2]},
+            {"cv": [2, 3, 4]},
+        ],
+        numeric_features=numeric_features,
+    )
+
+
+def _fit_predict_fold(model, X_train, Y_train, X_test, outputs):
+    """Fits a copy of the model on the training part of a fold and returns the outputs on its test part."""
+    model = copy.deepcopy(model)
+    model = model.fit(X_train) if Y_train is None else model.fit(X_train, Y_train)
+    return {name: output(model, X_test) for name, output in outputs.items()}
+
+
+def _predict(model, X):
+    return model.predict(X)
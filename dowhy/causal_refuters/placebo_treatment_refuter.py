@@ -12,6 +12,7 @@ from dowhy.causal_estimator import CausalEstimate, CausalEstimator
 from dowhy.causal_identifier.identified_estimand import IdentifiedEstimand
 from dowhy.causal_refuter import CausalRefutation, CausalRefuter, test_significance
 from dowhy.utils.api import parse_state
+from dowhy.utils.shared_data import overlay_columns
 
 logger = logging.getLogger(__name__)
 
@@ -97,13 +98,11 @@ def _refute_once(
 
         else:
             permuted_idx = random_state.choice(data.shape[0], size=data.shape[0], replace=False)
-        new_treatment = data[treatment_names].iloc[permuted_idx].values
+        new_treatment = data[treatment_names].iloc[permuted_idx].to_numpy().squeeze(axis=1)
         if target_estimand.identifier_method.startswith("iv"):
-            new_instruments_values = data[estimate.estimator.estimating_instrument_names].iloc[permuted_idx].values
-            new_instruments_df = pd.DataFrame(
-                new_instruments_values,
-                columns=["placebo_" + s for s in data[estimate.estimator.estimating_instrument_names].columns],
-            )
+            new_instruments = {
+                "placebo_" + s: data[s].to_numpy()[permuted_idx] for s in estimate.estimator.estimating_instrument_names
+            }
     else:
         if "float" in type_dict[treatment_names[0]].name:
             logger.info(
@@ -143,10 +142,11 @@ def _refute_once(
             sample = np.random.choice(categories, size=data.shape[0])
             new_treatment = pd.Series(sample, index=data.index).astype("category")
 
-    # Create a new column in the data by the name of placebo
-    new_data = data.assign(placebo=new_treatment)
+    # Create a new column in the data by the name of placebo. The other columns are shared with the data.
+    new_columns = {"placebo": new_treatment}
     if target_estimand.identifier_method.startswith("iv"):
-        new_data = pd.concat((new_data, new_instruments_df), axis=1)
+        new_columns.update(new_instruments)
+    new_data = overlay_columns(data, new_columns)
     # Sanity check the data
     logger.debug(new_data[0:10])
     new_estimator = CausalEstimator.get_estimator_object(new_data, target_estimand, estimate)
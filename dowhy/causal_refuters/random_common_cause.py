@@ -10,6 +10,7 @@ from tqdm.auto import tqdm
 from dowhy.causal_estimator import CausalEstimate, CausalEstimator
 from dowhy.causal_identifier.identified_estimand import IdentifiedEstimand
 from dowhy.causal_refuter import CausalRefutation, CausalRefuter, test_significance
+from dowhy.utils.shared_data import overlay_columns
 
 logger = logging.getLogger(__name__)
 
@@ -61,10 +62,11 @@ def _refute_once(
     estimate: CausalEstimate,
     random_state: Optional[np.random.RandomState] = None,
 ):
+    # Only the random common cause is added, the other columns are shared with the data
     if random_state is None:
-        new_data = data.assign(w_random=np.random.randn(data.shape[0]))
+        new_data = overlay_columns(data, {"w_random": np.random.randn(data.shape[0])})
     else:
-        new_data = data.assign(w_random=random_state.normal(size=data.shape[0]))
+        new_data = overlay_columns(data, {"w_random": random_state.normal(size=data.shape[0])})
 
     new_estimator = CausalEstimator.get_estimator_object(new_data, target_estimand, estimate)
     new_effect = new_estimator.estimate_effect()
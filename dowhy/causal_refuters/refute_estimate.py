@@ -1,6 +1,7 @@
-from typing import Any, Callable, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Union
 
 import pandas as pd
+from joblib import effective_n_jobs
 
 from dowhy.causal_estimator import CausalEstimate
 from dowhy.causal_identifier.identified_estimand import IdentifiedEstimand
@@ -11,6 +12,7 @@ from dowhy.causal_refuters.data_subset_refuter import refute_data_subset
 from dowhy.causal_refuters.dummy_outcome_refuter import refute_dummy_outcome
 from dowhy.causal_refuters.placebo_treatment_refuter import refute_placebo_treatment
 from dowhy.causal_refuters.random_common_cause import refute_random_common_cause
+from dowhy.utils.shared_data import SharedDataFrame
 
 ALL_REFUTERS = [
     sensitivity_simulation,
@@ -62,3 +64,73 @@ def refute_estimate(
             results.append(refute)
 
     return results
+
+
+def refute_suite(
+    data: pd.DataFrame,
+    target_estimand: IdentifiedEstimand,
+    estimate: CausalEstimate,
+    refuters: List[Callable[..., Union[CausalRefutation, List[CausalRefutation]]]] = ALL_REFUTERS,
+    n_jobs: int = 1,
+    verbose: int = 0,
+    memory_map_data: bool = True,
+    show_progress_bar: bool = False,
+    **kwargs,
+) -> List[CausalRefutation]:
+    """Executes a list of refuters with one pool of parallel workers and returns all refutations together.
+
+    The treatment and outcome names are taken from the target estimand and passed to every refuter in the form it
+    expects. If more than one job is used, the data is stored once in a temporary folder and shared with the workers of
+    all refuters as memory-mapped arrays, i.e. the tasks only receive the file location instead of a pickled copy of the
+    data. The worker processes are started once and reused by all refuters.
+
+    :param data: pd.DataFrame: Data to run the refutations
+    :param target_estimand: IdentifiedEstimand: Identified estimand to run the refutations
+    :param estimate: CausalEstimate: Estimate to run the refutations
+    :param refuters: list: List of refuters to execute
+    :param n_jobs: The maximum number of concurrently running jobs of each refuter. If -1 all CPUs are used. If 1 is given, no parallel computing code is used at all (this is the default).
+    :param verbose: The verbosity level: if non zero, progress messages are printed. Above 50, the output is sent to stdout. The frequency of the messages increases with the verbosity level. If it more than 10, all iterations are reported. The default is 0.
+    :param memory_map_data: If True (default), the data is shared with the workers via memory-mapped arrays when more than one job is used. The memory-mapped data is read-only.
+    :param show_progress_bar: Boolean flag on whether to show a progress bar for each refuter.
+    :**kwargs: Replace any default for the provided list of refuters, e.g. num_simulations or random_state
+    :returns: The refutations of all refuters, in the order of the refuters
+    """
+    suite_kwargs = {
+        "target_estimand": target_estimand,
+        "estimate": estimate,
+        "treatment_name": target_estimand.treatment_variable,
+        "treatment_names": target_estimand.treatment_variable,
+        "outcome_name": target_estimand.outcome_variable,
+        "n_jobs": n_jobs,
+        "verbose": verbose,
+        "show_progress_bar": show_progress_bar,
+        **kwargs,
+    }
+
+    # The shared data keeps the temporary folder alive until all refuters are done
+    shared_data = SharedDataFrame(data) if memory_map_data and effective_n_jobs(n_jobs) > 1 else None
+    if shared_data is not None:
+        data = shared_data.view()
+
+    results = []
+    for refuter in refuters:
+        refute = refuter(data=data, **_get_refuter_kwargs(refuter, suite_kwargs))
+        if isinstance(refute, list):
+            results.extend(refute)
+        else:
+            results.append(refute)
+
+    return results
+
+
+def _get_refuter_kwargs(
+    refuter: Callable[..., Union[CausalRefutation, List[CausalRefutation]]], suite_kwargs: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Adapts the arguments of the suite to the refuters whose arguments differ from the other refuters."""
+    if refuter is refute_dummy_outcome:
+        return {
+            **suite_kwargs,
+            "outcome_name": suite_kwargs["outcome_name"][0],
+            "required_variables": suite_kwargs.get("required_variables", True),
+        }
+    return suite_kwargs
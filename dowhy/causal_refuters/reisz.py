@@ -14,7 +14,12 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 
-from dowhy.utils.regression import create_polynomial_function, generate_moment_function, get_generic_regressor
+from dowhy.utils.regression import (
+    create_polynomial_function,
+    generate_moment_function,
+    get_generic_regressor,
+    get_interventional_data,
+)
 
 
 def get_alpha_estimator(
@@ -112,7 +117,8 @@ class PluginReisz:
         W = X[:, 1:]  # assume 1-D treatment
         t = X[:, 0]
         preds = self.propmodel.predict_proba(W)
-        weights = [1 / preds[i, t[i].astype(int)] for i in range(preds.shape[0])]
+        # Probability of the observed treatment of every unit
+        weights = 1 / np.take_along_axis(preds, t.astype(int)[:, np.newaxis], axis=1)[:, 0]
         weights = np.where(t == 0, -1, 1) * weights
         return weights
 
@@ -133,7 +139,12 @@ def reisz_scoring(g, X):
     :returns: floating point number that quantifies the model prediction
     Loss(g) = E[2*m(X,g) - g(X)**2]
     """
-    loss = np.mean(2 * generate_moment_function(W=X, g=g.predict) - g.predict(X) ** 2)
+    # The model is evaluated on the data with treatment = 1, with treatment = 0 and the observed data at once
+    num_samples = X.shape[0]
+    data_1, data_0 = get_interventional_data(X)
+    preds = g.predict(np.vstack([data_1, data_0, X]))
+    moment = preds[:num_samples] - preds[num_samples : 2 * num_samples]
+    loss = np.mean(2 * moment - preds[2 * num_samples :] ** 2)
     return loss
 
 
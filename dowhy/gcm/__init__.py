@@ -30,7 +30,12 @@ from .independence_test import (
     regression_based,
 )
 from .influence import arrow_strength, intrinsic_causal_influence
-from .stochastic_models import BayesianGaussianMixtureDistribution, EmpiricalDistribution, ScipyDistribution
+from .stochastic_models import (
+    BayesianGaussianMixtureDistribution,
+    CompactEmpiricalDistribution,
+    EmpiricalDistribution,
+    ScipyDistribution,
+)
 from .unit_change import unit_change
 from .validation import RejectionResult, refute_causal_structure, refute_invertible_model
 from .whatif import average_causal_effect, counterfactual_samples, interventional_samples
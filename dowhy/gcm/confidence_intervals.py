@@ -3,14 +3,17 @@
 Functions in this module should be considered experimental, meaning there might be breaking API changes in the future.
 """
 
-from typing import Any, Callable, Dict, List, Tuple, Union
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
+import joblib
 import numpy as np
-from joblib import Parallel, delayed
+from joblib import Parallel, delayed, effective_n_jobs
 from scipy.optimize import minimize
 from tqdm import tqdm
 
 from dowhy.gcm import config
+from dowhy.gcm.constant import EPS
 from dowhy.gcm.util.general import set_random_seed, shape_into_2d
 
 
@@ -27,6 +30,9 @@ def confidence_intervals(
     num_bootstrap_resamples: int = 20,
     bootstrap_results_summary_func: Callable[[np.ndarray], np.ndarray] = estimate_geometric_median,
     n_jobs: int = 1,
+    checkpoint_file: Optional[str] = None,
+    convergence_threshold: Optional[float] = None,
+    batch_size: Optional[int] = None,
 ) -> Tuple[Union[np.ndarray, Dict[Any, np.ndarray]], Union[np.ndarray, Dict[Any, np.ndarray]]]:
     """
     Estimates confidence intervals based on the outputs generated by calling the given estimation_func. Since one result
@@ -59,6 +65,17 @@ def confidence_intervals(
         >>>
         >>> mean_contributions, confidence_intervals = confidence_intervals(estimation_func)
 
+    **Example usage for long running jobs:**
+
+        >>> mean_contributions, confidence_intervals = confidence_intervals(
+        >>>     estimation_func, num_bootstrap_resamples=1000, checkpoint_file='bootstrap.pkl',
+        >>>     convergence_threshold=0.01)
+
+    Here, the results of completed resamples are stored in 'bootstrap.pkl' after every batch. If the process is
+    interrupted, calling the function again with the same checkpoint file only evaluates the missing resamples. The
+    estimation stops before all resamples are evaluated if the widths of the intervals change less than 1% between two
+    batches.
+
     More details about the estimation of confidence intervals via bootstrapping can be found `here <https://ocw.mit.edu/courses/mathematics/18-05-introduction-to-probability-and-statistics-spring-2014/readings/MIT18_05S14_Reading24.pdf>`_.
 
     :param estimation_func: Function that generates a non-deterministic output for which the confidence interval(s) are
@@ -75,6 +92,14 @@ def confidence_intervals(
            such as distribution change), this is set to 1 by default. Only if it is certain that
            the estimation_func is not running in parallel internally (e.g. when performing
            interventions), this should be set to a different value.
+    :param checkpoint_file: Optional path to a file where the results of completed resamples are stored after each
+           batch. If the file already exists, the random seeds and results are loaded from it and only the
+           missing resamples are evaluated. The file is not removed after the estimation finished.
+    :param convergence_threshold: If given, the estimation stops early when the relative change of all
+           interval widths between two consecutive batches is below this threshold.
+    :param batch_size: Number of resamples that are evaluated before checkpointing and checking for convergence. If
+           None, all resamples are evaluated in a single batch unless checkpoint_file or convergence_threshold
+           is given. In this case, max(10, number of parallel jobs) is used.
     :return: A tuple (summarized result over all repetitions based on
              summary_method_of_bootstrap_results, confidence interval for each dimension/variable)
     """
@@ -86,18 +111,50 @@ def confidence_intervals(
         return estimation_func()
 
     random_seeds = np.random.randint(np.iinfo(np.int32).max, size=num_bootstrap_resamples)
-    all_results = Parallel(n_jobs=n_jobs)(
-        delayed(estimation_func_with_random_seed)(random_seed)
-        for i, random_seed in enumerate(
-            tqdm(
-                random_seeds,
-                position=0,
-                leave=True,
-                disable=not config.show_progress_bars,
-                desc="Estimating bootstrap interval...",
+    completed_results = {}
+    if checkpoint_file is not None and os.path.exists(checkpoint_file):
+        random_seeds, completed_results = _load_checkpoint(checkpoint_file, num_bootstrap_resamples)
+
+    if batch_size is None:
+        if checkpoint_file is None and convergence_threshold is None:
+            batch_size = num_bootstrap_resamples
+        else:
+            batch_size = max(10, effective_n_jobs(n_jobs))
+
+    pending_indices = [i for i in range(num_bootstrap_resamples) if i not in completed_results]
+    previous_interval_widths = None
+    with Parallel(n_jobs=n_jobs) as parallel, tqdm(
+        total=num_bootstrap_resamples,
+        initial=len(completed_results),
+        position=0,
+        leave=True,
+        disable=not config.show_progress_bars,
+        desc="Estimating bootstrap interval...",
+    ) as progress_bar:
+        for batch_start in range(0, len(pending_indices), batch_size):
+            batch_indices = pending_indices[batch_start : batch_start + batch_size]
+            batch_results = parallel(
+                delayed(estimation_func_with_random_seed)(int(random_seeds[i])) for i in batch_indices
             )
-        )
-    )
+            completed_results.update(zip(batch_indices, batch_results))
+            progress_bar.update(len(batch_indices))
+
+            if checkpoint_file is not None:
+                _save_checkpoint(checkpoint_file, random_seeds, completed_results)
+
+            if convergence_threshold is not None:
+                interval_widths = np.diff(
+                    _estimate_percentile_bounds_of_results(list(completed_results.values()), confidence_level), axis=1
+                ).squeeze(axis=1)
+
+                if previous_interval_widths is not None and np.all(
+                    np.abs(interval_widths - previous_interval_widths)
+                    <= convergence_threshold * (np.abs(previous_interval_widths) + EPS)
+                ):
+                    break
+                previous_interval_widths = interval_widths
+
+    all_results = [completed_results[i] for i in sorted(completed_results)]
 
     if isinstance(all_results[0], dict):
         all_results: List[Dict[Any, float]]
@@ -119,6 +176,40 @@ def confidence_intervals(
         )
 
 
+def _estimate_percentile_bounds_of_results(
+    results: List[Union[np.ndarray, Dict[Any, float]]], confidence_level: float
+) -> np.ndarray:
+    if isinstance(results[0], dict):
+        results = np.column_stack([[result[key] for result in results] for key in results[0]])
+    else:
+        results = shape_into_2d(np.array(results))
+
+    return np.array([_estimate_percentile_bounds(results[:, i], confidence_level) for i in range(results.shape[1])])
+
+
+def _save_checkpoint(
+    checkpoint_file: str, random_seeds: np.ndarray, completed_results: Dict[int, Union[np.ndarray, Dict[Any, float]]]
+) -> None:
+    # Write to a temporary file first to avoid a corrupted checkpoint if the process is interrupted while writing.
+    temporary_file = checkpoint_file + ".tmp"
+    joblib.dump({"random_seeds": random_seeds, "results": completed_results}, temporary_file)
+    os.replace(temporary_file, checkpoint_file)
+
+
+def _load_checkpoint(
+    checkpoint_file: str, num_bootstrap_resamples: int
+) -> Tuple[np.ndarray, Dict[int, Union[np.ndarray, Dict[Any, float]]]]:
+    checkpoint = joblib.load(checkpoint_file)
+
+    if checkpoint["random_seeds"].shape[0] != num_bootstrap_resamples:
+        raise ValueError(
+            "The checkpoint file %s was created with %d bootstrap resamples, but %d resamples were requested!"
+            % (checkpoint_file, checkpoint["random_seeds"].shape[0], num_bootstrap_resamples)
+        )
+
+    return checkpoint["random_seeds"], checkpoint["results"]
+
+
 def _estimate_percentile_bounds(X: np.ndarray, quantile: float) -> np.ndarray:
     if X.ndim > 1:
         raise ValueError("Estimate bounds currently only supports one dimensional inputs!")
@@ -11,6 +11,7 @@ import pandas as pd
 
 from dowhy.gcm.cms import InvertibleStructuralCausalModel, ProbabilisticCausalModel, StructuralCausalModel
 from dowhy.gcm.fitting_sampling import fit
+from dowhy.utils.shared_data import SharedDataFrame
 
 # A convenience function when computing confidence intervals specifically for non-deterministic causal queries. This
 # function evaluates the provided causal query multiple times to build a confidence interval based on the returned
@@ -52,6 +53,7 @@ def fit_and_compute(
     bootstrap_training_data: pd.DataFrame,
     bootstrap_data_subset_size_fraction: float = 0.75,
     *args,
+    memory_map_training_data: bool = False,
     **kwargs,
 ):
     """A convenience function when computing confidence intervals specifically for causal queries. This function
@@ -73,20 +75,26 @@ def fit_and_compute(
                                     in every iteration when calling fit.
     :param bootstrap_data_subset_size_fraction: The fraction defines the fractional size of the subset compared to
                                                 the total training data.
+    :param memory_map_training_data: If True, the training data is stored once in a temporary folder and shared with
+                                     parallel workers via memory-mapped arrays instead of pickling the DataFrame to
+                                     each task. Each run then only copies its random subset. This is recommended for
+                                     large data sets in combination with n_jobs > 1 in confidence_intervals.
     :param args: Args passed through verbatim to the causal queries.
     :param kwargs: Keyword args passed through verbatim to the causal queries.
     :return: A tuple containing (1) the median of causal query results and (2) the confidence intervals.
     """
 
+    training_data = SharedDataFrame(bootstrap_training_data) if memory_map_training_data else bootstrap_training_data
+
     def snapshot():
         causal_model_copy = causal_model.clone()
-        sampled_data = bootstrap_training_data.iloc[
+        sampled_data = training_data.take(
             np.random.choice(
-                bootstrap_training_data.shape[0],
-                int(bootstrap_training_data.shape[0] * bootstrap_data_subset_size_fraction),
+                training_data.shape[0],
+                int(training_data.shape[0] * bootstrap_data_subset_size_fraction),
                 replace=False,
             )
-        ]
+        )
         fit(causal_model_copy, sampled_data)
         return f(causal_model_copy, *args, **kwargs)
 
@@ -3,16 +3,19 @@
 Classes in this module should be considered experimental, meaning there might be breaking API changes in the future.
 """
 
+import time
 import warnings
-from typing import Dict, Optional, Tuple, Union
+from typing import Dict, List, Optional, Tuple, Union
 
 import numpy as np
 import scipy
+from joblib import Parallel, delayed, effective_n_jobs
 from scipy.stats import norm, rv_continuous, rv_discrete
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from sklearn.metrics import silhouette_score
 from sklearn.mixture import BayesianGaussianMixture
 
+import dowhy.gcm.config as config
 from dowhy.gcm.divergence import estimate_kl_divergence_continuous
 from dowhy.gcm.graph import StochasticModel
 from dowhy.gcm.util.general import shape_into_2d
@@ -43,7 +46,12 @@ _DISCRETE_DISTRIBUTIONS = {x.name: x for x in _DISCRETE_DISTRIBUTIONS}
 class ScipyDistribution(StochasticModel):
     """Represents any parametric distribution that can be modeled by scipy."""
 
-    def __init__(self, scipy_distribution: Optional[Union[rv_continuous, rv_discrete]] = None, **parameters) -> None:
+    def __init__(
+        self,
+        scipy_distribution: Optional[Union[rv_continuous, rv_discrete]] = None,
+        fast_auto_selection: bool = False,
+        **parameters,
+    ) -> None:
         """Initializes a stochastic model that allows to sample from a parametric distribution implemented in Scipy.
 
         For instance, to use a beta distribution with parameters a=2 and b=0.5:
@@ -55,9 +63,15 @@ class ScipyDistribution(StochasticModel):
         implementations. See https://docs.scipy.org/doc/scipy/tutorial/stats.html for more information.
 
         :param scipy_distribution: A continuous or discrete distribution parametric distribution implemented in Scipy.
+        :param fast_auto_selection: Only relevant if no scipy_distribution is given. If True, the distribution is
+                                    selected via
+                                    :py:meth:`find_suitable_continuous_distribution_fast <dowhy.gcm.ScipyDistribution.find_suitable_continuous_distribution_fast>`,
+                                    which fits candidates on a subsample in parallel and is considerably faster on
+                                    large data sets. Otherwise, the exhaustive search based on the KL divergence is used.
         :param parameters: Set of parameters of the parametric distribution.
         """
         self._distribution = scipy_distribution
+        self._fast_auto_selection = fast_auto_selection
         self._parameters = parameters
         self._fixed_parameters = len(parameters) > 0
 
@@ -70,7 +84,10 @@ class ScipyDistribution(StochasticModel):
     def fit(self, X: np.ndarray) -> None:
         if self._distribution is None:
             # Currently only support continuous distributions for auto selection.
-            best_model, best_parameters = self.find_suitable_continuous_distribution(X)
+            if self._fast_auto_selection:
+                best_model, best_parameters = self.find_suitable_continuous_distribution_fast(X)
+            else:
+                best_model, best_parameters = self.find_suitable_continuous_distribution(X)
             self._distribution = best_model
             self._parameters = best_parameters
         elif not self._fixed_parameters:
@@ -88,9 +105,15 @@ class ScipyDistribution(StochasticModel):
 
     def clone(self):
         if self._fixed_parameters:
-            return ScipyDistribution(scipy_distribution=self._distribution, **self._parameters)
+            return ScipyDistribution(
+                scipy_distribution=self._distribution,
+                fast_auto_selection=self._fast_auto_selection,
+                **self._parameters,
+            )
         else:
-            return ScipyDistribution(scipy_distribution=self._distribution)
+            return ScipyDistribution(
+                scipy_distribution=self._distribution, fast_auto_selection=self._fast_auto_selection
+            )
 
     @staticmethod
     def find_suitable_continuous_distribution(
@@ -143,6 +166,100 @@ class ScipyDistribution(StochasticModel):
             currently_best_distribution, currently_best_parameters
         )
 
+    @staticmethod
+    def find_suitable_continuous_distribution_fast(
+        distribution_samples: np.ndarray,
+        max_num_samples_for_fitting: int = 5000,
+        num_top_candidates: int = 5,
+        distance_threshold: float = 10**-2,
+        max_time_in_seconds: Optional[float] = None,
+        n_jobs: Optional[int] = None,
+    ) -> Tuple[rv_continuous, Dict[str, float]]:
+        """Faster alternative to
+        :py:meth:`find_suitable_continuous_distribution <dowhy.gcm.ScipyDistribution.find_suitable_continuous_distribution>`
+        for large data sets. The search is done in two stages:
+
+        1. All candidate distributions are fitted (in parallel) on a random subsample of the data and ranked by the
+           maximum absolute distance between their CDF and the empirical CDF of the full data, evaluated at a fixed
+           grid of empirical quantiles. This is considerably cheaper than drawing new samples and estimating a kNN
+           based KL divergence.
+        2. Only the best num_top_candidates distributions are refitted on the full data and the best of them is
+           returned.
+
+        The first stage stops early if a candidate has a distance below the given threshold or if the time budget is
+        exhausted. In the latter case, the top candidates found so far are considered and the second stage is skipped,
+        i.e. the parameters of the returned distribution are based on the subsample only.
+
+        :param distribution_samples: Observed samples of a one dimensional continuous variable.
+        :param max_num_samples_for_fitting: Maximum number of samples used for fitting the candidates in the first
+                                            stage.
+        :param num_top_candidates: Number of candidates that are refitted on the full data in the second stage.
+        :param distance_threshold: If a candidate has a CDF distance below this threshold, the search stops early.
+        :param max_time_in_seconds: Optional time budget for the search. Note that candidates that are currently being
+                                    fitted are not interrupted, i.e. the budget can be exceeded by the fitting time
+                                    of a single batch of candidates. If None, all candidates are evaluated.
+        :param n_jobs: Number of parallel jobs. If None, the default config is used.
+        :return: A tuple with the selected scipy distribution and a dictionary of its fitted parameters.
+        """
+        n_jobs = config.default_n_jobs if n_jobs is None else n_jobs
+        distribution_samples = shape_into_2d(distribution_samples)[:, 0].astype(float)
+        start_time = time.time()
+
+        if distribution_samples.shape[0] > max_num_samples_for_fitting:
+            fitting_samples = distribution_samples[
+                np.random.choice(distribution_samples.shape[0], max_num_samples_for_fitting, replace=False)
+            ]
+        else:
+            fitting_samples = distribution_samples
+
+        # The empirical CDF is only evaluated at a fixed set of quantiles. This keeps the costs of ranking a candidate
+        # independent of the number of samples.
+        num_quantiles = min(distribution_samples.shape[0], 1000)
+        probabilities = (np.arange(1, num_quantiles + 1) - 0.5) / num_quantiles
+        quantiles = np.quantile(distribution_samples, probabilities)
+
+        candidates = list(_CONTINUOUS_DISTRIBUTIONS.values())
+        batch_size = max(1, effective_n_jobs(n_jobs))
+
+        ranked_candidates: List[Tuple[float, rv_continuous, Tuple[float]]] = []
+        with Parallel(n_jobs=n_jobs) as parallel:
+            for i in range(0, len(candidates), batch_size):
+                results = parallel(
+                    delayed(_fit_and_compute_cdf_distance)(distribution, fitting_samples, quantiles, probabilities)
+                    for distribution in candidates[i : i + batch_size]
+                )
+                ranked_candidates.extend(result for result in results if result is not None)
+
+                if any(distance < distance_threshold for distance, _, _ in ranked_candidates):
+                    break
+                if _is_time_budget_exhausted(start_time, max_time_in_seconds):
+                    break
+
+            ranked_candidates.sort(key=lambda x: x[0])
+            top_candidates = ranked_candidates[:num_top_candidates]
+
+            if fitting_samples.shape[0] < distribution_samples.shape[0] and not _is_time_budget_exhausted(
+                start_time, max_time_in_seconds
+            ):
+                refitted_candidates = parallel(
+                    delayed(_fit_and_compute_cdf_distance)(distribution, distribution_samples, quantiles, probabilities)
+                    for _, distribution, _ in top_candidates
+                )
+                top_candidates = sorted(
+                    [result for result in refitted_candidates if result is not None], key=lambda x: x[0]
+                )
+
+        if not top_candidates:
+            return norm, ScipyDistribution.map_scipy_distribution_parameters_to_names(
+                norm, norm.fit(distribution_samples)
+            )
+
+        _, best_distribution, best_parameters = top_candidates[0]
+
+        return best_distribution, ScipyDistribution.map_scipy_distribution_parameters_to_names(
+            best_distribution, best_parameters
+        )
+
     @staticmethod
     def map_scipy_distribution_parameters_to_names(
         scipy_distribution: Union[rv_continuous, rv_discrete], parameters: Tuple[float]
@@ -177,6 +294,30 @@ class ScipyDistribution(StochasticModel):
         return parameters_dictionary
 
 
+def _is_time_budget_exhausted(start_time: float, max_time_in_seconds: Optional[float]) -> bool:
+    return max_time_in_seconds is not None and time.time() - start_time > max_time_in_seconds
+
+
+def _fit_and_compute_cdf_distance(
+    distribution: rv_continuous, samples: np.ndarray, quantiles: np.ndarray, probabilities: np.ndarray
+) -> Optional[Tuple[float, rv_continuous, Tuple[float]]]:
+    # Ignore warnings from fitting process.
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore")
+
+        try:
+            params = distribution.fit(samples)
+            distance = float(np.max(np.abs(distribution.cdf(quantiles, *params) - probabilities)))
+        except Exception:
+            # Some distributions might not be compatible with the data or fail to converge.
+            return None
+
+    if not np.isfinite(distance):
+        return None
+
+    return distance, distribution, params
+
+
 class EmpiricalDistribution(StochasticModel):
     """An implementation of a stochastic model that uniformly samples from data samples. By randomly returning a sample
     from the training data set, this model represents a parameter free representation of the marginal distribution of
@@ -203,40 +344,246 @@ class EmpiricalDistribution(StochasticModel):
         return EmpiricalDistribution()
 
 
+class CompactEmpiricalDistribution(StochasticModel):
+    """A memory efficient alternative to :py:class:`EmpiricalDistribution <dowhy.gcm.EmpiricalDistribution>`. Instead
+    of storing all training samples, this model stores a deduplicated table of the observed values together with their
+    frequencies and samples from it via the alias method. This is lossless and typically much smaller if the data
+    contains many duplicates (e.g. categorical or discrete data).
+
+    If the number of unique values exceeds max_num_unique_values, the data is compressed further:
+        - For one dimensional numerical data (and no given reservoir_size), a grid of num_quantiles quantiles is stored
+          and samples are generated by inverse transform sampling with linear interpolation between the quantiles.
+          Note that this can generate values that were not part of the training data.
+        - Otherwise, a uniformly drawn subset (reservoir) of reservoir_size samples is kept and deduplicated. If
+          reservoir_size is not given, max_num_unique_values is used.
+
+    The trade-off between fidelity and memory footprint can be controlled via these parameters. The size of the fitted
+    model can be inspected via :py:attr:`memory_size_in_bytes`.
+    """
+
+    def __init__(
+        self, max_num_unique_values: int = 10000, num_quantiles: int = 1000, reservoir_size: Optional[int] = None
+    ) -> None:
+        """
+        :param max_num_unique_values: Maximum number of unique values that are stored in the value table.
+        :param num_quantiles: Size of the quantile grid that is used for one dimensional numerical data with more than
+                              max_num_unique_values unique values.
+        :param reservoir_size: If given, a random subset of this size is stored instead of a quantile grid when the
+                               number of unique values exceeds max_num_unique_values.
+        """
+        self._max_num_unique_values = max_num_unique_values
+        self._num_quantiles = num_quantiles
+        self._reservoir_size = reservoir_size
+        self._values = None
+        self._counts = None
+        self._alias_probabilities = None
+        self._alias_indices = None
+        self._quantiles = None
+
+    @property
+    def values(self) -> Optional[np.ndarray]:
+        """The stored (unique) values if the model uses a value table, None otherwise."""
+        return self._values
+
+    @property
+    def counts(self) -> Optional[np.ndarray]:
+        """The frequencies of the stored values if the model uses a value table, None otherwise."""
+        return self._counts
+
+    @property
+    def quantiles(self) -> Optional[np.ndarray]:
+        """The stored quantile grid if the model uses inverse transform sampling, None otherwise."""
+        return self._quantiles
+
+    @property
+    def memory_size_in_bytes(self) -> int:
+        """Number of bytes used by the arrays representing the fitted distribution."""
+        return sum(
+            x.nbytes
+            for x in [self._values, self._counts, self._alias_probabilities, self._alias_indices, self._quantiles]
+            if x is not None
+        )
+
+    def fit(self, X: np.ndarray) -> None:
+        X = shape_into_2d(X)
+        self._values, self._counts, self._alias_probabilities, self._alias_indices, self._quantiles = [None] * 5
+
+        values, counts = _unique_rows_with_counts(X)
+        if values.shape[0] > self._max_num_unique_values:
+            if self._reservoir_size is None and X.shape[1] == 1 and np.issubdtype(X.dtype, np.number):
+                self._quantiles = np.quantile(X[:, 0], np.linspace(0, 1, self._num_quantiles))
+                return
+
+            reservoir_size = self._max_num_unique_values if self._reservoir_size is None else self._reservoir_size
+            values, counts = _unique_rows_with_counts(
+                X[np.random.choice(X.shape[0], min(reservoir_size, X.shape[0]), replace=False)]
+            )
+
+        self._values = values
+        self._counts = counts
+        self._alias_probabilities, self._alias_indices = _build_alias_table(counts / np.sum(counts))
+
+    def draw_samples(self, num_samples: int) -> np.ndarray:
+        if self._quantiles is not None:
+            return shape_into_2d(
+                np.interp(
+                    np.random.uniform(0, 1, num_samples), np.linspace(0, 1, self._quantiles.shape[0]), self._quantiles
+                )
+            )
+
+        if self._values is None:
+            raise RuntimeError("%s has not been fitted!" % self.__class__.__name__)
+
+        indices = np.random.randint(0, self._values.shape[0], num_samples)
+        use_alias = np.random.uniform(0, 1, num_samples) >= self._alias_probabilities[indices]
+        indices[use_alias] = self._alias_indices[indices[use_alias]]
+
+        return self._values[indices, :]
+
+    def clone(self):
+        return CompactEmpiricalDistribution(
+            max_num_unique_values=self._max_num_unique_values,
+            num_quantiles=self._num_quantiles,
+            reservoir_size=self._reservoir_size,
+        )
+
+
+def _unique_rows_with_counts(X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    if X.dtype != object:
+        return np.unique(X, axis=0, return_counts=True)
+
+    # Numpy does not support unique rows of object arrays, e.g. when the data is categorical.
+    row_counts = {}
+    for row in map(tuple, X):
+        row_counts[row] = row_counts.get(row, 0) + 1
+
+    values = np.empty((len(row_counts), X.shape[1]), dtype=object)
+    values[:] = list(row_counts.keys())
+
+    return values, np.array(list(row_counts.values()))
+
+
+def _build_alias_table(probabilities: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Builds the tables for sampling from a discrete distribution via the alias method (Vose, 1991). After the
+    construction in O(k), each sample only requires O(1) operations.
+    """
+    num_values = probabilities.shape[0]
+    scaled_probabilities = probabilities * num_values
+    alias_probabilities = np.ones(num_values)
+    alias_indices = np.arange(num_values)
+
+    small = list(np.where(scaled_probabilities < 1)[0])
+    large = list(np.where(scaled_probabilities >= 1)[0])
+    while small and large:
+        i, j = small.pop(), large.pop()
+        alias_probabilities[i] = scaled_probabilities[i]
+        alias_indices[i] = j
+        scaled_probabilities[j] -= 1 - scaled_probabilities[i]
+        if scaled_probabilities[j] < 1:
+            small.append(j)
+        else:
+            large.append(j)
+
+    return alias_probabilities, alias_indices
+
+
 class BayesianGaussianMixtureDistribution(StochasticModel):
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        max_num_samples_for_selection: Optional[int] = 10000,
+        mini_batch_threshold: Optional[int] = 10000,
+        n_jobs: Optional[int] = 1,
+    ) -> None:
+        """Initializes a stochastic model that approximates the data distribution with a Bayesian Gaussian mixture
+        model. The number of components is selected by evaluating KMeans clusterings with increasing number of
+        clusters via the silhouette score.
+
+        :param max_num_samples_for_selection: Maximum number of samples used for selecting the number of components.
+                                              If the data has more samples, a random subset is used for the selection.
+                                              The final mixture model is always fitted on all samples. If None, all
+                                              samples are used.
+        :param mini_batch_threshold: If the number of samples used for the selection exceeds this value,
+                                     MiniBatchKMeans is used instead of KMeans. If None, KMeans is always used.
+        :param n_jobs: Number of parallel jobs used for evaluating different number of components. If None, the
+                       default config is used.
+        """
+        self._max_num_samples_for_selection = max_num_samples_for_selection
+        self._mini_batch_threshold = mini_batch_threshold
+        self._n_jobs = n_jobs
         self._gmm_model = None
+        self._num_components = None
+        self._component_selection_time_in_seconds = None
+
+    @property
+    def num_components(self) -> Optional[int]:
+        """The selected number of components of the fitted mixture model."""
+        return self._num_components
+
+    @property
+    def component_selection_time_in_seconds(self) -> Optional[float]:
+        """The time it took to select the number of components in the last fit call."""
+        return self._component_selection_time_in_seconds
 
     def fit(self, X: np.ndarray) -> None:
         X = shape_into_2d(X)
-        self._gmm_model = BayesianGaussianMixture(
-            n_components=BayesianGaussianMixtureDistribution._get_optimal_number_of_components(X), max_iter=1000
-        ).fit(X)
+
+        start_time = time.time()
+        self._num_components = BayesianGaussianMixtureDistribution._get_optimal_number_of_components(
+            X,
+            max_num_samples=self._max_num_samples_for_selection,
+            mini_batch_threshold=self._mini_batch_threshold,
+            n_jobs=self._n_jobs,
+        )
+        self._component_selection_time_in_seconds = time.time() - start_time
+
+        self._gmm_model = BayesianGaussianMixture(n_components=self._num_components, max_iter=1000).fit(X)
 
     @staticmethod
-    def _get_optimal_number_of_components(X: np.ndarray) -> int:
+    def _get_optimal_number_of_components(
+        X: np.ndarray,
+        max_num_samples: Optional[int] = None,
+        mini_batch_threshold: Optional[int] = None,
+        max_num_without_improvement: int = 3,
+        n_jobs: Optional[int] = 1,
+    ) -> int:
+        n_jobs = config.default_n_jobs if n_jobs is None else n_jobs
+
+        if max_num_samples is not None and X.shape[0] > max_num_samples:
+            X = X[np.random.choice(X.shape[0], max_num_samples, replace=False)]
+
+        max_num_components = int(np.sqrt(X.shape[0] / 2))
+
+        use_mini_batch = mini_batch_threshold is not None and X.shape[0] > mini_batch_threshold
+
         current_best = 0
         current_best_num_components = 1
         num_best_in_succession = 0
-        try:
-            for i in range(2, int(np.sqrt(X.shape[0] / 2))):
-                kmeans = KMeans(n_clusters=i).fit(X)
-                coefficient = silhouette_score(X, kmeans.labels_, sample_size=5000)
-
-                if coefficient > current_best:
-                    current_best = coefficient
-                    current_best_num_components = i
-                    num_best_in_succession = 0
-                else:
-                    num_best_in_succession += 1
-
-                if num_best_in_succession >= 3:
-                    break
-        except ValueError:
-            # This error is typically raised when the data is discrete and all points are assigned to less cluster than
-            # specified. It can also happen due to duplicated points. In these cases, the current best solution should
-            # be sufficient.
-            return current_best_num_components
+        # Candidates are evaluated in batches of the number of parallel jobs. The early stopping criterion is applied
+        # in the order of the candidates, i.e. the result does not depend on the number of jobs.
+        batch_size = max(1, effective_n_jobs(n_jobs))
+        with Parallel(n_jobs=n_jobs) as parallel:
+            for i in range(2, max_num_components, batch_size):
+                coefficients = parallel(
+                    delayed(_compute_silhouette_score_of_kmeans)(X, num_clusters, use_mini_batch)
+                    for num_clusters in range(i, min(i + batch_size, max_num_components))
+                )
+
+                for num_clusters, coefficient in zip(range(i, i + batch_size), coefficients):
+                    if coefficient is None:
+                        # This is typically the case when the data is discrete and all points are assigned to less
+                        # cluster than specified. It can also happen due to duplicated points. In these cases, the
+                        # current best solution should be sufficient.
+                        return current_best_num_components
+
+                    if coefficient > current_best:
+                        current_best = coefficient
+                        current_best_num_components = num_clusters
+                        num_best_in_succession = 0
+                    else:
+                        num_best_in_succession += 1
+
+                    if num_best_in_succession >= max_num_without_improvement:
+                        return current_best_num_components
 
         return current_best_num_components
 
@@ -250,4 +597,20 @@ class BayesianGaussianMixtureDistribution(StochasticModel):
         return "Approximated data distribution"
 
     def clone(self):
-        return BayesianGaussianMixtureDistribution()
+        return BayesianGaussianMixtureDistribution(
+            max_num_samples_for_selection=self._max_num_samples_for_selection,
+            mini_batch_threshold=self._mini_batch_threshold,
+            n_jobs=self._n_jobs,
+        )
+
+
+def _compute_silhouette_score_of_kmeans(X: np.ndarray, num_clusters: int, use_mini_batch: bool) -> Optional[float]:
+    try:
+        if use_mini_batch:
+            kmeans = MiniBatchKMeans(n_clusters=num_clusters).fit(X)
+        else:
+            kmeans = KMeans(n_clusters=num_clusters).fit(X)
+
+        return silhouette_score(X, kmeans.labels_, sample_size=5000)
+    except ValueError:
+        return None
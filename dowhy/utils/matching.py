@@ -0,0 +1,665 @@
+import logging
+import time
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from scipy.spatial.distance import cdist
+from sklearn.neighbors import NearestNeighbors
+
+logger = logging.getLogger(__name__)
+
+# Methods of find_matches. The exact ones return the same matches up to ties.
+EXACT_NEIGHBOR_SEARCH_METHODS = ("ball_tree", "kd_tree", "brute")
+NEIGHBOR_SEARCH_METHODS = EXACT_NEIGHBOR_SEARCH_METHODS + ("approximate",)
+
+# Metrics of sklearn.neighbors.NearestNeighbors and their names in scipy.spatial.distance.cdist
+_CDIST_METRICS = {
+    "minkowski": "minkowski",
+    "euclidean": "euclidean",
+    "manhattan": "cityblock",
+    "cityblock": "cityblock",
+    "chebyshev": "chebyshev",
+    "seuclidean": "seuclidean",
+    "mahalanobis": "mahalanobis",
+}
+# Metrics that are supported by the approximate search and the order of their norm
+_NORM_ORDERS = {"euclidean": 2, "manhattan": 1, "cityblock": 1, "chebyshev": np.inf}
+# Up to this number of pairs of query and reference units, the distances of a group are computed directly
+_MAX_NUM_PAIRS_FOR_BRUTE_FORCE = 10**5
+# Minimum number of pairs of query and reference units for computing Euclidean distances by a matrix product
+_MIN_NUM_PAIRS_FOR_MATRIX_PRODUCT = 10**4
+# Maximum number of distances (or feature differences) that are held in memory at once by the brute force and
+# approximate searches
+_MAX_CHUNK_SIZE = 2**22
+
+
+def find_matches(
+    reference_features: np.ndarray,
+    query_features: np.ndarray,
+    num_matches: Optional[int] = 1,
+    caliper: Optional[float] = None,
+    n_jobs: Optional[int] = None,
+    method: str = "ball_tree",
+    **nearest_neighbors_params,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Finds the nearest reference units of every query unit, e.g. the nearest control units of every treated unit.
+
+    The matches are returned as matched pairs instead of one row per query unit, since query units can have different
+    numbers of matches if a caliper is used.
+
+    The neighbor search can use one of the following methods:
+
+    - "ball_tree" and "kd_tree": Exact search with the respective tree of sklearn.neighbors.NearestNeighbors. Trees are
+      fast for few features, but degrade to a brute force search for many features.
+    - "brute": Exact search that computes the distances of chunks of query units to all reference units at once. For
+      the Euclidean distance, this is done with matrix products. It is usually the fastest exact method for many
+      features.
+    - "approximate": Approximate search on a k-nearest neighbor graph of the reference units (see
+      NeighborGraph). The returned matches can differ from the exact nearest neighbors, see evaluate_neighbor_search
+      for measuring the recall. Radius matching is not supported.
+
+    :param reference_features: Features of the units that can be matched, one row per unit.
+    :param query_features: Features of the units for which matches are searched, one row per unit.
+    :param num_matches: Number of matches per query unit. If None, all reference units within the caliper are matched
+                        (radius matching).
+    :param caliper: Maximum distance of a match. Matches that are further apart are discarded, i.e. query units can
+                    have fewer than num_matches matches or none at all. If None, the distance is not restricted.
+    :param n_jobs: The number of parallel jobs for the neighbor queries of the tree methods.
+    :param method: The neighbor search method, one of NEIGHBOR_SEARCH_METHODS.
+    :param nearest_neighbors_params: Additional parameters of the method, e.g. the metric. For the tree methods, they
+                                     are passed to sklearn.neighbors.NearestNeighbors. The brute force search supports
+                                     the metrics minkowski, euclidean, manhattan, cityblock, chebyshev, seuclidean and
+                                     mahalanobis and their parameters. For the approximate search, see the parameters
+                                     of NeighborGraph.
+    :returns: A tuple of two arrays with the positions of the query unit and the reference unit of each matched pair.
+              The pairs are ordered by the position of the query unit.
+    """
+    if num_matches is None and caliper is None:
+        raise ValueError("Either the number of matches or a caliper needs to be specified.")
+    if method not in NEIGHBOR_SEARCH_METHODS:
+        raise ValueError(
+            "Neighbor search method %s is not supported. Supported methods are %s." % (method, NEIGHBOR_SEARCH_METHODS)
+        )
+
+    if method == "brute":
+        return _find_matches_by_brute_force(
+            reference_features, query_features, num_matches, caliper, **nearest_neighbors_params
+        )
+    if method == "approximate":
+        if num_matches is None:
+            raise ValueError("Radius matching is not supported by the approximate neighbor search.")
+        distances, indices = NeighborGraph(reference_features, **nearest_neighbors_params).kneighbors(
+            query_features, num_matches
+        )
+        return _select_matches(distances, indices, caliper)
+
+    nearest_neighbors_params = {"algorithm": method, **nearest_neighbors_params}
+    if caliper is not None:
+        nearest_neighbors_params["radius"] = caliper
+    neighbors = NearestNeighbors(n_neighbors=num_matches or 1, n_jobs=n_jobs, **nearest_neighbors_params).fit(
+        reference_features
+    )
+
+    if num_matches is None:
+        _, indices = neighbors.radius_neighbors(query_features)
+        num_matches_per_unit = np.array([len(unit_indices) for unit_indices in indices], dtype=int)
+        query_positions = np.repeat(np.arange(query_features.shape[0]), num_matches_per_unit)
+        reference_positions = np.concatenate(indices).astype(int) if len(indices) > 0 else np.zeros(0, dtype=int)
+        return query_positions, reference_positions
+    else:
+        distances, indices = neighbors.kneighbors(query_features)
+        return _select_matches(distances, indices, caliper)
+
+
+def _select_matches(distances, indices, caliper):
+    """Converts the distances and indices of the nearest neighbors of every query unit into matched pairs, discarding
+    the pairs outside of the caliper."""
+    query_positions = np.repeat(np.arange(indices.shape[0]), indices.shape[1])
+    reference_positions = indices.ravel()
+    if caliper is not None:
+        is_within_caliper = distances.ravel() <= caliper
+        query_positions = query_positions[is_within_caliper]
+        reference_positions = reference_positions[is_within_caliper]
+    return query_positions, reference_positions
+
+
+def _find_matches_by_brute_force(
+    reference_features, query_features, num_matches=1, caliper=None, metric="minkowski", **metric_params
+):
+    """Same as find_matches, but computes the distances of chunks of query units to all reference units directly."""
+    if metric not in _CDIST_METRICS:
+        raise ValueError(
+            "Metric %s is not supported by the brute force neighbor search. Supported metrics are %s."
+            % (metric, list(_CDIST_METRICS))
+        )
+    metric = _CDIST_METRICS[metric]
+    if metric == "minkowski" and metric_params.get("p", 2) == 2 and "w" not in metric_params:
+        metric = "euclidean"
+        metric_params = {}
+    # For few pairs of units, the overhead of the matrix product outweighs its speed-up
+    use_matrix_product = (
+        metric == "euclidean"
+        and query_features.shape[0] * reference_features.shape[0] > _MIN_NUM_PAIRS_FOR_MATRIX_PRODUCT
+    )
+    if use_matrix_product:
+        squared_reference_norms = np.einsum("ij,ij->i", reference_features, reference_features)
+
+    num_reference_units = reference_features.shape[0]
+    chunk_size = max(1, _MAX_CHUNK_SIZE // max(num_reference_units, 1))
+    query_positions, reference_positions = [], []
+    for chunk_start in range(0, query_features.shape[0], chunk_size):
+        query_chunk = query_features[chunk_start : chunk_start + chunk_size]
+        if use_matrix_product:
+            # The squared distances without the squared norms of the query units, which do not change the order of
+            # the reference units. The inner products are computed by a single matrix product.
+            squared_query_norms = np.einsum("ij,ij->i", query_chunk, query_chunk)[:, np.newaxis]
+            distances = query_chunk @ reference_features.T
+            distances *= -2
+            distances += squared_reference_norms
+        else:
+            distances = cdist(query_chunk, reference_features, metric=metric, **metric_params)
+
+        if num_matches is None:
+            if use_matrix_product:
+                chunk_query_positions, chunk_reference_positions = np.nonzero(
+                    distances <= caliper**2 - squared_query_norms
+                )
+            else:
+                chunk_query_positions, chunk_reference_positions = np.nonzero(distances <= caliper)
+        else:
+            num_chunk_matches = min(num_matches, num_reference_units)
+            rows = np.arange(distances.shape[0])[:, np.newaxis]
+            if num_chunk_matches == 1:
+                indices = np.argmin(distances, axis=1)[:, np.newaxis]
+            else:
+                if num_chunk_matches < num_reference_units:
+                    indices = np.argpartition(distances, num_chunk_matches - 1, axis=1)[:, :num_chunk_matches]
+                else:
+                    indices = np.broadcast_to(np.arange(num_reference_units), distances.shape)
+                # Order the matches of every unit by their distance, ties by their position
+                indices = indices[rows, np.lexsort((indices, distances[rows, indices]), axis=1)]
+            nearest_distances = distances[rows, indices]
+            if use_matrix_product:
+                nearest_distances = np.sqrt(np.maximum(nearest_distances + squared_query_norms, 0))
+            chunk_query_positions, chunk_reference_positions = _select_matches(nearest_distances, indices, caliper)
+        query_positions.append(chunk_query_positions + chunk_start)
+        reference_positions.append(chunk_reference_positions)
+
+    if len(query_positions) == 1:
+        return query_positions[0], reference_positions[0]
+    if not query_positions:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+    return np.concatenate(query_positions), np.concatenate(reference_positions)
+
+
+class NeighborGraph:
+    """Index for the approximate nearest neighbor search on a k-nearest neighbor graph of the reference units.
+
+    The graph is initialized with the exact nearest neighbors within the leaves of random projection trees, which
+    recursively split the units at the median of their projection on a random direction. Optionally, it is refined by
+    considering the neighbors of neighbors of every unit. A query greedily explores the graph, starting from the units
+    of its leaf in the first tree, while keeping the beam_width nearest units found so far. All steps are vectorized
+    over the units.
+
+    The index is most useful for many reference units with many features, for which the exact methods compute (almost)
+    all distances. Larger graph degrees, more trees and wider beams increase the recall at the cost of a slower
+    search.
+    """
+
+    def __init__(
+        self,
+        reference_features: np.ndarray,
+        metric: str = "minkowski",
+        p: float = 2,
+        graph_degree: int = 16,
+        num_trees: int = 4,
+        leaf_size: int = 64,
+        num_refinements: int = 0,
+        beam_width: int = 32,
+        random_state: Optional[Union[int, np.random.RandomState]] = None,
+    ):
+        """
+        :param reference_features: Features of the units that can be matched, one row per unit.
+        :param metric: The distance metric, either "minkowski" with order p, "euclidean", "manhattan", "cityblock" or
+                       "chebyshev".
+        :param p: The order of the Minkowski metric.
+        :param graph_degree: The number of neighbors of every unit in the graph.
+        :param num_trees: The number of random projection trees for the initialization of the graph.
+        :param leaf_size: The maximum number of units in a leaf of a random projection tree.
+        :param num_refinements: The number of refinements of the graph with the neighbors of neighbors.
+        :param beam_width: The number of nearest units that a query keeps while exploring the graph. It is increased
+                           to the number of requested neighbors if necessary.
+        :param random_state: Seed or random state for the random projections.
+        """
+        if metric == "minkowski":
+            self._norm_order = p
+        elif metric in _NORM_ORDERS:
+            self._norm_order = _NORM_ORDERS[metric]
+        else:
+            raise ValueError(
+                "Metric %s is not supported by the approximate neighbor search. Supported metrics are %s."
+                % (metric, ["minkowski"] + list(_NORM_ORDERS))
+            )
+        if not isinstance(random_state, np.random.RandomState):
+            random_state = np.random.RandomState(random_state)
+
+        self._reference_features = np.asarray(reference_features, dtype=float)
+        self._beam_width = beam_width
+        num_reference_units = self._reference_features.shape[0]
+        self._leaf_size = max(leaf_size, 2 * graph_degree + 2)
+        self._graph_degree = min(graph_degree, num_reference_units - 1)
+
+        self._trees = [self._build_tree(random_state) for _ in range(num_trees)]
+        if self._graph_degree <= 0:
+            self._graph = np.zeros((num_reference_units, 0), dtype=int)
+            return
+        candidates = [self._find_neighbors_within_leaves(tree) for tree in self._trees]
+        distances, self._graph = _select_nearest_candidates(
+            np.concatenate([tree_distances for tree_distances, _ in candidates], axis=1),
+            np.concatenate([tree_indices for _, tree_indices in candidates], axis=1),
+            self._graph_degree,
+        )
+        for _ in range(num_refinements):
+            distances, self._graph = self._refine_graph(distances)
+
+    def kneighbors(self, query_features: np.ndarray, num_neighbors: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the approximate nearest reference units of every query unit.
+
+        :param query_features: Features of the query units, one row per unit.
+        :param num_neighbors: Number of neighbors per query unit.
+        :returns: A tuple of the distances and positions of the neighbors, one row per query unit. The neighbors are
+                  ordered by their distance.
+        """
+        query_features = np.asarray(query_features, dtype=float)
+        num_neighbors = min(num_neighbors, self._reference_features.shape[0])
+        beam_width = max(self._beam_width, num_neighbors)
+        chunk_size = max(1, _MAX_CHUNK_SIZE // (max(beam_width, self._graph_degree) * query_features.shape[1] + 1))
+        distances, indices = [], []
+        for chunk_start in range(0, query_features.shape[0], chunk_size):
+            chunk_distances, chunk_indices = self._search(
+                query_features[chunk_start : chunk_start + chunk_size], beam_width
+            )
+            distances.append(chunk_distances[:, :num_neighbors])
+            indices.append(chunk_indices[:, :num_neighbors])
+        if not indices:
+            return np.zeros((0, num_neighbors)), np.zeros((0, num_neighbors), dtype=int)
+        return np.concatenate(distances), np.concatenate(indices)
+
+    def _build_tree(self, random_state):
+        """Builds a random projection tree, which is complete and balanced: every level splits all nodes of the
+        previous level in halves. Returns the hyperplanes of all levels, the order of the units by leaf and the bounds
+        of the leaves in this order."""
+        features = self._reference_features
+        order = np.arange(features.shape[0])
+        bounds = np.array([0, features.shape[0]])
+        hyperplanes = []
+        while np.max(np.diff(bounds)) > self._leaf_size:
+            starts, sizes = bounds[:-1], np.diff(bounds)
+            node_of_position = np.repeat(np.arange(sizes.shape[0]), sizes)
+            # The direction of a node is the difference between two of its units
+            first_units = order[starts + (random_state.random_sample(sizes.shape[0]) * sizes).astype(int)]
+            second_units = order[starts + (random_state.random_sample(sizes.shape[0]) * sizes).astype(int)]
+            directions = features[first_units] - features[second_units]
+            projections = np.einsum("ij,ij->i", features[order], directions[node_of_position])
+            sorted_positions = np.lexsort((projections, node_of_position))
+            order, projections = order[sorted_positions], projections[sorted_positions]
+            middles = starts + sizes // 2
+            hyperplanes.append((directions, (projections[middles - 1] + projections[middles]) / 2))
+            bounds = np.insert(bounds, np.arange(1, bounds.shape[0]), middles)
+        return hyperplanes, order, bounds
+
+    def _find_leaves(self, tree, query_features):
+        hyperplanes, _, _ = tree
+        nodes = np.zeros(query_features.shape[0], dtype=int)
+        for directions, thresholds in hyperplanes:
+            projections = np.einsum("ij,ij->i", query_features, directions[nodes])
+            nodes = 2 * nodes + (projections > thresholds[nodes])
+        return nodes
+
+    def _get_leaf_units(self, tree, leaves):
+        """Returns the units of the given leaves, one row per leaf, padded with -1."""
+        _, order, bounds = tree
+        max_leaf_size = np.max(np.diff(bounds))
+        positions = bounds[leaves, np.newaxis] + np.arange(max_leaf_size)
+        return np.where(
+            positions < bounds[leaves + 1, np.newaxis], order[np.minimum(positions, order.shape[0] - 1)], -1
+        )
+
+    def _find_neighbors_within_leaves(self, tree):
+        """Returns the exact nearest neighbors of every unit among the units of its leaf."""
+        _, order, bounds = tree
+        leaf_units = self._get_leaf_units(tree, np.arange(bounds.shape[0] - 1))
+        distances = np.full((order.shape[0], self._graph_degree), np.inf)
+        indices = np.zeros((order.shape[0], self._graph_degree), dtype=int)
+        chunk_size = max(1, _MAX_CHUNK_SIZE // (leaf_units.shape[1] ** 2 * self._reference_features.shape[1]))
+        for chunk_start in range(0, leaf_units.shape[0], chunk_size):
+            units = leaf_units[chunk_start : chunk_start + chunk_size]
+            features = self._reference_features[units]
+            leaf_distances = _compute_distances(features, features, self._norm_order)
+            leaf_distances[np.broadcast_to(units[:, np.newaxis, :] < 0, leaf_distances.shape)] = np.inf
+            leaf_distances[:, np.arange(units.shape[1]), np.arange(units.shape[1])] = np.inf
+            nearest = np.argpartition(leaf_distances, self._graph_degree - 1, axis=2)[:, :, : self._graph_degree]
+            is_unit = units >= 0
+            distances[units[is_unit]] = np.take_along_axis(leaf_distances, nearest, axis=2)[is_unit]
+            indices[units[is_unit]] = np.take_along_axis(
+                np.broadcast_to(units[:, np.newaxis, :], leaf_distances.shape), nearest, axis=2
+            )[is_unit]
+        return distances, indices
+
+    def _refine_graph(self, distances):
+        """Replaces the neighbors of every unit by the nearest units among its neighbors and their neighbors."""
+        num_reference_units = self._graph.shape[0]
+        refined_distances = np.empty_like(distances)
+        refined_graph = np.empty_like(self._graph)
+        num_candidates = self._graph_degree**2
+        chunk_size = max(1, _MAX_CHUNK_SIZE // (num_candidates * self._reference_features.shape[1]))
+        for chunk_start in range(0, num_reference_units, chunk_size):
+            units = np.arange(chunk_start, min(chunk_start + chunk_size, num_reference_units))
+            candidates = self._graph[self._graph[units]].reshape(units.shape[0], num_candidates)
+            candidate_distances = _compute_distances(
+                self._reference_features[units, np.newaxis, :],
+                self._reference_features[candidates],
+                self._norm_order,
+            )[:, 0, :]
+            candidate_distances[candidates == units[:, np.newaxis]] = np.inf
+            refined_distances[units], refined_graph[units] = _select_nearest_candidates(
+                np.concatenate([distances[units], candidate_distances], axis=1),
+                np.concatenate([self._graph[units], candidates], axis=1),
+                self._graph_degree,
+            )
+        return refined_distances, refined_graph
+
+    def _search(self, query_features, beam_width):
+        """Greedily explores the graph for every query unit: the nearest unexpanded unit of the beam is replaced by
+        its neighbors until all units of the beam are expanded."""
+        # Start with the nearest units of the leaf of the query unit
+        entry_units = self._get_leaf_units(self._trees[0], self._find_leaves(self._trees[0], query_features))
+        entry_distances = _compute_distances(
+            query_features[:, np.newaxis, :], self._reference_features[entry_units], self._norm_order
+        )[:, 0, :]
+        entry_distances[entry_units < 0] = np.inf
+        if entry_units.shape[1] < beam_width:
+            padding = beam_width - entry_units.shape[1]
+            entry_units = np.pad(entry_units, ((0, 0), (0, padding)), constant_values=-1)
+            entry_distances = np.pad(entry_distances, ((0, 0), (0, padding)), constant_values=np.inf)
+        beam_distances, beam = _select_nearest_candidates(entry_distances, entry_units, beam_width)
+        is_expanded = np.isinf(beam_distances)
+
+        is_active = ~np.all(is_expanded, axis=1)
+        while np.any(is_active) and self._graph_degree > 0:
+            rows = np.flatnonzero(is_active)
+            nearest_unexpanded = np.argmin(np.where(is_expanded[rows], np.inf, beam_distances[rows]), axis=1)
+            is_expanded[rows, nearest_unexpanded] = True
+            neighbors = self._graph[beam[rows, nearest_unexpanded]]
+            neighbor_distances = _compute_distances(
+                query_features[rows, np.newaxis, :], self._reference_features[neighbors], self._norm_order
+            )[:, 0, :]
+            # Units that are already in the beam are not added again
+            neighbor_distances[np.any(neighbors[:, :, np.newaxis] == beam[rows, np.newaxis, :], axis=2)] = np.inf
+            candidate_distances = np.concatenate([beam_distances[rows], neighbor_distances], axis=1)
+            nearest = np.argpartition(candidate_distances, beam_width - 1, axis=1)[:, :beam_width]
+            beam_distances[rows] = np.take_along_axis(candidate_distances, nearest, axis=1)
+            beam[rows] = np.take_along_axis(np.concatenate([beam[rows], neighbors], axis=1), nearest, axis=1)
+            is_expanded[rows] = np.take_along_axis(
+                np.concatenate([is_expanded[rows], np.isinf(neighbor_distances)], axis=1), nearest, axis=1
+            )
+            is_active[rows] = ~np.all(is_expanded[rows], axis=1)
+
+        order = np.argsort(beam_distances, axis=1, kind="stable")
+        return np.take_along_axis(beam_distances, order, axis=1), np.take_along_axis(beam, order, axis=1)
+
+
+def _compute_distances(x, y, norm_order):
+    """Computes the distances between the rows of x and y for every leading index, i.e. the result has the shape
+    x.shape[:-1] + y.shape[-2:-1]."""
+    if norm_order == 2:
+        squared_distances = (
+            np.einsum("...ij,...ij->...i", x, x)[..., np.newaxis]
+            - 2 * x @ np.swapaxes(y, -1, -2)
+            + np.einsum("...ij,...ij->...i", y, y)[..., np.newaxis, :]
+        )
+        return np.sqrt(np.maximum(squared_distances, 0))
+    return np.linalg.norm(x[..., :, np.newaxis, :] - y[..., np.newaxis, :, :], ord=norm_order, axis=-1)
+
+
+def _select_nearest_candidates(distances, indices, num_nearest):
+    """Selects the num_nearest candidates with the smallest distances in every row, counting every index only once."""
+    # Duplicates of an index are adjacent after sorting by index and distance
+    order = np.lexsort((distances, indices), axis=1)
+    distances = np.take_along_axis(distances, order, axis=1)
+    indices = np.take_along_axis(indices, order, axis=1)
+    distances[:, 1:][indices[:, 1:] == indices[:, :-1]] = np.inf
+    nearest = np.argpartition(distances, num_nearest - 1, axis=1)[:, :num_nearest]
+    return np.take_along_axis(distances, nearest, axis=1), np.take_along_axis(indices, nearest, axis=1)
+
+
+def evaluate_neighbor_search(
+    reference_features: np.ndarray,
+    query_features: np.ndarray,
+    num_matches: int = 1,
+    methods: Optional[Dict[str, Dict]] = None,
+    num_evaluation_units: Optional[int] = 1000,
+    random_state: Optional[Union[int, np.random.RandomState]] = None,
+    **nearest_neighbors_params,
+) -> pd.DataFrame:
+    """Measures the latency and recall of neighbor search methods for the given units. This helps to choose the
+    method, e.g. the trade-off between accuracy and speed of the approximate search.
+
+    The recall of a method is the fraction of its matches whose distance is at most the distance of the
+    num_matches-th exact nearest neighbor, averaged over a random sample of query units. Hence, ties do not reduce
+    the recall.
+
+    :param reference_features: Features of the units that can be matched, one row per unit.
+    :param query_features: Features of the units for which matches are searched, one row per unit.
+    :param num_matches: Number of matches per query unit.
+    :param methods: Dictionary from the names of the evaluated configurations to the parameters of find_matches, e.g.
+                    {"approximate (beam width 64)": {"method": "approximate", "beam_width": 64}}. If None, all
+                    methods are evaluated with their default parameters.
+    :param num_evaluation_units: Number of sampled query units for computing the recall. If None, all query units are
+                                 used.
+    :param random_state: Seed or random state for sampling the query units.
+    :param nearest_neighbors_params: Parameters of find_matches that are shared by all methods, e.g. the metric.
+    :returns: A DataFrame with one row per method and the columns "seconds" (build and query time for all query units),
+              "microseconds_per_query" and "recall".
+    """
+    if methods is None:
+        methods = {method: {"method": method} for method in NEIGHBOR_SEARCH_METHODS}
+    if not isinstance(random_state, np.random.RandomState):
+        random_state = np.random.RandomState(random_state)
+    num_query_units = query_features.shape[0]
+    evaluation_units = np.arange(num_query_units)
+    if num_evaluation_units is not None and num_evaluation_units < num_query_units:
+        evaluation_units = np.sort(random_state.choice(num_query_units, num_evaluation_units, replace=False))
+
+    metric_params = {
+        key: value for key, value in nearest_neighbors_params.items() if key in ("metric", "p", "w", "V", "VI")
+    }
+    metric_params.setdefault("metric", "minkowski")
+    exact_distances = cdist(
+        query_features[evaluation_units],
+        reference_features,
+        metric=_CDIST_METRICS[metric_params.pop("metric")],
+        **metric_params,
+    )
+    num_matches = min(num_matches, reference_features.shape[0])
+    max_exact_distances = np.partition(exact_distances, num_matches - 1, axis=1)[:, num_matches - 1]
+
+    results = {}
+    for name, method_params in methods.items():
+        start_time = time.perf_counter()
+        query_positions, reference_positions = find_matches(
+            reference_features, query_features, num_matches, **{**nearest_neighbors_params, **method_params}
+        )
+        seconds = time.perf_counter() - start_time
+
+        is_evaluated = np.isin(query_positions, evaluation_units)
+        evaluation_rows = np.searchsorted(evaluation_units, query_positions[is_evaluated])
+        match_distances = exact_distances[evaluation_rows, reference_positions[is_evaluated]]
+        # Tolerate rounding errors of distances that are computed differently
+        is_correct = match_distances <= max_exact_distances[evaluation_rows] * (1 + 1e-9) + 1e-12
+        results[name] = {
+            "seconds": seconds,
+            "microseconds_per_query": seconds / max(num_query_units, 1) * 1e6,
+            "recall": np.sum(is_correct) / (num_matches * evaluation_units.shape[0]),
+        }
+    return pd.DataFrame.from_dict(results, orient="index")
+
+
+def find_matches_within_groups(
+    reference_features: np.ndarray,
+    query_features: np.ndarray,
+    reference_groups: np.ndarray,
+    query_groups: np.ndarray,
+    num_matches: Optional[int] = 1,
+    caliper: Optional[float] = None,
+    n_jobs: Optional[int] = None,
+    method: str = "ball_tree",
+    **nearest_neighbors_params,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Finds the nearest reference units of every query unit among the reference units of the same group, e.g. among
+    the units with the same values of the exact-match columns.
+
+    The units are sorted by their group once and the matching within the groups runs in parallel. If a group has fewer
+    reference units than num_matches, all of them are matched. Query units of groups without any reference unit are not
+    matched.
+
+    :param reference_features: Features of the units that can be matched, one row per unit.
+    :param query_features: Features of the units for which matches are searched, one row per unit.
+    :param reference_groups: Integer group code of every reference unit, e.g. as returned by GroupBy.ngroup. Units with
+                             a negative code are not matched.
+    :param query_groups: Integer group code of every query unit.
+    :param num_matches: Number of matches per query unit. If None, all reference units within the caliper are matched
+                        (radius matching).
+    :param caliper: Maximum distance of a match. If None, the distance is not restricted.
+    :param n_jobs: The maximum number of groups that are processed concurrently.
+    :param method: The neighbor search method within the groups, see find_matches.
+    :param nearest_neighbors_params: Additional parameters of the method, see find_matches.
+    :returns: A tuple of two arrays with the positions of the query unit and the reference unit of each matched pair.
+              The pairs are ordered by the position of the query unit.
+    """
+    num_groups = max(np.max(query_groups, initial=-1), np.max(reference_groups, initial=-1)) + 1
+    query_order = np.argsort(query_groups, kind="stable")
+    reference_order = np.argsort(reference_groups, kind="stable")
+    query_bounds = np.searchsorted(query_groups[query_order], np.arange(num_groups + 1))
+    reference_bounds = np.searchsorted(reference_groups[reference_order], np.arange(num_groups + 1))
+    groups = np.flatnonzero((np.diff(query_bounds) > 0) & (np.diff(reference_bounds) > 0))
+    if groups.shape[0] == 0:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+
+    query_positions_of_groups = [query_order[query_bounds[group] : query_bounds[group + 1]] for group in groups]
+    reference_positions_of_groups = [
+        reference_order[reference_bounds[group] : reference_bounds[group + 1]] for group in groups
+    ]
+    # Building a search index for every group has a large overhead, which dominates for small groups. Hence, the exact
+    # methods compute their distances directly if the metric is supported.
+    use_brute_force = (
+        method in EXACT_NEIGHBOR_SEARCH_METHODS
+        and nearest_neighbors_params.get("metric", "minkowski") in _CDIST_METRICS
+    )
+    matches_of_groups = Parallel(n_jobs=n_jobs)(
+        delayed(find_matches)(
+            reference_features[reference_positions],
+            query_features[query_positions],
+            num_matches=None if num_matches is None else min(num_matches, reference_positions.shape[0]),
+            caliper=caliper,
+            method="brute"
+            if use_brute_force
+            and query_positions.shape[0] * reference_positions.shape[0] <= _MAX_NUM_PAIRS_FOR_BRUTE_FORCE
+            else method,
+            **nearest_neighbors_params,
+        )
+        for query_positions, reference_positions in zip(query_positions_of_groups, reference_positions_of_groups)
+    )
+
+    # Map the positions within the groups back to the positions among all units
+    query_positions = np.concatenate(
+        [
+            query_positions_of_group[matched_query_positions]
+            for query_positions_of_group, (matched_query_positions, _) in zip(
+                query_positions_of_groups, matches_of_groups
+            )
+        ]
+    )
+    reference_positions = np.concatenate(
+        [
+            reference_positions_of_group[matched_reference_positions]
+            for reference_positions_of_group, (_, matched_reference_positions) in zip(
+                reference_positions_of_groups, matches_of_groups
+            )
+        ]
+    )
+    order = np.argsort(query_positions, kind="stable")
+    return query_positions[order], reference_positions[order]
+
+
+def compute_matched_differences(
+    query_outcomes: np.ndarray,
+    reference_outcomes: np.ndarray,
+    query_positions: np.ndarray,
+    reference_positions: np.ndarray,
+) -> np.ndarray:
+    """Computes the difference between the outcome of every query unit and the mean outcome of its matches.
+
+    :param query_outcomes: Outcomes of the query units.
+    :param reference_outcomes: Outcomes of the reference units.
+    :param query_positions: Positions of the query units of the matched pairs (see find_matches).
+    :param reference_positions: Positions of the reference units of the matched pairs (see find_matches).
+    :returns: An array with one difference per query unit, which is NaN for units without any match.
+    """
+    num_query_units = query_outcomes.shape[0]
+    num_matches = np.bincount(query_positions, minlength=num_query_units)
+    matched_outcome_sums = np.bincount(
+        query_positions, weights=reference_outcomes[reference_positions], minlength=num_query_units
+    )
+    differences = np.full(num_query_units, np.nan)
+    is_matched = num_matches > 0
+    differences[is_matched] = query_outcomes[is_matched] - matched_outcome_sums[is_matched] / num_matches[is_matched]
+    return differences
+
+
+def estimate_matched_effect(
+    query_outcomes: np.ndarray,
+    reference_outcomes: np.ndarray,
+    query_positions: np.ndarray,
+    reference_positions: np.ndarray,
+) -> Tuple[float, int]:
+    """Estimates the mean difference between the outcome of a query unit and the mean outcome of its matches. Query
+    units without any match are excluded.
+
+    :param query_outcomes: Outcomes of the query units.
+    :param reference_outcomes: Outcomes of the reference units.
+    :param query_positions: Positions of the query units of the matched pairs (see find_matches).
+    :param reference_positions: Positions of the reference units of the matched pairs (see find_matches).
+    :returns: A tuple of the mean difference and the number of query units with at least one match.
+    """
+    differences = compute_matched_differences(query_outcomes, reference_outcomes, query_positions, reference_positions)
+    is_matched = ~np.isnan(differences)
+    num_query_units = differences.shape[0]
+    num_matched_units = int(np.sum(is_matched))
+    if num_matched_units == 0:
+        raise ValueError("None of the units could be matched. Consider increasing the caliper.")
+    if num_matched_units < num_query_units:
+        logger.warning(
+            "%d of %d units have no match and are excluded from the estimate.",
+            num_query_units - num_matched_units,
+            num_query_units,
+        )
+
+    return float(np.mean(differences[is_matched])), num_matched_units
+
+
+def build_match_table(
+    query_index: pd.Index, reference_index: pd.Index, query_positions: np.ndarray, reference_positions: np.ndarray
+) -> Dict[object, List[object]]:
+    """Returns a dictionary that maps the index of every query unit to the indices of its matched reference units.
+
+    :param query_index: Index of the query units in the original data.
+    :param reference_index: Index of the reference units in the original data.
+    :param query_positions: Positions of the query units of the matched pairs (see find_matches).
+    :param reference_positions: Positions of the reference units of the matched pairs (see find_matches).
+    """
+    num_matches = np.bincount(query_positions, minlength=len(query_index))
+    matched_indices = np.split(np.asarray(reference_index)[reference_positions], np.cumsum(num_matches)[:-1])
+    return dict(zip(query_index.tolist(), [indices.tolist() for indices in matched_indices]))
@@ -76,13 +76,26 @@ def generate_moment_function(W, g):
     Generate and returns moment function
     m(W,g) = g(1,W) - g(0,W) for Average Causal Effect
     """
+    # g is evaluated on the data with treatment = 1 and treatment = 0 in a single call
+    num_samples = W.shape[0]
+    data_1, data_0 = get_interventional_data(W)
+    preds = g(np.vstack([data_1, data_0]))
+    return preds[:num_samples] - preds[num_samples:]
+
+
+def get_interventional_data(W):
+    """
+    Returns the data with treatment = 1 and the data with treatment = 0
+
+    :param W: treatment+confounders, the treatment is the first column
+
+    :returns: data with treatment = 1, data with treatment = 0
+    """
     shape = (W.shape[0], 1)
-    ones = np.ones(shape)
-    zeros = np.zeros(shape)
     non_treatment_data = W[:, 1:]  # assume that treatment is one-dimensional.
-    data_0 = np.hstack([zeros, non_treatment_data])  # data with treatment = 1
-    data_1 = np.hstack([ones, non_treatment_data])  # data with treatment = 0
-    return g(data_1) - g(data_0)
+    data_1 = np.hstack([np.ones(shape), non_treatment_data])  # data with treatment = 1
+    data_0 = np.hstack([np.zeros(shape), non_treatment_data])  # data with treatment = 0
+    return data_1, data_0
 
 
 def create_polynomial_function(max_degree):
@@ -0,0 +1,112 @@
+import os
+import shutil
+import tempfile
+import weakref
+from typing import Any, Dict, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+
+
+class SharedDataFrame:
+    """Read-only representation of a DataFrame that can be shared with parallel workers without copying.
+
+    The columns and the index are dumped once into a temporary folder and loaded as memory-mapped arrays. Pickling an
+    instance therefore only transfers the location of the file, e.g. when sending tasks to joblib workers, and every
+    worker process maps the same data. Columns with object dtype cannot be memory-mapped and are loaded into memory once
+    per process instead. The temporary folder is removed when the instance is garbage collected in the creating process.
+    """
+
+    def __init__(self, data: pd.DataFrame):
+        """
+        :param data: The DataFrame that should be shared.
+        """
+        self._folder = tempfile.mkdtemp(prefix="dowhy_")
+        self._file = os.path.join(self._folder, "data.joblib")
+        self._columns = list(data.columns)
+        self._dtypes = data.dtypes.to_dict()
+        self.shape = data.shape
+        joblib.dump((data.index, {column: data[column].to_numpy() for column in self._columns}), self._file)
+        self._loaded: Optional[Tuple[pd.Index, Dict[Any, np.ndarray]]] = None
+        weakref.finalize(self, shutil.rmtree, self._folder, True)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_loaded"] = None
+        return state
+
+    def __len__(self):
+        return self.shape[0]
+
+    @property
+    def columns(self):
+        return self._columns
+
+    def column(self, name) -> np.ndarray:
+        """Returns a read-only view of the given column without copying it."""
+        return self._load()[1][name]
+
+    def take(self, indices: np.ndarray) -> pd.DataFrame:
+        """Materializes the rows with the given (positional) indices as a new DataFrame. Only the selected rows are
+        copied. This mirrors pandas.DataFrame.take including the index labels of the rows, i.e. either a DataFrame or a
+        SharedDataFrame can be passed to code that selects rows via take.
+        """
+        index, arrays = self._load()
+        frame = pd.DataFrame(
+            {column: pd.Series(arrays[column][indices]).astype(self._dtypes[column]) for column in self._columns}
+        )
+        frame.index = index.take(indices)
+        return frame
+
+    def to_frame(self) -> pd.DataFrame:
+        """Materializes all rows as a new DataFrame."""
+        return self.take(np.arange(self.shape[0]))
+
+    def view(self) -> pd.DataFrame:
+        """Returns a DataFrame of all rows whose columns are read-only views of the memory-mapped arrays. Nothing is
+        copied, except for columns that cannot be memory-mapped, and joblib only sends the location of the arrays to
+        parallel workers when the returned DataFrame is passed to them. Unlike take, this allows sharing the data with
+        code that expects a DataFrame. The instance needs to be kept alive as long as the returned DataFrame is used.
+        """
+        index, arrays = self._load()
+        return pd.DataFrame(
+            {
+                column: pd.Series(arrays[column], index=index, copy=False).astype(self._dtypes[column], copy=False)
+                for column in self._columns
+            },
+            copy=False,
+        )
+
+    def _load(self) -> Tuple[pd.Index, Dict[Any, np.ndarray]]:
+        if self._loaded is None:
+            self._loaded = joblib.load(self._file, mmap_mode="r")
+        return self._loaded
+
+
+def overlay_columns(data: pd.DataFrame, columns: Dict[Any, Any]) -> pd.DataFrame:
+    """Returns a DataFrame in which the given columns replace or are added to the columns of data, without copying the
+    other columns.
+
+    The untouched columns of the returned DataFrame are read-only views of the columns of data, i.e. an attempt to
+    modify them in place raises an error instead of changing data. Replacing a column of the returned DataFrame (e.g.
+    via ``new_data[name] = values``) or adding one is possible. Compared to ``data.assign(...)``, this only allocates
+    memory for the given columns, which is useful when perturbing one or two columns of a large data set many times.
+
+    :param data: The DataFrame whose columns are shared. Its column names need to be unique.
+    :param columns: The new values of the replaced or added columns by name. The values can be anything that
+                    ``data.assign`` accepts, e.g. arrays with one value per row of data or Series with the same index.
+    :returns: A DataFrame with the columns of data, in the same order, followed by the added columns.
+    """
+    new_columns = {name: columns[name] if name in columns else _read_only_view(data[name]) for name in data.columns}
+    new_columns.update({name: values for name, values in columns.items() if name not in new_columns})
+    return pd.DataFrame(new_columns, index=data.index, copy=False)
+
+
+def _read_only_view(column: pd.Series) -> pd.Series:
+    if not isinstance(column.dtype, np.dtype):
+        # Extension arrays (e.g. categorical columns) are passed on as they are.
+        return column
+    values = column.to_numpy().view()
+    values.flags.writeable = False
+    return pd.Series(values, index=column.index, name=column.name, copy=False)
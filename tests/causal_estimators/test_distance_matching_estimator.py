@@ -0,0 +1,194 @@
+import numpy as np
+import pytest
+from pytest import mark
+from sklearn.neighbors import NearestNeighbors
+
+import dowhy.datasets
+from dowhy import CausalModel
+from dowhy.utils.matching import NeighborGraph
+
+
+@mark.usefixtures("fixed_seed")
+class TestDistanceMatchingEstimator(object):
+    @mark.parametrize("target_units", ["att", "atc", "ate"])
+    def test_average_treatment_effect(self, target_units):
+        data = dowhy.datasets.linear_dataset(beta=10, num_common_causes=2, num_samples=2000, treatment_is_binary=True)
+        model = CausalModel(
+            data=data["df"],
+            treatment=data["treatment_name"],
+            outcome=data["outcome_name"],
+            graph=data["gml_graph"],
+        )
+        identified_estimand = model.identify_effect()
+
+        estimate = model.estimate_effect(
+            identified_estimand,
+            method_name="backdoor.distance_matching",
+            target_units=target_units,
+            method_params={"num_matches_per_unit": 2},
+        )
+
+        assert estimate.value == pytest.approx(data["ate"], rel=0.3)
+
+    def test_matched_indices_refer_to_nearest_control_units(self):
+        data = dowhy.datasets.linear_dataset(beta=10, num_common_causes=2, num_samples=500, treatment_is_binary=True)
+        model = CausalModel(
+            data=data["df"],
+            treatment=data["treatment_name"],
+            outcome=data["outcome_name"],
+            graph=data["gml_graph"],
+        )
+        identified_estimand = model.identify_effect()
+        estimate = model.estimate_effect(
+            identified_estimand,
+            method_name="backdoor.distance_matching",
+            target_units="att",
+            method_params={"num_matches_per_unit": 3},
+        )
+
+        df = data["df"]
+        common_causes = df[data["common_causes_names"]].to_numpy()
+        is_treated = df[data["treatment_name"][0]].to_numpy()
+        control_index = df.index[~is_treated]
+        matched_indices = estimate.estimator.matched_indices_att
+        assert sorted(matched_indices.keys()) == df.index[is_treated].tolist()
+        for treated_index, control_indices in list(matched_indices.items())[:10]:
+            distances = np.linalg.norm(common_causes[~is_treated] - common_causes[treated_index], axis=1)
+            assert sorted(control_indices) == sorted(control_index[np.argsort(distances)[:3]].tolist())
+
+    def test_caliper_limits_the_distance_of_matches(self):
+        data = dowhy.datasets.linear_dataset(beta=10, num_common_causes=2, num_samples=500, treatment_is_binary=True)
+        model = CausalModel(
+            data=data["df"],
+            treatment=data["treatment_name"],
+            outcome=data["outcome_name"],
+            graph=data["gml_graph"],
+        )
+        identified_estimand = model.identify_effect()
+        estimate = model.estimate_effect(
+            identified_estimand,
+            method_name="backdoor.distance_matching",
+            target_units="atc",
+            method_params={"num_matches_per_unit": None, "caliper": 0.5},
+        )
+
+        df = data["df"]
+        common_causes = df[data["common_causes_names"]].to_numpy()
+        for control_index, treated_indices in estimate.estimator.matched_indices_atc.items():
+            distances = np.linalg.norm(common_causes[treated_indices] - common_causes[control_index], axis=1)
+            assert np.all(distances <= 0.5)
+
+    @mark.parametrize("target_units", ["att", "atc", "ate"])
+    def test_exact_matching_only_matches_units_of_the_same_group(self, target_units):
+        data = dowhy.datasets.linear_dataset(beta=10, num_common_causes=2, num_samples=1000, treatment_is_binary=True)
+        df = data["df"]
+        df["group"] = np.random.randint(0, 5, df.shape[0])
+        model = CausalModel(
+            data=df,
+            treatment=data["treatment_name"],
+            outcome=data["outcome_name"],
+            graph=data["gml_graph"],
+        )
+        identified_estimand = model.identify_effect()
+        estimate = model.estimate_effect(
+            identified_estimand,
+            method_name="backdoor.distance_matching",
+            target_units=target_units,
+            method_params={"num_matches_per_unit": 2, "exact_match_cols": ["group"]},
+        )
+
+        assert estimate.value == pytest.approx(data["ate"], rel=0.3)
+        is_treated = df[data["treatment_name"][0]]
+        groups = estimate.exact_match_groups
+        assert groups["num_treated_units"].sum() == is_treated.sum()
+        assert groups["num_control_units"].sum() == (~is_treated).sum()
+        if target_units in ("att", "ate"):
+            for treated_index, control_indices in estimate.estimator.matched_indices_att.items():
+                assert len(control_indices) == 2
+                assert np.all(df.loc[control_indices, "group"] == df.loc[treated_index, "group"])
+        if target_units == "att":
+            assert estimate.value == pytest.approx(
+                np.average(groups["att"], weights=groups["num_matched_treated_units"])
+            )
+        if target_units == "atc":
+            assert estimate.value == pytest.approx(
+                np.average(groups["atc"], weights=groups["num_matched_control_units"])
+            )
+
+    @mark.parametrize("neighbor_search", ["kd_tree", "brute", "approximate"])
+    def test_neighbor_search_methods_find_the_nearest_control_units(self, neighbor_search):
+        data = dowhy.datasets.linear_dataset(beta=10, num_common_causes=5, num_samples=1000, treatment_is_binary=True)
+        model = CausalModel(
+            data=data["df"],
+            treatment=data["treatment_name"],
+            outcome=data["outcome_name"],
+            graph=data["gml_graph"],
+        )
+        identified_estimand = model.identify_effect()
+        estimates = [
+            model.estimate_effect(
+                identified_estimand,
+                method_name="backdoor.distance_matching",
+                target_units="att",
+                method_params={"num_matches_per_unit": 2, "neighbor_search": method},
+            )
+            for method in ["ball_tree", neighbor_search]
+        ]
+
+        matched_indices = [estimate.estimator.matched_indices_att for estimate in estimates]
+        num_equal_matches = sum(
+            len(set(matched_indices[0][index]) & set(matched_indices[1][index])) for index in matched_indices[0]
+        )
+        if neighbor_search == "approximate":
+            assert num_equal_matches >= 0.9 * 2 * len(matched_indices[0])
+            assert estimates[1].value == pytest.approx(estimates[0].value, rel=0.05)
+        else:
+            assert num_equal_matches == 2 * len(matched_indices[0])
+            assert estimates[1].value == pytest.approx(estimates[0].value)
+
+        evaluation = estimates[0].estimator.evaluate_neighbor_search(num_evaluation_units=100)
+        assert evaluation.index.tolist() == ["ball_tree", "kd_tree", "brute", "approximate"]
+        assert np.all(evaluation.loc[["ball_tree", "kd_tree", "brute"], "recall"] == 1)
+        assert evaluation.loc["approximate", "recall"] >= 0.9
+
+    def test_matching_n_jobs_does_not_change_the_matches(self):
+        data = dowhy.datasets.linear_dataset(beta=10, num_common_causes=2, num_samples=500, treatment_is_binary=True)
+        model = CausalModel(
+            data=data["df"],
+            treatment=data["treatment_name"],
+            outcome=data["outcome_name"],
+            graph=data["gml_graph"],
+        )
+        identified_estimand = model.identify_effect()
+        estimates = [
+            model.estimate_effect(
+                identified_estimand,
+                method_name="backdoor.distance_matching",
+                target_units="att",
+                method_params={"num_matches_per_unit": 2, "matching_n_jobs": matching_n_jobs},
+            )
+            for matching_n_jobs in [1, 2]
+        ]
+
+        assert estimates[1].estimator.method_params["matching_n_jobs"] == 2
+        assert estimates[1].estimator.matched_indices_att == estimates[0].estimator.matched_indices_att
+        assert estimates[1].value == pytest.approx(estimates[0].value)
+
+
+@mark.parametrize(["num_features", "graph_params"], [(10, {}), (20, {"beam_width": 64})])
+def test_neighbor_graph_recall_is_close_to_exact_search(num_features, graph_params):
+    random_state = np.random.RandomState(0)
+    reference_features = random_state.normal(size=(3000, num_features))
+    query_features = random_state.normal(size=(500, num_features))
+
+    _, exact_indices = (
+        NearestNeighbors(n_neighbors=5, algorithm="ball_tree").fit(reference_features).kneighbors(query_features)
+    )
+    distances, indices = NeighborGraph(reference_features, random_state=0, **graph_params).kneighbors(query_features, 5)
+
+    recall = np.mean([len(set(found) & set(exact)) for found, exact in zip(indices, exact_indices)]) / 5
+    assert recall >= 0.95
+    np.testing.assert_allclose(
+        distances, np.linalg.norm(query_features[:, np.newaxis] - reference_features[indices], axis=2)
+    )
+    assert np.all(np.diff(distances, axis=1) >= 0)
@@ -1,6 +1,10 @@
+import numpy as np
 import pytest
 from pytest import mark
 
+import dowhy.datasets
+from dowhy import CausalModel
+from dowhy.causal_estimator import CausalEstimator
 from dowhy.causal_estimators.linear_regression_estimator import LinearRegressionEstimator
 
 from .base import TestEstimator
@@ -109,3 +113,59 @@ class TestLinearRegressionEstimator(object):
             ],
             method_params={"num_simulations": 10, "num_null_simulations": 10},
         )
+
+    def test_conditional_effects_equal_group_wise_estimates(self):
+        data = dowhy.datasets.linear_dataset(
+            beta=10, num_common_causes=2, num_samples=1000, num_effect_modifiers=2, treatment_is_binary=True
+        )
+        model = CausalModel(
+            data=data["df"],
+            treatment=data["treatment_name"],
+            outcome=data["outcome_name"],
+            graph=data["gml_graph"],
+        )
+        identified_estimand = model.identify_effect()
+        estimate = model.estimate_effect(
+            identified_estimand,
+            method_name="backdoor.linear_regression",
+            effect_modifiers=data["effect_modifier_names"],
+        )
+        columns = list(estimate.estimator._data.columns)
+
+        conditional_effects = estimate.estimate_conditional_effects(num_quantiles=3)
+        group_wise_effects = CausalEstimator._estimate_conditional_effects(
+            estimate.estimator, estimate.estimator._estimate_effect_fn, num_quantiles=3
+        )
+
+        assert conditional_effects.index.equals(group_wise_effects.index)
+        np.testing.assert_allclose(conditional_effects.to_numpy(), group_wise_effects.to_numpy())
+        assert list(estimate.estimator._data.columns) == columns
+
+    def test_do_on_subset_uses_encoding_of_the_whole_data(self):
+        data = dowhy.datasets.linear_dataset(
+            beta=10,
+            num_common_causes=2,
+            num_discrete_common_causes=1,
+            num_samples=1000,
+            num_effect_modifiers=1,
+            treatment_is_binary=True,
+        )
+        model = CausalModel(
+            data=data["df"],
+            treatment=data["treatment_name"],
+            outcome=data["outcome_name"],
+            graph=data["gml_graph"],
+        )
+        identified_estimand = model.identify_effect()
+        estimate = model.estimate_effect(identified_estimand, method_name="backdoor.linear_regression")
+        estimator = estimate.estimator
+        # A subset in which not all categories of the discrete common cause appear
+        discrete_common_cause = data["df"][data["common_causes_names"][-1]]
+        subset = data["df"][discrete_common_cause == discrete_common_cause.iloc[0]]
+
+        interventional_outcomes = estimator.predict_fn(estimator.model, estimator._build_interventional_features(1))
+
+        assert estimator._build_features() is estimator._build_features()
+        assert estimator.do(1, subset) == pytest.approx(
+            interventional_outcomes[(discrete_common_cause == discrete_common_cause.iloc[0]).to_numpy()].mean()
+        )
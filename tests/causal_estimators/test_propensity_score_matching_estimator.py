@@ -1,6 +1,8 @@
 import pytest
 from pytest import mark
 
+import dowhy.datasets
+from dowhy import CausalModel
 from dowhy.causal_estimators.propensity_score_matching_estimator import PropensityScoreMatchingEstimator
 
 from .base import TestEstimator
@@ -67,3 +69,30 @@ class TestPropensityScoreMatchingEstimator(object):
             ],
             method_params={"num_simulations": 10, "num_null_simulations": 10},
         )
+
+    def test_caliper_excludes_units_without_close_matches(self):
+        data = dowhy.datasets.linear_dataset(beta=10, num_common_causes=2, num_samples=1000, treatment_is_binary=True)
+        model = CausalModel(
+            data=data["df"],
+            treatment=data["treatment_name"],
+            outcome=data["outcome_name"],
+            graph=data["gml_graph"],
+        )
+        identified_estimand = model.identify_effect()
+
+        estimate = model.estimate_effect(identified_estimand, method_name="backdoor.propensity_score_matching")
+        estimate_with_wide_caliper = model.estimate_effect(
+            identified_estimand, method_name="backdoor.propensity_score_matching", method_params={"caliper": 1}
+        )
+        estimate_with_radius_matching = model.estimate_effect(
+            identified_estimand,
+            method_name="backdoor.propensity_score_matching",
+            method_params={"num_matches_per_unit": None, "caliper": 0.01},
+        )
+
+        assert estimate_with_wide_caliper.value == pytest.approx(estimate.value)
+        assert estimate_with_radius_matching.value == pytest.approx(data["ate"], rel=0.3)
+        with pytest.raises(ValueError):
+            model.estimate_effect(
+                identified_estimand, method_name="backdoor.propensity_score_matching", method_params={"caliper": 0}
+            )
@@ -1,6 +1,9 @@
+import numpy as np
 import pytest
 from pytest import mark
 
+import dowhy.datasets
+from dowhy import CausalModel
 from dowhy.causal_estimators.propensity_score_stratification_estimator import PropensityScoreStratificationEstimator
 
 from .base import TestEstimator
@@ -67,3 +70,36 @@ class TestPropensityScoreStratificationEstimator(object):
             ],
             method_params={"num_simulations": 10, "num_null_simulations": 10},
         )
+
+    @mark.parametrize("num_strata", ["auto", 10])
+    def test_strata_statistics_are_consistent_with_the_data(self, num_strata):
+        data = dowhy.datasets.linear_dataset(beta=10, num_common_causes=2, num_samples=2000, treatment_is_binary=True)
+        df = data["df"]
+        model = CausalModel(
+            data=df,
+            treatment=data["treatment_name"],
+            outcome=data["outcome_name"],
+            graph=data["gml_graph"],
+        )
+        estimate = model.estimate_effect(
+            model.identify_effect(),
+            method_name="backdoor.propensity_score_stratification",
+            method_params={"num_strata": num_strata, "clipping_threshold": 10},
+        )
+
+        assert estimate.value == pytest.approx(data["ate"], rel=0.2)
+        assert "dbar" not in df.columns
+        strata = estimate.strata
+        assert np.all(strata[["num_treated_units", "num_control_units"]] > 10)
+        treatment = df[data["treatment_name"][0]]
+        for stratum, statistics in strata.iterrows():
+            units = df[df["strata"] == stratum]
+            is_treated = treatment[units.index]
+            assert statistics["num_treated_units"] == is_treated.sum()
+            assert statistics["num_control_units"] == (~is_treated).sum()
+            assert statistics["effect"] == pytest.approx(
+                units.loc[is_treated, data["outcome_name"]].mean() - units.loc[~is_treated, data["outcome_name"]].mean()
+            )
+        assert estimate.value == pytest.approx(
+            np.average(strata["effect"], weights=strata["num_treated_units"] + strata["num_control_units"])
+        )
@@ -4,6 +4,8 @@ from pytest import mark
 from sklearn.linear_model import LinearRegression
 
 import dowhy.api
+import dowhy.datasets
+from dowhy import CausalModel
 from dowhy.causal_estimators.propensity_score_weighting_estimator import PropensityScoreWeightingEstimator
 
 from .base import TestEstimator
@@ -70,3 +72,33 @@ class TestPropensityScoreWeightingEstimator(object):
             ],
             method_params={"num_simulations": 1, "num_null_simulations": 1},
         )
+
+    @mark.parametrize("target_units", ["ate", "att", "atc"])
+    @mark.parametrize("weighting_scheme", ["ips_weight", "ips_normalized_weight", "ips_stabilized_weight"])
+    def test_weights_are_returned_without_modifying_the_data(self, weighting_scheme, target_units):
+        data = dowhy.datasets.linear_dataset(beta=10, num_common_causes=2, num_samples=1000, treatment_is_binary=True)
+        df = data["df"]
+        model = CausalModel(
+            data=df,
+            treatment=data["treatment_name"],
+            outcome=data["outcome_name"],
+            graph=data["gml_graph"],
+        )
+        columns = df.columns.tolist()
+        estimate = model.estimate_effect(
+            model.identify_effect(),
+            method_name="backdoor.propensity_score_weighting",
+            target_units=target_units,
+            method_params={"weighting_scheme": weighting_scheme},
+        )
+
+        assert df.columns.tolist() == columns
+        treatment = df[data["treatment_name"][0]]
+        outcome = df[data["outcome_name"]]
+        weights = estimate.weights
+        assert weights.index.equals(df.index)
+        assert np.all(weights > 0)
+        assert estimate.value == pytest.approx(
+            np.average(outcome[treatment], weights=weights[treatment])
+            - np.average(outcome[~treatment], weights=weights[~treatment])
+        )
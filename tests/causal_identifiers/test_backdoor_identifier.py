@@ -1,7 +1,11 @@
+import itertools
+
+import networkx as nx
 import pytest
 
 from dowhy.causal_graph import CausalGraph
 from dowhy.causal_identifier import AutoIdentifier, BackdoorAdjustment
+from dowhy.causal_identifier.adjustment_set_search import AdjustmentSetSearch
 from dowhy.causal_identifier.identify_effect import EstimandType
 
 from .base import IdentificationTestGraphSolution, example_graph_solution
@@ -103,3 +107,50 @@ class TestBackdoorIdentification(object):
         ) or all(  # No adjustments exist and that's expected.
             [set(expected_set) in backdoor_sets for expected_set in expected_sets]
         )
+
+    def test_adjustment_set_search_lists_all_separating_sets(
+        self, example_graph_solution: IdentificationTestGraphSolution
+    ):
+        graph = example_graph_solution.graph
+        bdoor_graph = graph.do_surgery(["X"], remove_outgoing_edges=True)
+        eligible_variables = sorted(
+            graph.get_all_nodes(include_unobserved=True) - {"X", "Y"} - graph.get_descendants(["X"])
+        )
+        search = AdjustmentSetSearch(bdoor_graph, ["X"], ["Y"], eligible_variables)
+
+        for size in range(1, len(eligible_variables) + 1):
+            expected_sets = [
+                candidate_set
+                for candidate_set in itertools.combinations(eligible_variables, size)
+                if nx.d_separated(bdoor_graph, {"X"}, {"Y"}, set(candidate_set))
+            ]
+            assert sorted(search.iter_adjustment_sets(size)) == expected_sets
+
+    def test_identify_backdoor_minimal_adjustment_with_many_confounders(self):
+        num_confounders = 40
+        confounders = [f"W{i}" for i in range(num_confounders)]
+        instruments = [f"Z{i}" for i in range(num_confounders)]
+        nodes = ["X", "Y"] + confounders + instruments
+        edges = (
+            [("X", "Y")]
+            + [(confounder, node) for confounder in confounders for node in ["X", "Y"]]
+            + [(instrument, "X") for instrument in instruments]
+        )
+        graph_str = (
+            "graph[directed 1 "
+            + " ".join(f'node[id "{node}" label "{node}"]' for node in nodes)
+            + " "
+            + " ".join(f'edge[source "{source}" target "{target}"]' for source, target in edges)
+            + "]"
+        )
+        graph = CausalGraph("X", "Y", graph_str, observed_node_names=nodes)
+        identifier = AutoIdentifier(
+            estimand_type=EstimandType.NONPARAMETRIC_ATE,
+            backdoor_adjustment=BackdoorAdjustment.BACKDOOR_MIN,
+        )
+
+        backdoor_results = identifier.identify_backdoor(graph, "X", "Y", include_unobserved=False)
+
+        assert [set(backdoor_result_dict["backdoor_set"]) for backdoor_result_dict in backdoor_results] == [
+            set(confounders)
+        ]
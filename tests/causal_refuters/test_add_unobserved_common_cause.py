@@ -1,16 +1,20 @@
 from unittest.mock import patch
 
 import numpy as np
+import pandas as pd
 import pytest
 import statsmodels.api as sm
 from pytest import mark
 from sklearn.ensemble import GradientBoostingRegressor
-from sklearn.linear_model import LassoCV
+from sklearn.linear_model import LassoCV, LinearRegression, LogisticRegression
 from sklearn.preprocessing import PolynomialFeatures
 
 import dowhy.datasets
 from dowhy import CausalModel
+from dowhy.causal_refuters.add_unobserved_common_cause import include_simulated_confounder
 from dowhy.causal_refuters.evalue_sensitivity_analyzer import EValueSensitivityAnalyzer
+from dowhy.causal_refuters.non_parametric_sensitivity_analyzer import NonParametricSensitivityAnalyzer
+from dowhy.causal_refuters.reisz import PluginReisz, reisz_scoring
 
 from .base import TestRefuter
 
@@ -123,6 +127,98 @@ class TestAddUnobservedCommonCauseRefuter(object):
         refuter_tester.continuous_treatment_testsuite(tests_to_run="atleast-one-common-cause")
         assert mock_fig.call_count > 0  # we patched figure plotting call to avoid drawing plots during tests
 
+    def test_direct_simulation_grid_is_reproducible_with_parallel_jobs(self):
+        data = dowhy.datasets.linear_dataset(beta=1, num_common_causes=2, num_samples=500)
+        original_df = data["df"].copy()
+        model = CausalModel(
+            data=data["df"], treatment=data["treatment_name"], outcome=data["outcome_name"], graph=data["gml_graph"]
+        )
+        identified_estimand = model.identify_effect()
+        estimate = model.estimate_effect(identified_estimand, method_name="backdoor.linear_regression")
+
+        refutations = [
+            model.refute_estimate(
+                identified_estimand,
+                estimate,
+                method_name="add_unobserved_common_cause",
+                confounders_effect_on_treatment="linear",
+                confounders_effect_on_outcome="linear",
+                effect_strength_on_treatment=np.linspace(0, 3, 4),
+                effect_strength_on_outcome=np.linspace(0, 10, 3),
+                plotmethod=None,
+                random_state=0,
+                n_jobs=n_jobs,
+            )
+            for n_jobs in [1, 2]
+        ]
+
+        assert refutations[0].new_effect_array.shape == (4, 3)
+        np.testing.assert_allclose(refutations[0].new_effect_array, refutations[1].new_effect_array)
+        # Without any effect of the simulated confounder, the estimate does not change
+        assert refutations[0].new_effect_array[0, 0] == pytest.approx(estimate.value)
+        assert data["df"].equals(original_df)
+
+    def test_direct_simulation_grid_is_refined_near_zero_effect(self):
+        data = dowhy.datasets.linear_dataset(beta=1, num_common_causes=2, num_samples=500)
+        model = CausalModel(
+            data=data["df"], treatment=data["treatment_name"], outcome=data["outcome_name"], graph=data["gml_graph"]
+        )
+        identified_estimand = model.identify_effect()
+        estimate = model.estimate_effect(identified_estimand, method_name="backdoor.linear_regression")
+        kappa_t = np.linspace(0, 3, 4)
+        kappa_y = np.linspace(0, 10, 4)
+
+        refute = model.refute_estimate(
+            identified_estimand,
+            estimate,
+            method_name="add_unobserved_common_cause",
+            confounders_effect_on_treatment="linear",
+            confounders_effect_on_outcome="linear",
+            effect_strength_on_treatment=kappa_t,
+            effect_strength_on_outcome=kappa_y,
+            plotmethod=None,
+            random_state=0,
+            num_grid_refinements=2,
+        )
+
+        refined_grid = refute.refined_grid.set_index(["kappa_t", "kappa_y"])["new_effect"]
+        grid_effects = refined_grid.loc[[(t, y) for t in kappa_t for y in kappa_y]].to_numpy().reshape(4, 4)
+        np.testing.assert_allclose(grid_effects, refute.new_effect_array)
+        new_points = refined_grid.index.difference(pd.MultiIndex.from_product([kappa_t, kappa_y]))
+        assert len(new_points) > 0
+        # New points are only evaluated in the cells of the grid whose corners have effects of both signs
+        for t, y in new_points:
+            cells_containing_point = [
+                refute.new_effect_array[i : i + 2, j : j + 2]
+                for i in range(len(kappa_t) - 1)
+                for j in range(len(kappa_y) - 1)
+                if kappa_t[i] <= t <= kappa_t[i + 1] and kappa_y[j] <= y <= kappa_y[j + 1]
+            ]
+            assert any(corners.min() <= 0 <= corners.max() for corners in cells_containing_point)
+
+    def test_simulated_confounder_is_debiased_and_reproducible(self):
+        data = dowhy.datasets.linear_dataset(beta=10, num_common_causes=3, num_samples=2000, treatment_is_binary=True)
+        simulated_confounders = [
+            include_simulated_confounder(
+                data["df"],
+                data["treatment_name"],
+                [data["outcome_name"]],
+                None,
+                None,
+                data["common_causes_names"],
+                random_state=0,
+            )
+            for _ in range(2)
+        ]
+
+        assert isinstance(simulated_confounders[0], np.ndarray)
+        assert simulated_confounders[0].shape == (2000,)
+        np.testing.assert_array_equal(simulated_confounders[0], simulated_confounders[1])
+        # The simulated confounder is the residual of a regression on the observed common causes
+        np.testing.assert_allclose(
+            data["df"][data["common_causes_names"]].to_numpy().T @ simulated_confounders[0], 0, atol=1e-8
+        )
+
     @pytest.mark.parametrize(
         ["estimator_method", "effect_fraction_on_treatment", "benchmark_common_causes", "simulation_method"],
         [
@@ -233,6 +329,52 @@ class TestAddUnobservedCommonCauseRefuter(object):
         assert abs(original_estimate - estimate1) > abs(original_estimate - estimate2)
         assert mock_fig.call_count > 0  # we patched figure plotting call to avoid drawing plots during tests
 
+    def test_linear_sensitivity_grid_matches_bias_adjusted_values(self):
+        np.random.seed(100)
+        data = dowhy.datasets.linear_dataset(beta=10, num_common_causes=3, num_samples=500, stddev_treatment_noise=10)
+        model = CausalModel(
+            data=data["df"],
+            treatment=data["treatment_name"],
+            outcome=data["outcome_name"],
+            graph=data["gml_graph"],
+            test_significance=None,
+        )
+        target_estimand = model.identify_effect(proceed_when_unidentifiable=True)
+        estimate = model.estimate_effect(target_estimand, method_name="backdoor.linear_regression")
+        refute = model.refute_estimate(
+            target_estimand,
+            estimate,
+            method_name="add_unobserved_common_cause",
+            simulation_method="linear-partial-R2",
+            benchmark_common_causes=["W2"],
+            effect_fraction_on_treatment=[1, 2],
+            plot_estimate=False,
+        )
+
+        r2tu_w = np.array([0.0, 0.1, 0.3, 0.6])
+        r2yu_tw = np.array([0.05, 0.2, 0.5])
+        grid = refute.get_sensitivity_grid(r2tu_w, r2yu_tw)
+
+        # One row per r2yu_tw (y - axis) and one column per r2tu_w (x - axis)
+        assert grid["bias_adjusted_estimate"].shape == (3, 4)
+        for i, y in enumerate(r2yu_tw):
+            for j, x in enumerate(r2tu_w):
+                results = refute.compute_bias_adjusted(r2tu_w=x, r2yu_tw=y)
+                for key in [
+                    "bias_adjusted_estimate",
+                    "bias_adjusted_se",
+                    "bias_adjusted_t",
+                    "bias_adjusted_lower_CI",
+                    "bias_adjusted_upper_CI",
+                ]:
+                    assert grid[key][i, j] == pytest.approx(results[key])
+
+        # contour(x, y, z) expects z in the same orientation for estimates and t-values
+        estimate_contours, _, _ = refute.plot_estimate(r2tu_w, r2yu_tw)
+        t_contours, _, _ = refute.plot_t(r2tu_w, r2yu_tw)
+        np.testing.assert_allclose(estimate_contours, grid["bias_adjusted_estimate"])
+        np.testing.assert_allclose(t_contours, grid["bias_adjusted_t"])
+
     @mark.parametrize(
         [
             "estimator_method",
@@ -535,6 +677,38 @@ class TestAddUnobservedCommonCauseRefuter(object):
         assert analyzer._observed_covariate_e_value(0.8, 0.9).round(3) == 1.5
         assert analyzer._observed_covariate_e_value(0.9, 0.8).round(3) == 1.5
 
+    def test_evalues_of_many_estimates_match_single_estimates(self):
+        data = dowhy.datasets.linear_dataset(
+            beta=10, num_common_causes=4, num_samples=1000, treatment_is_binary=True, stddev_outcome_noise=5
+        )
+        df = data["df"]
+        df["W0"] = pd.cut(df["W0"], 3, labels=["low", "medium", "high"]).astype(str)
+        model = CausalModel(
+            data=df, treatment=data["treatment_name"], outcome=data["outcome_name"], graph=data["gml_graph"]
+        )
+        identified_estimand = model.identify_effect()
+        estimate = model.estimate_effect(identified_estimand, method_name="backdoor.linear_regression")
+        analyzer = EValueSensitivityAnalyzer(
+            estimate, identified_estimand, df, data["treatment_name"], data["outcome_name"]
+        )
+
+        coef_ests = np.array([-2.0, -0.1, 0.0, 0.3, 5.0])
+        coef_ses = np.array([0.5, 0.2, 0.1, 0.2, 1.0])
+        evalues = analyzer.get_evalues(coef_ests, coef_ses)
+        for i in range(len(coef_ests)):
+            stats = analyzer.get_evalue(coef_ests[i], coef_ses[i])
+            for key, value in stats.items():
+                if value is None:
+                    assert np.isnan(evalues[key].iloc[i])
+                else:
+                    assert evalues[key].iloc[i] == pytest.approx(value)
+
+        # The estimates without each covariate computed from the full model equal the re-fitted ones
+        backdoor_vars = identified_estimand.get_backdoor_variables()
+        from_full_model = analyzer._estimate_without_covariates_from_full_model(backdoor_vars)
+        refitted = [analyzer._estimate_without_covariate(backdoor_vars, drop_var) for drop_var in backdoor_vars]
+        np.testing.assert_allclose(from_full_model, refitted, rtol=1e-8)
+
     @pytest.mark.parametrize(
         "estimator_method",
         [
@@ -589,3 +763,84 @@ class TestAddUnobservedCommonCauseRefuter(object):
         assert refute.stats["evalue_upper_ci"] is None
         assert refute.stats["evalue_lower_ci"] < refute.stats["evalue_estimate"]
         assert mock_fig.call_count > 0
+
+    def test_non_parametric_sensitivity_reuses_nuisance_models(self):
+        data = dowhy.datasets.linear_dataset(
+            beta=10, num_common_causes=4, num_samples=500, treatment_is_binary=True, stddev_outcome_noise=5
+        )
+        df = data["df"]
+        common_causes = ["W0", "W1", "W2", "W3"]
+
+        def get_analyzer(n_jobs):
+            return NonParametricSensitivityAnalyzer(
+                observed_common_causes=df[common_causes],
+                treatment=df[data["treatment_name"]],
+                outcome=df[data["outcome_name"]],
+                g_s_estimator_list=[LinearRegression()],
+                g_s_estimator_param_list=[{"fit_intercept": [True]}],
+                alpha_s_estimator_list=[LogisticRegression()],
+                alpha_s_estimator_param_list=[{"C": [1]}],
+                benchmark_common_causes=["W3"],
+                frac_strength_treatment=1,
+                frac_strength_outcome=1,
+                theta_s=10,
+                plugin_reisz=True,
+                n_jobs=n_jobs,
+            )
+
+        analyzer = get_analyzer(n_jobs=1).check_sensitivity(plot=False)
+        results = analyzer.results.copy()
+        # The nuisance models are not selected nor fitted again
+        with patch(
+            "dowhy.causal_refuters.partial_linear_sensitivity_analyzer._fit_predict_fold",
+            side_effect=AssertionError("nuisance model fitted again"),
+        ):
+            analyzer.check_sensitivity(plot=False)
+        pd.testing.assert_frame_equal(analyzer.results, results)
+
+        parallel_analyzer = get_analyzer(n_jobs=2).check_sensitivity(plot=False)
+        pd.testing.assert_frame_equal(parallel_analyzer.results, results)
+
+    def test_plugin_reisz_matches_the_inverse_propensity_weights(self):
+        W = np.random.normal(size=(200, 2))
+        t = (W[:, 0] + np.random.normal(size=200) > 0).astype(int)
+        X = np.column_stack([t, W])
+        reisz_fn = PluginReisz(LogisticRegression()).fit(X)
+
+        propensities = reisz_fn.propensity(X)
+        expected_weights = np.where(t == 1, 1 / propensities, -1 / (1 - propensities))
+        np.testing.assert_allclose(reisz_fn.predict(X), expected_weights)
+        expected_loss = np.mean(2 * (1 / propensities + 1 / (1 - propensities)) - expected_weights**2)
+        assert reisz_scoring(reisz_fn, X) == pytest.approx(expected_loss)
+
+    def test_non_parametric_sensitivity_grid_matches_benchmarking(self):
+        data = dowhy.datasets.linear_dataset(
+            beta=10, num_common_causes=3, num_samples=300, treatment_is_binary=True, stddev_outcome_noise=5
+        )
+        df = data["df"]
+        analyzer = NonParametricSensitivityAnalyzer(
+            observed_common_causes=df[["W0", "W1", "W2"]],
+            treatment=df[data["treatment_name"]],
+            outcome=df[data["outcome_name"]],
+            g_s_estimator_list=[LinearRegression()],
+            g_s_estimator_param_list=[{"fit_intercept": [True]}],
+            alpha_s_estimator_list=[LogisticRegression()],
+            alpha_s_estimator_param_list=[{"C": [1]}],
+            effect_strength_treatment=0.1,
+            effect_strength_outcome=0.1,
+            theta_s=10,
+            plugin_reisz=True,
+        ).check_sensitivity(plot=False)
+
+        r2tu_w = np.linspace(0, 0.9, 4)
+        r2yu_tw = np.linspace(0, 0.9, 3)
+        grid = analyzer.get_sensitivity_grid(r2tu_w, r2yu_tw)
+
+        assert grid["lower_confidence_bound"].shape == (3, 4)
+        for i, y in enumerate(r2yu_tw):
+            for j, x in enumerate(r2tu_w):
+                results = analyzer.perform_benchmarking(
+                    r2yu_tw=y, r2tu_w=x, significance_level=analyzer.significance_level, is_partial_linear=False
+                )
+                for key in ["bias", "lower_ate_bound", "upper_ate_bound", "lower_confidence_bound"]:
+                    assert grid[key][i, j] == pytest.approx(results[key])
@@ -1,6 +1,19 @@
+import itertools
+from unittest.mock import patch
+
 import numpy as np
+import pandas as pd
+import pytest
 from pytest import mark
 
+import dowhy.datasets
+from dowhy import CausalModel
+from dowhy.causal_refuters.data_subset_refuter import (
+    SIMULATIONS_PER_CONVERGENCE_CHECK,
+    _generate_subset_indices,
+    refute_data_subset,
+)
+
 from .base import TestRefuter
 
 
@@ -15,3 +28,61 @@ class TestDataSubsetRefuter(object):
     def test_refutation_data_subset_refuter_binary(self, error_tolerance, estimator_method):
         refuter_tester = TestRefuter(error_tolerance, estimator_method, "data_subset_refuter")
         refuter_tester.binary_treatment_testsuite(tests_to_run="atleast-one-common-cause")
+
+
+@mark.parametrize("shuffle_rows", [False, True])
+@mark.parametrize("stratify_by_treatment", [False, True])
+def test_refute_data_subset_is_reproducible_with_parallel_jobs(stratify_by_treatment, shuffle_rows):
+    data = dowhy.datasets.linear_dataset(beta=10, num_common_causes=2, num_samples=500, treatment_is_binary=True)
+    df = data["df"].sample(frac=1, random_state=0) if shuffle_rows else data["df"]
+    model = CausalModel(
+        data=df, treatment=data["treatment_name"], outcome=data["outcome_name"], graph=data["gml_graph"]
+    )
+    identified_estimand = model.identify_effect()
+    estimate = model.estimate_effect(identified_estimand, method_name="backdoor.linear_regression")
+
+    refutations = [
+        refute_data_subset(
+            df,
+            identified_estimand,
+            estimate,
+            num_simulations=6,
+            random_state=0,
+            stratify_by_treatment=stratify_by_treatment,
+            n_jobs=n_jobs,
+        )
+        for n_jobs in [1, 2]
+    ]
+
+    assert refutations[0].new_effect == pytest.approx(refutations[1].new_effect)
+    assert refutations[0].new_effect == pytest.approx(estimate.value, rel=0.1)
+
+
+def test_stratified_subsets_keep_the_fraction_of_each_treatment_value():
+    df = pd.DataFrame({"v0": [True] * 30 + [False] * 70, "y": np.arange(100)})
+
+    subset_indices = _generate_subset_indices(df, ["v0"], 0.8, 5, True, np.random.RandomState(0))
+
+    assert subset_indices.shape == (5, 80)
+    assert (df["v0"].to_numpy()[subset_indices].sum(axis=1) == 24).all()
+    assert all(len(np.unique(indices)) == 80 for indices in subset_indices)
+
+
+def test_refute_data_subset_stops_once_the_variance_converges():
+    data = dowhy.datasets.linear_dataset(beta=10, num_common_causes=2, num_samples=500, treatment_is_binary=True)
+    model = CausalModel(
+        data=data["df"], treatment=data["treatment_name"], outcome=data["outcome_name"], graph=data["gml_graph"]
+    )
+    identified_estimand = model.identify_effect()
+    estimate = model.estimate_effect(identified_estimand, method_name="backdoor.linear_regression")
+
+    with patch(
+        "dowhy.causal_refuters.data_subset_refuter._refute_once", side_effect=itertools.cycle([9.0, 11.0])
+    ) as refute_once:
+        refute = refute_data_subset(
+            data["df"], identified_estimand, estimate, num_simulations=100, convergence_threshold=0.05
+        )
+
+    # The standard deviation of the estimates changes by less than 3% after the second batch
+    assert refute_once.call_count == 2 * SIMULATIONS_PER_CONVERGENCE_CHECK
+    assert refute.new_effect == pytest.approx(10.0)
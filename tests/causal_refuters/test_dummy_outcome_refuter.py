@@ -1,9 +1,15 @@
 import pdb
+from unittest.mock import patch
 
 import numpy as np
 import pytest
 from pytest import mark
 
+import dowhy.datasets
+from dowhy import CausalModel
+from dowhy.causal_estimator import CausalEstimator
+from dowhy.causal_estimators.linear_regression_estimator import LinearRegressionEstimator
+
 from .base import TestRefuter
 
 
@@ -327,3 +333,75 @@ class TestDummyOutcomeRefuter(object):
             error_tolerence, estimator_method, "dummy_outcome_refuter", transformations=transformations
         )
         refuter_tester.binary_treatment_testsuite(num_samples=num_samples, tests_to_run="atleast-one-common-cause")
+
+    @mark.parametrize(
+        "transformations",
+        [[("zero", ""), ("noise", {"std_dev": 1})], [("linear_regression", {}), ("permute", {"permute_fraction": 1})]],
+    )
+    def test_refutation_dummy_outcome_refuter_is_reproducible_with_n_jobs(self, transformations):
+        data = dowhy.datasets.linear_dataset(beta=10, num_common_causes=2, num_samples=300, treatment_is_binary=True)
+        model = CausalModel(
+            data=data["df"], treatment=data["treatment_name"], outcome=data["outcome_name"], graph=data["gml_graph"]
+        )
+        identified_estimand = model.identify_effect()
+        estimate = model.estimate_effect(identified_estimand, method_name="backdoor.linear_regression")
+
+        refutations = [
+            model.refute_estimate(
+                identified_estimand,
+                estimate,
+                method_name="dummy_outcome_refuter",
+                transformation_list=transformations,
+                num_simulations=12,
+                random_state=0,
+                n_jobs=n_jobs,
+            )
+            for n_jobs in [1, 2]
+        ]
+
+        assert [refute.new_effect for refute in refutations[0]] == [refute.new_effect for refute in refutations[1]]
+        assert all(abs(refute.new_effect - refute.estimated_effect) < 1 for refute in refutations[0])
+
+    def test_refutation_dummy_outcome_refuter_keeps_treatment_values_of_estimators_without_outcome_refit(self):
+        data = dowhy.datasets.linear_dataset(beta=10, num_common_causes=2, num_samples=300)
+        model = CausalModel(
+            data=data["df"], treatment=data["treatment_name"], outcome=data["outcome_name"], graph=data["gml_graph"]
+        )
+        identified_estimand = model.identify_effect()
+        estimate = model.estimate_effect(
+            identified_estimand, method_name="backdoor.linear_regression", control_value=1, treatment_value=3
+        )
+
+        # The default refit builds a new estimator, which needs to use the same treatment and control values
+        with patch.object(
+            LinearRegressionEstimator, "_estimate_effect_with_outcome", CausalEstimator._estimate_effect_with_outcome
+        ):
+            refutations = model.refute_estimate(
+                identified_estimand,
+                estimate,
+                method_name="dummy_outcome_refuter",
+                transformation_list=[("permute", {"permute_fraction": 0})],
+                num_simulations=2,
+            )
+
+        assert refutations[0].new_effect == pytest.approx(estimate.value)
+
+    def test_refutation_dummy_outcome_refuter_does_not_cache_estimators_of_random_training_sets(self):
+        data = dowhy.datasets.linear_dataset(beta=10, num_common_causes=2, num_samples=300, treatment_is_binary=True)
+        model = CausalModel(
+            data=data["df"], treatment=data["treatment_name"], outcome=data["outcome_name"], graph=data["gml_graph"]
+        )
+        identified_estimand = model.identify_effect()
+        estimate = model.estimate_effect(identified_estimand, method_name="backdoor.linear_regression")
+
+        # With the default test fraction, the training data differs between simulations and is never worth hashing
+        with patch("dowhy.causal_refuters.dummy_outcome_refuter.joblib.hash") as mock_hash:
+            model.refute_estimate(
+                identified_estimand,
+                estimate,
+                method_name="dummy_outcome_refuter",
+                transformation_list=[("linear_regression", {}), ("permute", {"permute_fraction": 1})],
+                num_simulations=2,
+            )
+
+        mock_hash.assert_not_called()
@@ -0,0 +1,37 @@
+import pytest
+
+import dowhy.datasets
+from dowhy import CausalModel
+from dowhy.causal_refuters import refute_data_subset, refute_dummy_outcome, refute_placebo_treatment, refute_suite
+
+
+@pytest.mark.usefixtures("fixed_seed")
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_refute_suite_returns_the_refutations_of_all_refuters(n_jobs):
+    data = dowhy.datasets.linear_dataset(beta=10, num_common_causes=3, num_samples=500, treatment_is_binary=True)
+    original_df = data["df"].copy()
+    model = CausalModel(
+        data=data["df"], treatment=data["treatment_name"], outcome=data["outcome_name"], graph=data["gml_graph"]
+    )
+    identified_estimand = model.identify_effect()
+    estimate = model.estimate_effect(identified_estimand, method_name="backdoor.linear_regression")
+
+    refutations = refute_suite(
+        data["df"],
+        identified_estimand,
+        estimate,
+        refuters=[refute_data_subset, refute_placebo_treatment, refute_dummy_outcome],
+        num_simulations=5,
+        random_state=0,
+        n_jobs=n_jobs,
+    )
+
+    assert [refutation.refutation_type for refutation in refutations] == [
+        "Refute: Use a subset of data",
+        "Refute: Use a Placebo Treatment",
+        "Refute: Use a Dummy Outcome",
+    ]
+    assert refutations[0].new_effect == pytest.approx(estimate.value, rel=0.1)
+    assert abs(refutations[1].new_effect) < 1
+    assert abs(refutations[2].new_effect) < 1
+    assert data["df"].equals(original_df)
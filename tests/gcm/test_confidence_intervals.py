@@ -16,3 +16,59 @@ def test_given_simple_counter_as_estimation_func_when_confidence_interval_then_r
 
     assert median["X"] == pytest.approx(10.5)
     assert np.allclose(interval["X"], [1.95, 19.05])
+
+
+def test_given_checkpoint_file_when_confidence_interval_then_resumes_from_completed_resamples(tmp_path):
+    checkpoint_file = str(tmp_path / "checkpoint.pkl")
+    num_calls = 0
+
+    def interrupted_counter():
+        nonlocal num_calls
+        num_calls += 1
+        if num_calls > 10:
+            raise RuntimeError("Interrupted!")
+        return {"X": float(num_calls)}
+
+    with pytest.raises(RuntimeError):
+        confidence_intervals(
+            interrupted_counter, num_bootstrap_resamples=20, checkpoint_file=checkpoint_file, batch_size=5
+        )
+
+    def counter():
+        nonlocal num_calls
+        num_calls += 1
+        return {"X": float(num_calls - 1)}
+
+    median, interval = confidence_intervals(
+        counter, num_bootstrap_resamples=20, checkpoint_file=checkpoint_file, batch_size=5
+    )
+
+    # 10 results were completed before the interruption, only the remaining 10 should be evaluated.
+    assert num_calls == 21
+    assert median["X"] == pytest.approx(10.5)
+    assert np.allclose(interval["X"], [1.95, 19.05])
+
+
+def test_given_checkpoint_file_with_different_number_of_resamples_when_confidence_interval_then_raises_error(tmp_path):
+    checkpoint_file = str(tmp_path / "checkpoint.pkl")
+    confidence_intervals(lambda: np.array([1.0]), num_bootstrap_resamples=5, checkpoint_file=checkpoint_file)
+
+    with pytest.raises(ValueError):
+        confidence_intervals(lambda: np.array([1.0]), num_bootstrap_resamples=10, checkpoint_file=checkpoint_file)
+
+
+def test_given_convergence_threshold_when_confidence_interval_then_stops_early():
+    num_calls = 0
+
+    def constant():
+        nonlocal num_calls
+        num_calls += 1
+        return np.array([1.0, 2.0])
+
+    median, interval = confidence_intervals(
+        constant, num_bootstrap_resamples=100, convergence_threshold=0.01, batch_size=10
+    )
+
+    assert num_calls == 20
+    assert median == pytest.approx([1.0, 2.0])
+    assert np.allclose(interval, [[1.0, 1.0], [2.0, 2.0]])
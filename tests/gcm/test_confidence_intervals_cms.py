@@ -41,6 +41,33 @@ def test_given_causal_graph_based_estimation_func_when_confidence_interval_then_
     assert np.allclose(interval, [1.0, 6.0], atol=2.0)
 
 
+@flaky(max_runs=2)
+def test_given_memory_mapped_training_data_when_confidence_interval_then_can_use_fit_and_compute():
+    def draw_single_sample(causal_graph, variable):
+        return draw_samples(causal_graph, 1)[variable][0]
+
+    causal_model = ProbabilisticCausalModel(nx.DiGraph([("X", "Y")]))
+    causal_model.set_causal_mechanism("X", EmpiricalDistribution())
+    causal_model.set_causal_mechanism("Y", AdditiveNoiseModel(create_hist_gradient_boost_regressor()))
+
+    median, interval = confidence_intervals(
+        fit_and_compute(
+            draw_single_sample,
+            causal_model,
+            bootstrap_training_data=pd.DataFrame(
+                {"X": [1, 3, 4, 4, 1, 3, 6, 3, 3, 6, 3, 4], "Y": [4, 5, 4, 4, 4, 5, 3, 6, 5, 3, 6, 4]}
+            ),
+            bootstrap_data_subset_size_fraction=0.5,
+            memory_map_training_data=True,
+            variable="X",
+        ),
+        n_jobs=2,
+    )
+
+    assert median == pytest.approx(4.0, abs=1.1)
+    assert np.allclose(interval, [1.0, 6.0], atol=2.0)
+
+
 def test_given_parameterized_estimation_func_when_confidence_interval_then_can_use_bootstrap_sampling_to_bind_parameters():
     i = 0.0
 
@@ -4,7 +4,12 @@ from flaky import flaky
 from pytest import approx
 from scipy import stats
 
-from dowhy.gcm import BayesianGaussianMixtureDistribution, EmpiricalDistribution, ScipyDistribution
+from dowhy.gcm import (
+    BayesianGaussianMixtureDistribution,
+    CompactEmpiricalDistribution,
+    EmpiricalDistribution,
+    ScipyDistribution,
+)
 
 
 def test_bayesian_gaussian_mixture_distribution():
@@ -15,6 +20,19 @@ def test_bayesian_gaussian_mixture_distribution():
     assert approximated_data_distribution_model.draw_samples(5).shape == (5, 2)
 
 
+def test_given_large_data_when_fit_bayesian_gaussian_mixture_distribution_then_selects_components_on_subset():
+    X = np.vstack([np.random.normal(-5, 0.5, (5000, 1)), np.random.normal(5, 0.5, (5000, 1))])
+
+    approximated_data_distribution_model = BayesianGaussianMixtureDistribution(
+        max_num_samples_for_selection=1000, mini_batch_threshold=500
+    )
+    approximated_data_distribution_model.fit(X)
+
+    assert approximated_data_distribution_model.num_components == 2
+    assert approximated_data_distribution_model.component_selection_time_in_seconds > 0
+    assert approximated_data_distribution_model.draw_samples(5).shape == (5, 1)
+
+
 def test_bayesian_gaussian_mixture_distribution_runtime_error():
     approximated_data_distribution_model = BayesianGaussianMixtureDistribution()
     with pytest.raises(RuntimeError):
@@ -62,6 +80,67 @@ def test_empirical_distribution():
         assert val in X
 
 
+def test_given_discrete_data_when_fit_compact_empirical_distribution_then_stores_value_table():
+    X = np.random.choice([1, 2, 3], 10000, p=[0.5, 0.3, 0.2])
+
+    distribution = CompactEmpiricalDistribution()
+    distribution.fit(X)
+
+    assert distribution.values.reshape(-1).tolist() == [1, 2, 3]
+    assert np.sum(distribution.counts) == 10000
+    assert distribution.memory_size_in_bytes < X.nbytes
+
+    samples = distribution.draw_samples(10000)
+    assert samples.shape == (10000, 1)
+    assert np.mean(samples == 1) == approx(0.5, abs=0.05)
+    assert np.mean(samples == 2) == approx(0.3, abs=0.05)
+    assert np.mean(samples == 3) == approx(0.2, abs=0.05)
+
+
+def test_given_categorical_data_when_fit_compact_empirical_distribution_then_draws_observed_rows():
+    X = np.array([["a", "x"], ["b", "y"], ["a", "x"]], dtype=object)
+
+    distribution = CompactEmpiricalDistribution()
+    distribution.fit(X)
+
+    assert distribution.values.shape == (2, 2)
+    for row in distribution.draw_samples(100):
+        assert row.tolist() in [["a", "x"], ["b", "y"]]
+
+
+@flaky(max_runs=3)
+def test_given_continuous_data_when_fit_compact_empirical_distribution_then_uses_quantile_grid():
+    X = np.random.normal(0, 1, 100000)
+
+    distribution = CompactEmpiricalDistribution(max_num_unique_values=100, num_quantiles=500)
+    distribution.fit(X)
+
+    assert distribution.values is None
+    assert distribution.quantiles.shape == (500,)
+    assert distribution.memory_size_in_bytes == 500 * 8
+
+    samples = distribution.draw_samples(10000)
+    assert np.mean(samples) == approx(0, abs=0.1)
+    assert np.std(samples) == approx(1, abs=0.1)
+
+
+def test_given_reservoir_size_when_fit_compact_empirical_distribution_then_draws_observed_values():
+    X = np.random.normal(0, 1, (1000, 2))
+
+    distribution = CompactEmpiricalDistribution(max_num_unique_values=100, reservoir_size=50)
+    distribution.fit(X)
+
+    assert distribution.values.shape == (50, 2)
+    X = X.tolist()
+    for row in distribution.draw_samples(100):
+        assert row.tolist() in X
+
+
+def test_compact_empirical_distribution_runtime_error():
+    with pytest.raises(RuntimeError):
+        CompactEmpiricalDistribution().draw_samples(5)
+
+
 @flaky(max_runs=5)
 def test_fitted_parameters_assigned_correctly_using_normal_distribution():
     distribution = ScipyDistribution(stats.norm)
@@ -80,3 +159,26 @@ def test_fitted_parameters_assigned_correctly_using_beta_distribution():
     assert distribution.parameters["scale"] == approx(1, abs=0.1)
     assert distribution.parameters["a"] == approx(2, abs=0.5)
     assert distribution.parameters["b"] == approx(0.5, abs=0.5)
+
+
+@flaky(max_runs=5)
+def test_scipy_fast_auto_select_continuous_parametric_distribution():
+    distribution = ScipyDistribution(fast_auto_selection=True)
+
+    X = np.random.normal(0, 1, 20000)
+    distribution.fit(X)
+
+    assert np.mean(distribution.draw_samples(1000)) == approx(0, abs=0.1)
+    assert np.std(distribution.draw_samples(1000)) == approx(1, abs=0.1)
+    assert distribution.clone()._fast_auto_selection
+
+
+@flaky(max_runs=5)
+def test_given_time_budget_when_fast_search_continuous_distribution_then_returns_fitted_distribution():
+    X = np.random.uniform(2, 5, 10000)
+
+    distribution, parameters = ScipyDistribution.find_suitable_continuous_distribution_fast(
+        X, max_num_samples_for_fitting=1000, num_top_candidates=3, max_time_in_seconds=0, n_jobs=1
+    )
+
+    assert np.mean(distribution.rvs(size=1000, **parameters)) == approx(3.5, abs=0.2)
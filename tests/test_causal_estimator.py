@@ -1,8 +1,15 @@
+import pickle
 import unittest
 
+import numpy as np
+import pandas as pd
 import pytest
+import statsmodels.api as sm
 
+import dowhy.datasets
+from dowhy import CausalModel
 from dowhy.causal_estimator import CausalEstimator
+from dowhy.utils.shared_data import SharedDataFrame
 
 
 class MockEstimator(CausalEstimator):
@@ -19,6 +26,214 @@ def test_causal_estimator_placeholder_methods():
         estimator.construct_symbolic_estimator(None)
 
 
+def test_bootstrap_confidence_intervals_are_reproducible_with_parallel_jobs():
+    data = dowhy.datasets.linear_dataset(
+        beta=10, num_common_causes=2, num_samples=1000, num_effect_modifiers=1, treatment_is_binary=True
+    )
+    model = CausalModel(
+        data=data["df"],
+        treatment=data["treatment_name"],
+        outcome=data["outcome_name"],
+        graph=data["gml_graph"],
+    )
+    identified_estimand = model.identify_effect()
+    estimate = model.estimate_effect(identified_estimand, method_name="backdoor.linear_regression")
+
+    np.random.seed(0)
+    sequential_interval = estimate.get_confidence_intervals(method="bootstrap", num_simulations=10)
+    sequential_std_error = estimate.get_standard_error(method="bootstrap", num_simulations=10)
+
+    estimate.estimator._bootstrap_estimates = None
+    np.random.seed(0)
+    parallel_interval = estimate.get_confidence_intervals(method="bootstrap", num_simulations=10, n_jobs=2)
+    parallel_std_error = estimate.get_standard_error(method="bootstrap", num_simulations=10, n_jobs=2)
+
+    assert sequential_interval == pytest.approx(parallel_interval)
+    assert sequential_std_error == pytest.approx(parallel_std_error)
+    assert sequential_interval[0] <= estimate.value <= sequential_interval[1]
+
+
+def test_shared_data_frame_take_matches_data_frame_take():
+    data = pd.DataFrame(
+        {"w": np.random.normal(size=10), "t": np.arange(10) > 4, "c": pd.Categorical(list("abababcabc"))},
+        index=np.random.permutation(np.arange(10, 20)),
+    )
+    # Bootstrap samples contain duplicate rows
+    indices = np.array([3, 0, 0, 9, 5])
+
+    shared_data = SharedDataFrame(data)
+    # Workers receive a pickled copy that loads the data again
+    worker_data = pickle.loads(pickle.dumps(shared_data))
+
+    pd.testing.assert_frame_equal(shared_data.take(indices), data.take(indices))
+    pd.testing.assert_frame_equal(worker_data.take(indices), data.take(indices))
+    pd.testing.assert_frame_equal(shared_data.to_frame(), data)
+
+
+@pytest.mark.parametrize("method_name", ["backdoor.linear_regression", "backdoor.propensity_score_weighting"])
+@pytest.mark.parametrize("weighted_bootstrap", ["multinomial", "poisson", "bayesian"])
+def test_weighted_bootstrap_standard_error_is_close_to_resampling_bootstrap(method_name, weighted_bootstrap):
+    np.random.seed(0)
+    data = dowhy.datasets.linear_dataset(
+        beta=10, num_common_causes=2, num_samples=2000, num_effect_modifiers=1, treatment_is_binary=True
+    )
+    model = CausalModel(
+        data=data["df"],
+        treatment=data["treatment_name"],
+        outcome=data["outcome_name"],
+        graph=data["gml_graph"],
+    )
+    identified_estimand = model.identify_effect()
+    estimate = model.estimate_effect(identified_estimand, method_name=method_name)
+
+    std_error = estimate.get_standard_error(method="bootstrap", num_simulations=50)
+    weighted_std_error = estimate.get_standard_error(
+        method="bootstrap", num_simulations=50, weighted_bootstrap=weighted_bootstrap
+    )
+    lower_bound, upper_bound = estimate.get_confidence_intervals(
+        method="bootstrap", num_simulations=50, weighted_bootstrap=weighted_bootstrap
+    )
+
+    assert weighted_std_error == pytest.approx(std_error, rel=0.5)
+    assert lower_bound <= estimate.value <= upper_bound
+
+
+@pytest.mark.parametrize("method_name", ["backdoor.linear_regression", "backdoor.propensity_score_weighting"])
+def test_weighted_bootstrap_is_reproducible_with_parallel_jobs(method_name):
+    data = dowhy.datasets.linear_dataset(
+        beta=10, num_common_causes=2, num_samples=500, num_effect_modifiers=1, treatment_is_binary=True
+    )
+    model = CausalModel(
+        data=data["df"],
+        treatment=data["treatment_name"],
+        outcome=data["outcome_name"],
+        graph=data["gml_graph"],
+    )
+    identified_estimand = model.identify_effect()
+    estimate = model.estimate_effect(identified_estimand, method_name=method_name)
+
+    std_errors = []
+    for n_jobs in [1, 2]:
+        estimate.estimator._bootstrap_estimates = None
+        np.random.seed(0)
+        std_errors.append(
+            estimate.get_standard_error(
+                method="bootstrap", num_simulations=10, weighted_bootstrap="poisson", n_jobs=n_jobs
+            )
+        )
+
+    assert std_errors[1] == pytest.approx(std_errors[0])
+
+
+def test_weighted_bootstrap_raises_error_for_unsupported_estimator():
+    data = dowhy.datasets.linear_dataset(beta=10, num_common_causes=2, num_samples=500, treatment_is_binary=True)
+    model = CausalModel(
+        data=data["df"],
+        treatment=data["treatment_name"],
+        outcome=data["outcome_name"],
+        graph=data["gml_graph"],
+    )
+    identified_estimand = model.identify_effect()
+    estimate = model.estimate_effect(identified_estimand, method_name="backdoor.propensity_score_stratification")
+
+    with pytest.raises(NotImplementedError):
+        estimate.get_standard_error(method="bootstrap", num_simulations=5, weighted_bootstrap="poisson")
+    with pytest.raises(ValueError):
+        estimate.get_standard_error(method="bootstrap", num_simulations=5, weighted_bootstrap="unknown")
+
+
+@pytest.mark.usefixtures("fixed_seed")
+@pytest.mark.parametrize(
+    "method_name",
+    ["backdoor.linear_regression", "backdoor.generalized_linear_model", "backdoor.propensity_score_weighting"],
+)
+def test_estimate_effect_with_outcome_equals_refitting_the_estimator(method_name):
+    data = dowhy.datasets.linear_dataset(
+        beta=10, num_common_causes=2, num_samples=500, num_effect_modifiers=1, treatment_is_binary=True
+    )
+    model = CausalModel(
+        data=data["df"],
+        treatment=data["treatment_name"],
+        outcome=data["outcome_name"],
+        graph=data["gml_graph"],
+    )
+    identified_estimand = model.identify_effect()
+    method_params = {"glm_family": sm.families.Gaussian()} if method_name == "backdoor.generalized_linear_model" else {}
+    estimate = model.estimate_effect(identified_estimand, method_name=method_name, method_params=method_params)
+
+    permuted_outcome = np.random.permutation(data["df"][data["outcome_name"]].to_numpy())
+
+    assert estimate.estimator._estimate_effect_with_outcome(permuted_outcome) == pytest.approx(
+        CausalEstimator._estimate_effect_with_outcome(estimate.estimator, permuted_outcome)
+    )
+
+
+@pytest.mark.usefixtures("fixed_seed")
+def test_estimate_effect_with_outcome_keeps_the_treatment_values():
+    data = dowhy.datasets.linear_dataset(beta=10, num_common_causes=2, num_samples=500)
+    model = CausalModel(
+        data=data["df"],
+        treatment=data["treatment_name"],
+        outcome=data["outcome_name"],
+        graph=data["gml_graph"],
+    )
+    identified_estimand = model.identify_effect()
+    estimate = model.estimate_effect(
+        identified_estimand, method_name="backdoor.linear_regression", control_value=1, treatment_value=3
+    )
+
+    # The default implementation refits the estimator, which needs to compare the same treatment values
+    outcome = data["df"][data["outcome_name"]].to_numpy()
+    assert CausalEstimator._estimate_effect_with_outcome(estimate.estimator, outcome) == pytest.approx(estimate.value)
+
+
+@pytest.mark.usefixtures("fixed_seed")
+def test_bootstrap_significance_test_is_reproducible_with_parallel_jobs():
+    data = dowhy.datasets.linear_dataset(beta=10, num_common_causes=2, num_samples=500, treatment_is_binary=True)
+    model = CausalModel(
+        data=data["df"],
+        treatment=data["treatment_name"],
+        outcome=data["outcome_name"],
+        graph=data["gml_graph"],
+    )
+    identified_estimand = model.identify_effect()
+    estimate = model.estimate_effect(identified_estimand, method_name="backdoor.linear_regression")
+
+    np.random.seed(0)
+    sequential_p_value = estimate.test_stat_significance(method="bootstrap", num_null_simulations=20)["p_value"]
+    sequential_null_estimates = estimate.estimator._bootstrap_null_estimates.estimates
+
+    estimate.estimator._bootstrap_null_estimates = None
+    np.random.seed(0)
+    parallel_p_value = estimate.test_stat_significance(method="bootstrap", num_null_simulations=20, n_jobs=2)["p_value"]
+
+    assert sequential_p_value == parallel_p_value
+    assert sequential_p_value == (0, 1 / 20)
+    np.testing.assert_allclose(estimate.estimator._bootstrap_null_estimates.estimates, sequential_null_estimates)
+
+
+@pytest.mark.usefixtures("fixed_seed")
+def test_bootstrap_significance_test_stops_early_for_insignificant_estimate():
+    data = dowhy.datasets.linear_dataset(beta=0, num_common_causes=2, num_samples=500, treatment_is_binary=True)
+    model = CausalModel(
+        data=data["df"],
+        treatment=data["treatment_name"],
+        outcome=data["outcome_name"],
+        graph=data["gml_graph"],
+    )
+    identified_estimand = model.identify_effect()
+    estimate = model.estimate_effect(identified_estimand, method_name="backdoor.propensity_score_weighting")
+
+    p_value = estimate.test_stat_significance(method="bootstrap", num_null_simulations=1000, max_num_exceedances=10)[
+        "p_value"
+    ]
+    num_simulations = len(estimate.estimator._bootstrap_null_estimates.estimates)
+
+    assert num_simulations < 1000
+    assert p_value == 10 / num_simulations
+    assert p_value > 0.05
+
+
 class TestCausalEstimator(unittest.TestCase):
     def setUp(self):
         # self.df = pd.read_csv(os.path.join(DATA_PATH,'dgp_1/acic_1_1_data.csv'))
@@ -1,10 +1,12 @@
 import numpy as np
+import pandas as pd
 import pytest
 from flaky import flaky
 
 from dowhy.causal_estimator import CausalEstimate
 from dowhy.causal_identifier.identified_estimand import IdentifiedEstimand
 from dowhy.causal_refuter import CausalRefuter
+from dowhy.utils.shared_data import SharedDataFrame, overlay_columns
 
 
 class MockRefuter(CausalRefuter):
@@ -24,3 +26,39 @@ def test_causal_refuter_bootstrap_test():
     simulations = np.random.normal(0, 1, 5000)
     pvalue = refuter.perform_bootstrap_test(estimator, simulations)
     assert pvalue > 0.95
+
+
+def test_overlay_columns_shares_the_untouched_columns():
+    data = pd.DataFrame(
+        {"w": np.random.normal(size=10), "t": np.arange(10) > 4, "y": np.random.normal(size=10)},
+        index=np.arange(10, 20),
+    )
+    original_data = data.copy()
+
+    new_data = overlay_columns(data, {"t": np.zeros(10, dtype=bool), "placebo": np.ones(10)})
+
+    assert list(new_data.columns) == ["w", "t", "y", "placebo"]
+    assert new_data.index.equals(data.index)
+    assert not new_data["t"].any()
+    assert np.shares_memory(new_data["w"].to_numpy(), data["w"].to_numpy())
+    assert np.shares_memory(new_data["y"].to_numpy(), data["y"].to_numpy())
+    # The shared columns cannot be modified in place, but replaced
+    with pytest.raises(ValueError):
+        new_data.loc[10, "w"] = 1.0
+    new_data["w"] = 1.0
+    pd.testing.assert_frame_equal(data, original_data)
+
+
+def test_shared_data_frame_view_does_not_copy_the_data():
+    data = pd.DataFrame(
+        {"w": np.random.normal(size=10), "t": np.arange(10) > 4, "c": pd.Categorical(list("abababcabc"))},
+        index=np.random.permutation(np.arange(10, 20)),
+    )
+
+    shared_data = SharedDataFrame(data)
+    view = shared_data.view()
+
+    pd.testing.assert_frame_equal(view, data)
+    assert np.shares_memory(view["w"].to_numpy(), shared_data.column("w"))
+    with pytest.raises(ValueError):
+        view.iloc[0, 0] = 1.0